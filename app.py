@@ -1,32 +1,226 @@
+import asyncio
+import logging
+from urllib.parse import urlencode
 from http.client import HTTPException
-from typing import List, Optional
-from datamodel.models import Interaction, Patient
-from fastapi import FastAPI, HTTPException, Query
-from utils.data_utils import DataUtils
-from utils.injectors import sql_instance
+from typing import Any, List, Literal, Optional
+from datamodel.models import (
+    GroupCount,
+    Interaction,
+    InteractionSearchPage,
+    LabelCount,
+    Patient,
+    PatientHealth,
+    PatientLookup,
+    ScoredInteraction,
+)
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
+from utils.async_data_utils import AsyncDataUtils
+from utils.data_utils import interaction_decoder, patient_decoder
+from utils.injectors import async_replica_router, async_sql_pool, backend
+from utils.instrumentation import MetricsMiddleware, instrumentation
+from utils.interaction_batch import BatchResult, insert_interaction_stream
+from utils.json_stream import iter_json_records
+from utils.async_pool import AsyncConnectionPool
+from utils.pagination import InvalidCursorError
+from utils.patient_cache import PatientCache
+from utils.replica_router import ReplicaRouter
+from utils.response_cache import CachedResponse, ResponseCache
+from utils.row_codec import InvalidFieldsError, RowDecoder
+from utils.schema_registry import registry
+from utils.search_index import SearchIndex
+from utils.settings import settings
+from utils.sql_query_builder import SQLQueryBuilder
+from utils.statement_cache import statement_cache
+from utils.table_schemas import InteractionSchema
+from utils.write_coalescer import WriteCoalescer
 from fastapi.responses import JSONResponse
-import mysql.connector
-from mysql.connector import MySQLConnection
 from contextlib import asynccontextmanager
 
-connection: MySQLConnection = None
+logger = logging.getLogger(__name__)
+
+pool: AsyncConnectionPool = None
+replica_router: Optional[ReplicaRouter] = None
+patient_cache = PatientCache(
+    max_size=settings.patient_cache_size,
+    ttl=settings.patient_cache_ttl,
+    negative_ttl=settings.patient_cache_negative_ttl,
+)
+search_index = SearchIndex() if settings.search_index_enabled else None
+response_cache = ResponseCache(
+    max_bytes=settings.response_cache_max_bytes, ttl=settings.response_cache_ttl
+)
+
+
+def make_data_utils(**kwargs) -> AsyncDataUtils:
+    """
+    Data utilities bound to the connection pool, read replicas and patient cache
+    of the app.
+
+    Args:
+        **kwargs: Further arguments of ``AsyncDataUtils``, e.g. ``search_index``.
+
+    Returns:
+        AsyncDataUtils: Data utilities speaking the dialect of the configured backend.
+    """
+    return AsyncDataUtils(
+        pool,
+        patient_cache,
+        placeholder=backend.placeholder,
+        replicas=replica_router,
+        **kwargs,
+    )
+
+
+async def insert_interaction_group(interactions: List[Interaction]):
+    """
+    Insert the interactions gathered by the write coalescer in one transaction.
+
+    Args:
+        interactions (List[Interaction]): The interactions of concurrent requests.
+    """
+    await make_data_utils(
+        search_index=search_index, response_cache=response_cache
+    ).insert_interactions(interactions, batch_size=len(interactions), atomic=True)
+
+
+write_coalescer = (
+    WriteCoalescer(
+        insert_interaction_group,
+        window=settings.write_coalesce_window,
+        max_batch=settings.write_coalesce_max_batch,
+        table=InteractionSchema.name,
+        instrumentation=instrumentation,
+    )
+    if settings.write_coalescer_enabled
+    else None
+)
+
+
+async def build_search_index():
+    """
+    Build the search index from the database in the background.
+    """
+    try:
+        await make_data_utils().rebuild_search_index(search_index)
+        logger.info("Search index built: %s", search_index.stats())
+    except Exception:
+        logger.exception("Error building the search index")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
-    Context manager for managing the lifespan of the database connection.
+    Context manager for managing the lifespan of the database connection pool.
     """
-    global connection
-    connection = sql_instance()
+    global pool, replica_router
+    registry.precompile(backend.placeholder)
+    pool = await async_sql_pool()
+    replica_router = await async_replica_router()
+    index_build = None
+    if search_index is not None:
+        index_build = asyncio.create_task(build_search_index())
     yield
 
-    if connection and connection.connected:
-        connection.close()
-        print("Database connection closed")
+    if index_build is not None:
+        index_build.cancel()
+
+    if write_coalescer is not None:
+        await write_coalescer.close()
+
+    if replica_router:
+        for replica in replica_router.replicas:
+            await replica.close()
+
+    if pool:
+        await pool.close()
+        print("Database connection pool closed")
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware, instrumentation=instrumentation)
+
+FIELDS_DESCRIPTION = (
+    "Comma-separated fields to return; key fields are always included. "
+    "Defaults to all fields"
+)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Split the ``fields`` query parameter.
+
+    Args:
+        fields (Optional[str]): Comma-separated field names.
+
+    Returns:
+        Optional[List[str]]: The field names, or None for all fields.
+    """
+    if fields is None:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+def model_response(
+    models: List[Any],
+    decoder: RowDecoder,
+    fields: Optional[List[str]] = None,
+    headers: dict = None,
+) -> Response:
+    """
+    Serialize models, optionally restricted to the requested and the key fields.
+
+    The models were validated when they were decoded, so they are serialized
+    as they are instead of going through the response model again.
+
+    Args:
+        models (List[Any]): The (partial) models to return.
+        decoder (RowDecoder): Decoder of the models' table, defining the key fields.
+        fields (Optional[List[str]], optional): The requested fields. Defaults to all fields.
+        headers (dict, optional): Response headers.
+
+    Returns:
+        Response: The serialized models.
+    """
+    with instrumentation.timer("serialize"):
+        content = decoder.dump_json(models, decoder.projection(fields))
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def cache_key(request: Request) -> str:
+    """
+    Key of a GET request in the response cache.
+
+    Args:
+        request (Request): The request.
+
+    Returns:
+        str: The path and the sorted query parameters.
+    """
+    return (
+        request.url.path + "?" + urlencode(sorted(request.query_params.multi_items()))
+    )
+
+
+def cached_response(request: Request, cached: CachedResponse) -> Response:
+    """
+    Send a cached response, or 304 if the client's ``If-None-Match`` holds its ETag.
+
+    Args:
+        request (Request): The request.
+        cached (CachedResponse): The current response.
+
+    Returns:
+        Response: The response with its ETag.
+    """
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+    if response_cache.not_modified(cached, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=cached.body,
+        media_type="application/json",
+        headers={**cached.headers, **headers},
+    )
 
 
 @app.get("/")
@@ -37,11 +231,53 @@ def read_root():
     return {"msg": "Hello World"}
 
 
+@app.get("/system/stats")
+def get_system_stats():
+    """
+    Endpoint exposing runtime statistics used to size the service.
+
+    Returns:
+        dict: Connection pool usage such as in-use count and wait times, the
+        lag of the read replicas and the reads routed to them, and
+        hit/miss counters of the patient, response, prepared statement and query
+        template caches, the size of the search index, the sampled slow queries
+        and the batches of the write coalescer.
+    """
+    return {
+        "pool": pool.stats() if pool else None,
+        "replicas": replica_router.stats() if replica_router else None,
+        "patient_cache": patient_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "statement_cache": statement_cache.stats(),
+        "query_templates": SQLQueryBuilder.template_cache_info()._asdict(),
+        "search_index": search_index.stats() if search_index else None,
+        "instrumentation": instrumentation.stats(),
+        "write_coalescer": write_coalescer.stats() if write_coalescer else None,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Endpoint exposing query, pool wait, decode/serialize and request timings
+    in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: The metrics, empty when ``METRICS_ENABLED`` is off.
+    """
+    return PlainTextResponse(
+        instrumentation.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
 @app.post("/interactions/")
-def create_interactions(interaction: Interaction):
+async def create_interactions(interaction: Interaction):
     """
     Endpoint to create patient interactions.
 
+    With ``WRITE_COALESCER_ENABLED``, the insert shares its transaction with
+    those of concurrent requests.
+
     Args:
         interaction (Interaction): The interaction data to be inserted.
 
@@ -49,11 +285,16 @@ def create_interactions(interaction: Interaction):
         JSONResponse: JSON response with a success message or error details.
     """
 
-    data_utils = DataUtils(connection)
-    if not data_utils.get_patient_by_insurance_no(interaction.insurance_no):
+    data_utils = make_data_utils(
+        search_index=search_index, response_cache=response_cache
+    )
+    if not await data_utils.get_patient_by_insurance_no(interaction.insurance_no):
         raise HTTPException(status_code=404, detail="Patient record does not exist")
     try:
-        data_utils.insert_interactions([interaction])
+        if write_coalescer is not None:
+            await write_coalescer.submit(interaction)
+        else:
+            await data_utils.insert_interactions([interaction])
     except Exception as e:
         raise HTTPException(
             status_code=500, detail="Error creating interactions" + str(e)
@@ -63,11 +304,101 @@ def create_interactions(interaction: Interaction):
     )
 
 
+@app.post("/interactions/batch", response_model=BatchResult)
+async def create_interactions_batch(request: Request):
+    """
+    Endpoint to create many patient interactions in one request.
+
+    The body is streamed and parsed incrementally, either as NDJSON (one
+    interaction per line) or as a JSON array of interactions. Records are
+    inserted in chunks, each with a single patient existence query and a single
+    transaction.
+
+    Args:
+        request (Request): The request, whose body holds the interactions.
+
+    Returns:
+        JSONResponse: Counts and per-record results, with status 201 when every
+        record was created and 207 otherwise.
+    """
+    data_utils = make_data_utils(
+        search_index=search_index, response_cache=response_cache
+    )
+    batch = await insert_interaction_stream(
+        data_utils,
+        iter_json_records(request.stream()),
+        chunk_size=settings.batch_chunk_size,
+    )
+    return JSONResponse(
+        status_code=201 if batch.created == len(batch.results) else 207,
+        content=batch.model_dump(),
+    )
+
+
+@app.get("/interactions/search", status_code=200, response_model=InteractionSearchPage)
+async def search_interactions(
+    q: str = Query(
+        ...,
+        description='Words that must all occur, and quoted phrases, e.g. "chest pain"',
+    ),
+    insurance_no: Optional[str] = Query(
+        None, description="Restrict the search to the interactions of a patient"
+    ),
+    offset: int = Query(0, ge=0, description="The number of results to skip"),
+    limit: int = Query(
+        10, gt=0, le=100, description="The numbers of results to return"
+    ),
+):
+    """
+    Endpoint to search the ailment, symptoms, remarks and Q&A answers of
+    interactions, ranked by relevance.
+
+    The query is answered by the in-process search index; only the interactions
+    of the requested page are read from the database.
+
+    Args:
+        q (str): The search query.
+        insurance_no (Optional[str], optional): Insurance number of the patient.
+            Defaults to all patients.
+        offset (int, optional): Number of results to skip. Defaults to 0.
+        limit (int, optional): Number of results to return. Defaults to 10.
+
+    Returns:
+        InteractionSearchPage: The number of matches and the page of results.
+    """
+    if search_index is None:
+        raise HTTPException(status_code=404, detail="Search is disabled")
+    if not search_index.ready:
+        raise HTTPException(status_code=503, detail="Search index is being built")
+    hits, total = search_index.search(
+        q, insurance_no=insurance_no, offset=offset, limit=limit
+    )
+    data_utils = make_data_utils()
+    try:
+        interactions = await data_utils.get_interactions_by_ids(
+            [hit.id for hit in hits]
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail="Error fetching interactions details" + str(e)
+        )
+    by_id = {interaction.id: interaction for interaction in interactions}
+    return InteractionSearchPage(
+        total=total,
+        results=[
+            ScoredInteraction(score=hit.score, interaction=by_id[hit.id])
+            for hit in hits
+            if hit.id in by_id
+        ],
+    )
+
+
 @app.get(
     "/interactions/{insurance_no}/", status_code=200, response_model=List[Interaction]
 )
-def get_interactions(
+async def get_interactions(
     insurance_no: str,
+    request: Request,
     labels: Optional[str] = None,
     offset: int = Query(
         0,
@@ -75,53 +406,296 @@ def get_interactions(
         description="The number of items to skip before starting to collect the result set",
     ),
     limit: int = Query(10, gt=0, le=100, description="The numbers of items to return"),
+    cursor: Optional[str] = Query(
+        None,
+        description="Opaque cursor from the X-Next-Cursor header of the previous page, replaces offset",
+    ),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
 ):
 
     """
     Endpoint to retrieve interactions for a specific insurance number.
 
+    Interactions are ordered by interaction date and id. The cursor of the next
+    page is returned in the ``X-Next-Cursor`` response header; passing it back
+    as ``cursor`` fetches the next page in constant time regardless of depth.
+
+    With ``FAST_JSON`` enabled the rows are serialized straight to JSON,
+    without building a response model.
+
+    Responses are cached until a write touches the patient and carry an ETag;
+    a request whose ``If-None-Match`` holds it gets a 304.
+
     Args:
         insurance_no (str): Insurance number of the patient.
+        request (Request): The request, for the cache key and ``If-None-Match``.
         labels (Optional[str], optional): Filter interactions by label. Defaults to None.
         offset (int, optional): Number of items to skip. Defaults to 0.
         limit (int, optional): Number of items to return. Defaults to 10.
+        cursor (Optional[str], optional): Cursor of the page to fetch. Defaults to None.
+        fields (Optional[str], optional): Comma-separated fields to return, e.g.
+            ``interaction_date,label`` for a timeline. Only these columns are read
+            from the database. Defaults to all fields.
 
     Returns:
         List[Interaction]: List of Interaction objects matching the criteria.
     """
-    data_utils = DataUtils(connection)
-    if not data_utils.get_patient_by_insurance_no(insurance_no):
+    selected = parse_fields(fields)
+    if cursor and offset:
+        raise HTTPException(
+            status_code=400, detail="Use either cursor or offset, not both"
+        )
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached_response(request, cached)
+    generation = response_cache.generation()
+    data_utils = make_data_utils()
+    if not await data_utils.get_patient_by_insurance_no(insurance_no):
         raise HTTPException(status_code=404, detail="Patient record does not exist")
+    fetch_page = (
+        data_utils.get_interaction_page_json
+        if settings.fast_json
+        else data_utils.get_interaction_page
+    )
     try:
-        interactions = data_utils.get_interaction_info(
-            insurance_no=insurance_no, labels=labels, offset=offset, limit=limit
+        interactions, next_cursor = await fetch_page(
+            insurance_no=insurance_no,
+            labels=labels,
+            offset=offset,
+            limit=limit,
+            cursor=cursor,
+            fields=selected,
         )
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail="Error fetching interactions details" + str(e)
         )
-    return interactions
+    if not settings.fast_json:
+        with instrumentation.timer("serialize"):
+            interactions = interaction_decoder.dump_json(
+                interactions, interaction_decoder.projection(selected)
+            )
+    cached = response_cache.put(
+        key,
+        insurance_no,
+        interactions,
+        {"X-Next-Cursor": next_cursor} if next_cursor else None,
+        generation,
+    )
+    return cached_response(request, cached)
 
 
 @app.get("/patient/{insurance_no}/", status_code=200, response_model=List[Patient])
-def get_patient_info(insurance_no: str):
+async def get_patient_info(
+    insurance_no: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+):
     """
     Endpoint to retrieve patient information by insurance number.
 
+    Responses are cached until a write touches the patient and carry an ETag;
+    a request whose ``If-None-Match`` holds it gets a 304.
+
     Args:
         insurance_no (str): Insurance number of the patient.
+        request (Request): The request, for the cache key and ``If-None-Match``.
+        fields (Optional[str], optional): Comma-separated fields to return.
+            Defaults to all fields.
 
     Returns:
         List[Patient]: List of Patient objects matching the insurance number.
     """
-    data_utils = DataUtils(connection)
-
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached_response(request, cached)
+    generation = response_cache.generation()
+    data_utils = make_data_utils()
+    selected = parse_fields(fields)
     try:
-        patient_info = data_utils.get_patient_by_insurance_no(insurance_no)
+        patient_info = await data_utils.get_patient_by_insurance_no(
+            insurance_no, fields=selected
+        )
+    except InvalidFieldsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail="Error fetching patient details" + str(e)
         )
     if not patient_info:
         raise HTTPException(status_code=404, detail="Patient record does not exist")
-    return patient_info
+    with instrumentation.timer("serialize"):
+        body = patient_decoder.dump_json(
+            patient_info, patient_decoder.projection(selected)
+        )
+    cached = response_cache.put(key, insurance_no, body, generation=generation)
+    return cached_response(request, cached)
+
+
+async def _lookup_patients(
+    insurance_nos: List[str], fields: Optional[List[str]] = None
+) -> List[Patient]:
+    """
+    Retrieve the patients of several insurance numbers, for the GET and POST
+    lookup endpoints.
+
+    Args:
+        insurance_nos (List[str]): Insurance numbers of the patients.
+        fields (Optional[List[str]], optional): The fields to return. Defaults
+            to all fields.
+
+    Returns:
+        List[Patient]: The patients found, in the requested order, serialized
+        directly when a projection or ``FAST_JSON`` is requested.
+
+    Raises:
+        HTTPException: 400 without insurance numbers, with more than
+            ``PATIENT_LOOKUP_MAX_IDS`` of them or with unknown fields, 500 on
+            database errors.
+    """
+    if not insurance_nos:
+        raise HTTPException(status_code=400, detail="No insurance numbers given")
+    if len(insurance_nos) > settings.patient_lookup_max_ids:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.patient_lookup_max_ids} insurance numbers per lookup",
+        )
+    data_utils = make_data_utils()
+    try:
+        patients = await data_utils.get_patients_by_insurance_nos(
+            insurance_nos, fields=fields
+        )
+    except InvalidFieldsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail="Error fetching patient details" + str(e)
+        )
+    if fields is not None or settings.fast_json:
+        return model_response(patients, patient_decoder, fields)
+    return patients
+
+
+@app.get("/patients", status_code=200, response_model=List[Patient])
+async def get_patients(
+    ids: List[str] = Query(
+        ...,
+        description="Insurance numbers, comma-separated or as repeated parameters",
+    ),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+):
+    """
+    Endpoint to retrieve the patients of several insurance numbers in one query.
+
+    Args:
+        ids (List[str]): Insurance numbers of the patients.
+        fields (Optional[str], optional): Comma-separated fields to return.
+            Defaults to all fields.
+
+    Returns:
+        List[Patient]: The patients found, in the requested order. Unknown
+        insurance numbers are left out.
+    """
+    insurance_nos = [no for value in ids for no in value.split(",") if no]
+    return await _lookup_patients(insurance_nos, parse_fields(fields))
+
+
+@app.post("/patients/lookup", status_code=200, response_model=List[Patient])
+async def lookup_patients(
+    lookup: PatientLookup,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+):
+    """
+    Endpoint to retrieve the patients of several insurance numbers in one query,
+    for lists too long for a query string.
+
+    Args:
+        lookup (PatientLookup): Insurance numbers of the patients.
+        fields (Optional[str], optional): Comma-separated fields to return.
+            Defaults to all fields.
+
+    Returns:
+        List[Patient]: The patients found, in the requested order. Unknown
+        insurance numbers are left out.
+    """
+    return await _lookup_patients(lookup.insurance_nos, parse_fields(fields))
+
+
+@app.get("/labels", status_code=200, response_model=List[LabelCount])
+async def get_labels():
+    """
+    Endpoint to retrieve the interaction labels with the number of interactions
+    carrying each, counted from the label index without scanning interactions.
+
+    Returns:
+        List[LabelCount]: The labels in alphabetical order with their counts.
+    """
+    data_utils = make_data_utils()
+    try:
+        return await data_utils.get_label_counts()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error fetching labels" + str(e))
+
+
+@app.get("/aggregates/interactions", status_code=200, response_model=List[GroupCount])
+async def get_interaction_aggregates(
+    by: Literal["label", "ailment", "month"] = Query(
+        ..., description="Count interactions per label, ailment or month (YYYY-MM)"
+    ),
+):
+    """
+    Endpoint to retrieve the number of interactions per label, ailment or month.
+
+    The counts are read from the INTERACTION_COUNT summary table, which is kept
+    up to date as interactions are inserted, so no interactions are scanned.
+
+    Args:
+        by (str): The dimension to count by.
+
+    Returns:
+        List[GroupCount]: The values of the dimension in order with their counts.
+    """
+    data_utils = make_data_utils()
+    try:
+        return await data_utils.get_interaction_counts(by)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail="Error fetching aggregates" + str(e)
+        )
+
+
+@app.get(
+    "/aggregates/health_status", status_code=200, response_model=List[PatientHealth]
+)
+async def get_health_status_aggregates(
+    insurance_no: Optional[str] = Query(
+        None, description="Restrict the result to a patient"
+    ),
+    offset: int = Query(0, ge=0, description="The number of patients to skip"),
+    limit: int = Query(
+        100, gt=0, le=1000, description="The numbers of patients to return"
+    ),
+):
+    """
+    Endpoint to retrieve the number of interactions and the average health
+    status of patients, read from the PATIENT_HEALTH summary table.
+
+    Args:
+        insurance_no (Optional[str], optional): A single patient. Defaults to None.
+        offset (int, optional): The number of patients to skip. Defaults to 0.
+        limit (int, optional): The numbers of patients to return. Defaults to 100.
+
+    Returns:
+        List[PatientHealth]: The patients in order of insurance number.
+    """
+    data_utils = make_data_utils()
+    try:
+        return await data_utils.get_patient_health(insurance_no, offset, limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail="Error fetching aggregates" + str(e)
+        )
@@ -0,0 +1,125 @@
+"""
+Benchmark of the storage formats of the JSON columns of interactions.
+
+Compares JSON text, with and without the generated columns on frequently
+queried keys (and their index), with MessagePack (if the ``msgpack`` package is
+installed): encode and decode rows/sec, bytes of the JSON columns per row and
+size of an SQLite file holding the rows.
+
+Usage:
+    python -m benchmarks.bench_json_columns [--rows 10000] [--repeat 5]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+
+from benchmarks.bench_row_encoder import make_interactions, rows_per_second
+from datamodel.models import Interaction
+from utils.row_codec import JSON_CODECS, RowDecoder, RowEncoder, make_json_codec
+from utils.sql_query_builder import SQLQueryBuilder
+from utils.table_schemas import InteractionSchema
+
+
+def available_codecs():
+    """
+    The codecs whose dependencies are installed.
+    """
+    codecs = []
+    for name in JSON_CODECS:
+        try:
+            codecs.append(make_json_codec(name))
+        except RuntimeError as e:
+            print(f"Skipping {name}: {e}")
+    return codecs
+
+
+def json_bytes_per_row(encoder, rows):
+    """
+    Average size of the encoded JSON columns of a row.
+    """
+    positions = [
+        position
+        for position, name in enumerate(encoder.columns)
+        if name in {col.name for col in InteractionSchema.columns if col.json_encoded}
+    ]
+    total = sum(
+        len(row[position]) for row in rows for position in positions if row[position]
+    )
+    return total / len(rows)
+
+
+def sqlite_file_size(encoder, rows, generated):
+    """
+    Size of an SQLite file holding the rows, with the interaction indexes.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.db")
+        conn = sqlite3.connect(path)
+        builder = SQLQueryBuilder("?")
+        conn.execute(
+            builder.create(InteractionSchema, "sqlite", generated).construct_query()
+        )
+        columns = set(encoder.columns) | (
+            {col.name for col in InteractionSchema.columns} if generated else set()
+        )
+        for index in InteractionSchema.indexes:
+            if columns.issuperset(index.columns):
+                conn.execute(
+                    builder.create_index(
+                        InteractionSchema.name, index
+                    ).construct_query()
+                )
+        conn.executemany(
+            builder.insert_batch(
+                InteractionSchema.name, encoder.columns
+            ).construct_query(),
+            rows,
+        )
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.close()
+        return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    interactions = make_interactions(args.rows)
+    for interaction in interactions:
+        # the key of the ``bp`` generated column, as in the sample data
+        interaction.metrics = {
+            "BP": interaction.metrics.pop("bp"),
+            **interaction.metrics,
+        }
+
+    variants = [
+        (codec, generated)
+        for codec in available_codecs()
+        for generated in ([True, False] if not codec.binary else [False])
+    ]
+    baseline = None
+    for codec, generated in variants:
+        encoder = RowEncoder(InteractionSchema, json_codec=codec)
+        decoder = RowDecoder(InteractionSchema, Interaction, json_codec=codec)
+        rows = encoder.encode(interactions)
+        encode_rate = rows_per_second(encoder.encode, interactions, args.repeat)
+        decode_rate = rows_per_second(
+            lambda rows: decoder.decode(rows, encoder.columns), rows, args.repeat
+        )
+        size = sqlite_file_size(encoder, rows, generated)
+        baseline = baseline or (encode_rate, decode_rate, size)
+        name = f"{codec.name}{' + generated' if generated else ''}"
+        print(
+            f"{name:18} encode {encode_rate:10,.0f} rows/s x{encode_rate / baseline[0]:.1f}  "
+            f"decode {decode_rate:10,.0f} rows/s x{decode_rate / baseline[1]:.1f}  "
+            f"JSON {json_bytes_per_row(encoder, rows):6.1f} B/row  "
+            f"SQLite {size / 1024:8,.0f} KiB x{size / baseline[2]:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Latency benchmark of the interaction list response paths.
+
+Serves the same page of decoded rows from two endpoints: the default path,
+which returns models that FastAPI validates again against
+``response_model=List[Interaction]`` and encodes with ``json.dumps``, and the
+``FAST_JSON`` path, which validates the rows once and serializes them straight
+to JSON bytes. Reports p50/p99 request latency for each.
+
+Usage:
+    python -m benchmarks.bench_response [--rows 100] [--requests 2000]
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import List
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from datamodel.models import Interaction
+from utils.data_utils import interaction_decoder
+
+
+def make_rows(n):
+    """
+    Build ``n`` INTERACTION rows as returned by the driver, JSON columns as text.
+    """
+    return [
+        (
+            i,
+            f"A{i % 50}",
+            "Sore Throat",
+            "Pain in throat, coughing",
+            "2024-01-%02d" % (1 + i % 28),
+            json.dumps({"bp": "120/80", "temperature": "99.1"}),
+            "Patient is advised to rest",
+            3,
+            json.dumps({"Do you smoke?": "No", "Any allergies?": "Dust"}),
+            json.dumps(
+                {
+                    "next_visit": "2024-02-01",
+                    "prescribed_meds": ["Paracetamol"],
+                    "prescribed_tests": ["Blood test"],
+                    "prescribed_specialist": "ENT",
+                }
+            ),
+            "cold",
+        )
+        for i in range(n)
+    ]
+
+
+def make_app(rows):
+    """
+    Build an app serving ``rows`` through both response paths.
+    """
+    app = FastAPI()
+
+    @app.get("/models", response_model=List[Interaction])
+    async def models():
+        return interaction_decoder.decode(rows)
+
+    @app.get("/fast")
+    async def fast():
+        return Response(
+            content=interaction_decoder.decode_json(rows),
+            media_type="application/json",
+        )
+
+    return app
+
+
+def percentile(samples, q):
+    """
+    The ``q``-th percentile of the samples, by nearest rank.
+    """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100, help="Rows per page")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per path")
+    args = parser.parse_args()
+
+    client = TestClient(make_app(make_rows(args.rows)))
+    assert client.get("/models").json() == client.get("/fast").json()
+
+    print(f"{args.rows} rows per page, {args.requests} requests")
+    for path in ("/models", "/fast"):
+        for _ in range(50):
+            client.get(path)
+        samples = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            client.get(path)
+            samples.append((time.perf_counter() - started) * 1000)
+        print(
+            f"{path:10} p50 {percentile(samples, 50):7.3f} ms"
+            f"  p99 {percentile(samples, 99):7.3f} ms"
+            f"  mean {statistics.mean(samples):7.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
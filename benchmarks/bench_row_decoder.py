@@ -0,0 +1,96 @@
+"""
+Microbenchmark of decoding a page of interaction rows into models.
+
+Compares the original ``Interaction.from_list`` (JSON-parse every string, then
+validate) with the schema-driven ``RowDecoder``, and its ``model_validate`` of
+the decoded dicts with skipping validation through ``model_construct``.
+
+Usage:
+    python -m benchmarks.bench_row_decoder [--rows 100] [--repeat 200]
+"""
+import argparse
+import json
+import time
+from datetime import date
+
+from datamodel.models import Interaction, NextSteps
+from utils.data_utils import interaction_decoder
+
+
+def make_rows(n):
+    """
+    Build ``n`` interaction rows as the MySQL driver returns them.
+    """
+    return [
+        (
+            i,
+            f"A{i % 50}",
+            "Sore Throat",
+            "Pain in throat, coughing",
+            date(2024, 1, 1 + i % 28),
+            json.dumps({"bp": "120/80", "temperature": "99.1"}),
+            "Patient is advised to rest",
+            3,
+            json.dumps({"Do you smoke?": "No", "Any allergies?": "Dust"}),
+            json.dumps(
+                {
+                    "next_visit": "2024-02-01",
+                    "prescribed_meds": ["Paracetamol"],
+                    "prescribed_tests": ["Blood test"],
+                    "prescribed_specialist": "ENT",
+                }
+            ),
+            "cold",
+        )
+        for i in range(n)
+    ]
+
+
+def construct_interactions(rows):
+    """
+    Decode the JSON and date columns, then build the models without validation;
+    nested models have to be built by hand.
+    """
+    interactions = []
+    for fields in interaction_decoder.decode_dicts(rows):
+        next_steps = fields["next_steps"]
+        if next_steps is not None:
+            fields["next_steps"] = NextSteps.model_construct(**next_steps)
+        interactions.append(Interaction.model_construct(**fields))
+    return interactions
+
+
+def rows_per_second(decode, rows, repeat):
+    """
+    Best rows/sec over ``repeat`` runs of decoding the page.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(rows)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    candidates = {
+        "Interaction.from_list": lambda page: [Interaction.from_list(r) for r in page],
+        "RowDecoder.decode": interaction_decoder.decode,
+        "RowDecoder.decode_dicts": interaction_decoder.decode_dicts,
+        "decode_dicts + model_construct": construct_interactions,
+    }
+    baseline = None
+    for name, decode in candidates.items():
+        rate = rows_per_second(decode, rows, args.repeat)
+        baseline = baseline or rate
+        print(f"{name:34} {rate:12,.0f} rows/s  x{rate / baseline:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Microbenchmark of serializing interactions into rows for a bulk INSERT.
+
+Compares the original ``convert_obj_to_lists`` (one ``model_dump`` per column
+per object) with the schema-driven ``RowEncoder`` fed models, dicts and tuples.
+
+Usage:
+    python -m benchmarks.bench_row_encoder [--rows 10000] [--repeat 5]
+"""
+import argparse
+import json
+import time
+from datetime import date
+
+from pydantic import BaseModel
+
+from datamodel.models import Interaction, NextSteps
+from utils.data_utils import convert_obj_to_lists, interaction_encoder
+
+
+def quadratic_convert_obj_to_lists(objs):
+    """
+    The original implementation, kept as the baseline.
+    """
+    cols = list(objs[0].model_dump().keys())
+    rows = []
+    for obj in objs:
+        row = []
+        for col in cols:
+            value = obj.model_dump()[col]
+            if isinstance(value, (dict, BaseModel)):
+                value = json.dumps(value)
+            row.append(value)
+        rows.append(row)
+    return cols, rows
+
+
+def make_interactions(n):
+    """
+    Build ``n`` interactions with every JSON column set.
+    """
+    return [
+        Interaction(
+            id=i,
+            insurance_no=f"A{i % 50}",
+            ailment="Sore Throat",
+            symptoms="Pain in throat, coughing",
+            interaction_date=date(2024, 1, 1 + i % 28),
+            metrics={"bp": "120/80", "temperature": "99.1"},
+            remarks="Patient is advised to rest",
+            health_status=3,
+            qa={"Do you smoke?": "No", "Any allergies?": "Dust"},
+            next_steps=NextSteps(
+                next_visit="2024-02-01",
+                prescribed_meds=["Paracetamol"],
+                prescribed_tests=["Blood test"],
+                prescribed_specialist="ENT",
+            ),
+            label="cold",
+        )
+        for i in range(n)
+    ]
+
+
+def rows_per_second(encode, items, repeat):
+    """
+    Best rows/sec over ``repeat`` runs of encoding the items.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encode(items)
+        best = min(best, time.perf_counter() - start)
+    return len(items) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    interactions = make_interactions(args.rows)
+    dicts = [interaction.model_dump() for interaction in interactions]
+    tuples = [tuple(d.values()) for d in dicts]
+    candidates = [
+        (
+            "convert_obj_to_lists (original)",
+            quadratic_convert_obj_to_lists,
+            interactions,
+        ),
+        ("convert_obj_to_lists", convert_obj_to_lists, interactions),
+        ("RowEncoder.encode(models)", interaction_encoder.encode, interactions),
+        ("RowEncoder.encode(dicts)", interaction_encoder.encode, dicts),
+        ("RowEncoder.encode(tuples)", interaction_encoder.encode, tuples),
+    ]
+    baseline = None
+    for name, encode, items in candidates:
+        rate = rows_per_second(encode, items, args.repeat)
+        baseline = baseline or rate
+        print(f"{name:34} {rate:12,.0f} rows/s  x{rate / baseline:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Synthetic PATIENT/INTERACTION datasets for load tests.
+
+Writes ``Patient.csv`` and ``Interaction.csv`` with the columns and value
+shapes of the exports in ``data/`` (quoted comma-separated habits and labels,
+JSON ``metrics``/``qa``/``next_steps``/``related_docs``, sparse optional
+columns), plus the ``interaction_date`` of every interaction. Rows are
+streamed to disk, so sizes from 10K to 50M rows run in constant memory, and
+the same seed always gives the same files.
+
+Interactions are spread unevenly over patients: a few patients have long
+histories, most have a handful, as in a real clinic.
+
+The files load with ``utils/load_initial_data.py --data-dir <out>``.
+
+Usage:
+    python -m benchmarks.generate_data --patients 10000 --interactions 100000 --out /tmp/bench-data
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterator, Optional
+
+from utils.table_schemas import InteractionSchema, PatientSchema
+
+FIRST_NAMES = [
+    "Vernon",
+    "Beth",
+    "Anna",
+    "Jonas",
+    "Mia",
+    "Lukas",
+    "Emma",
+    "Noah",
+    "Lea",
+    "Paul",
+    "Sofia",
+    "Elias",
+    "Hannah",
+    "Felix",
+    "Marie",
+    "Leon",
+    "Clara",
+    "Ben",
+]
+LAST_NAMES = [
+    "Lopez",
+    "Martin",
+    "Müller",
+    "Schmidt",
+    "Schneider",
+    "Fischer",
+    "Weber",
+    "Meyer",
+    "Wagner",
+    "Becker",
+    "Hoffmann",
+    "Koch",
+    "Richter",
+    "Klein",
+    "Wolf",
+]
+STREETS = [
+    "Berliner Straße",
+    "Bahnhofstraße",
+    "Hauptstraße",
+    "Gartenstraße",
+    "Schulstraße",
+    "Dorfstraße",
+    "Lindenstraße",
+    "Kirchstraße",
+]
+HABITS = ["smoking", "drinking", "running", "cycling", "vegetarian", "night shifts"]
+CONDITIONS = ["Asthma", "Hypertension", "Obesity", "Diabetes", "Arthritis", "Migraine"]
+MEDICATIONS = ["GTH 30mg", "ABC 20mg", "DEF 4mg", "MNO 20mg", "XYZ 5mg"]
+BLOOD_TYPES = ["A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"]
+PROVIDERS = ["ABC", "DEF", "GHI", "JKL"]
+
+# (ailment, symptoms, labels) of a visit
+COMPLAINTS = [
+    ("Fever", "Elevated body temperature, often above 38°C", "fever"),
+    ("Bronchitis", "Persistent dry or productive (with mucus) cough", "fever, cold"),
+    ("Eczema", "dry skin", "skin"),
+    ("Gastritis", "stomach cramps", "gut"),
+    ("Dermatitis", "rash", "skin"),
+    ("Allergy", "itching, irritation", "skin, allergy"),
+    ("Anxiety", "uneasiness", "mental"),
+    ("Migraine", "migrane", "head"),
+    ("Common cold", "Sore throat, runny nose", "cold, fever"),
+    ("Angina", "Chest pain when climbing stairs", "heart"),
+    ("Back pain", "Lower back pain after lifting", "back"),
+    ("Food poisoning", "nausea, diarrhoea", "gut, fever"),
+]
+REMARKS = [
+    "visited other specialists",
+    "Patient is advised to rest",
+    "Follow up if symptoms persist",
+    "Referred for further tests",
+]
+QUESTIONS = {
+    "since": ["2 days", "4 days", "1 week", "4 weeks", "3 months"],
+    "Do you smoke?": ["Yes, daily", "No", "Occasionally"],
+    "Any allergies?": ["None", "Dust", "Pollen", "Penicillin"],
+}
+TESTS = ["MNO-A", "EMC-12", "PILKE-A", "Blood test", "X-ray", "ECG"]
+SPECIALISTS = ["cardiologist", "dermatologist", "ENT", "neurologist", "orthopedist"]
+
+FIRST_DATE = date(2018, 1, 1)
+DAYS = 6 * 365
+
+
+def patient_id(i: int) -> str:
+    """
+    Insurance number of the ``i``-th generated patient.
+
+    Args:
+        i (int): Position of the patient, from 0.
+
+    Returns:
+        str: The insurance number.
+    """
+    return f"P{i:08d}"
+
+
+def _maybe(rng: random.Random, probability: float, value) -> Optional[str]:
+    return value if rng.random() < probability else None
+
+
+def _json(value) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def generate_patients(n: int, seed: int = 0) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Generate patients as CSV rows.
+
+    Args:
+        n (int): Number of patients.
+        seed (int, optional): Seed of the random generator.
+
+    Yields:
+        Dict[str, Optional[str]]: The fields of a patient, JSON columns as text
+        and missing values as None.
+    """
+    rng = random.Random(seed)
+    for i in range(n):
+        fname, lname = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield {
+            "insurance_no": patient_id(i),
+            "fname": fname,
+            "lname": lname,
+            "addr": f"{rng.choice(STREETS)} {rng.randint(1, 999)}",
+            "age": str(rng.randint(0, 95)),
+            "sex": rng.choice("MF"),
+            "ph_no": f"01{rng.randint(50, 79)} {rng.randint(100000, 999999)}",
+            "email": _maybe(rng, 0.6, f"{fname}.{lname}{i}@example.com".lower()),
+            "related_docs": _maybe(rng, 0.2, _json([f"{patient_id(i)}-report.pdf"])),
+            "habits": _maybe(
+                rng, 0.5, ", ".join(rng.sample(HABITS, rng.randint(1, 2)))
+            ),
+            "pre_existing_conditions": _maybe(
+                rng, 0.4, ", ".join(rng.sample(CONDITIONS, rng.randint(1, 2)))
+            ),
+            "pre_existing_medications": _maybe(rng, 0.3, rng.choice(MEDICATIONS)),
+            "blood_type": rng.choice(BLOOD_TYPES),
+            "insurance_provider": rng.choice(PROVIDERS),
+        }
+
+
+def generate_interactions(
+    n: int, patients: int, seed: int = 0, first_id: int = 1
+) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Generate interactions of the generated patients as CSV rows.
+
+    Args:
+        n (int): Number of interactions.
+        patients (int): Number of generated patients the interactions belong to.
+        seed (int, optional): Seed of the random generator.
+        first_id (int, optional): Id of the first interaction.
+
+    Yields:
+        Dict[str, Optional[str]]: The fields of an interaction, JSON columns as
+        text and missing values as None.
+    """
+    rng = random.Random(seed + 1)
+    for i in range(first_id, first_id + n):
+        ailment, symptoms, label = rng.choice(COMPLAINTS)
+        # squaring skews the patients towards the first ones: long histories for few
+        patient = int(patients * rng.random() ** 2)
+        day = FIRST_DATE + timedelta(days=rng.randrange(DAYS))
+        metrics = {
+            "temp": round(rng.uniform(36.0, 39.5), 1),
+            "ECG": "Normal" if rng.random() < 0.95 else "STEMI",
+            "BP": f"{rng.randint(90, 150)}/{rng.randint(60, 95)}",
+        }
+        qa = None
+        if rng.random() < 0.3:
+            questions = rng.sample(list(QUESTIONS), rng.randint(1, 2))
+            qa = {q: rng.choice(QUESTIONS[q]) for q in questions}
+        next_steps = None
+        if rng.random() < 0.4:
+            next_steps = {
+                "next_visit": (day + timedelta(days=rng.randint(7, 60))).strftime(
+                    "%d-%m-%Y"
+                ),
+                "prescribed_meds": rng.sample(MEDICATIONS, rng.randint(1, 2)),
+                "prescribed_tests": rng.sample(TESTS, rng.randint(1, 2)),
+            }
+            if rng.random() < 0.3:
+                next_steps["prescribed_specialist"] = rng.choice(SPECIALISTS)
+        yield {
+            "id": str(i),
+            "insurance_no": patient_id(patient),
+            "ailment": _maybe(rng, 0.7, ailment),
+            "symptoms": _maybe(rng, 0.8, symptoms),
+            "interaction_date": day.isoformat(),
+            "metrics": _maybe(rng, 0.9, _json(metrics)),
+            "remarks": _maybe(rng, 0.2, rng.choice(REMARKS)),
+            "health_status": str(rng.randint(1, 10)),
+            "qa": _json(qa) if qa else None,
+            "next_steps": _json(next_steps) if next_steps else None,
+            "label": _maybe(rng, 0.9, label),
+        }
+
+
+def write_csv(
+    path: str, columns, rows: Iterator[Dict[str, Optional[str]]], progress: int = 0
+) -> int:
+    """
+    Stream rows into a CSV file with a header, missing values as empty fields.
+
+    Args:
+        path (str): The file to write.
+        columns: The columns, in order.
+        rows (Iterator[Dict[str, Optional[str]]]): The rows.
+        progress (int, optional): Print progress every ``progress`` rows, 0 for never.
+
+    Returns:
+        int: The number of rows written.
+    """
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(["" if row[c] is None else row[c] for c in columns])
+            written += 1
+            if progress and written % progress == 0:
+                print(f"{os.path.basename(path)}: {written} rows")
+    return written
+
+
+def generate(
+    out: str, patients: int, interactions: int, seed: int = 0, progress: int = 0
+) -> Dict[str, int]:
+    """
+    Write a dataset of patients and their interactions.
+
+    Args:
+        out (str): Output directory, created if missing.
+        patients (int): Number of patients.
+        interactions (int): Number of interactions.
+        seed (int, optional): Seed of the random generator.
+        progress (int, optional): Print progress every ``progress`` rows.
+
+    Returns:
+        Dict[str, int]: Rows written per file.
+    """
+    os.makedirs(out, exist_ok=True)
+    return {
+        "Patient.csv": write_csv(
+            os.path.join(out, "Patient.csv"),
+            [col.name for col in PatientSchema.columns],
+            generate_patients(patients, seed),
+            progress,
+        ),
+        "Interaction.csv": write_csv(
+            os.path.join(out, "Interaction.csv"),
+            [col.name for col in InteractionSchema.columns if not col.generated_from],
+            generate_interactions(interactions, patients, seed),
+            progress,
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--interactions", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench-data", help="Output directory")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    written = generate(
+        args.out, args.patients, args.interactions, args.seed, progress=1000000
+    )
+    print(f"{written} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+End-to-end load test of the API.
+
+Loads a synthetic dataset (see ``benchmarks.generate_data``) into a local
+SQLite database with the same bulk-load pipeline as ``load_initial_data.py``,
+starts the app in-process on that database, and drives every endpoint with
+``--concurrency`` concurrent clients, ``--requests`` requests per endpoint.
+Patients are drawn with the same skew as the generated interactions, so hot
+charts are requested more often, as in a clinic.
+
+Prints a JSON report with the commit, the configuration, the load time and,
+per endpoint, the throughput, the error count and the p50/p95/p99 latency, so
+runs can be compared across commits. With ``--url`` a running server is
+driven instead; its database must hold a dataset generated with the same
+``--patients``/``--interactions``/``--seed``.
+
+Usage:
+    python -m benchmarks.load_test [--patients 10000] [--interactions 100000]
+        [--concurrency 16] [--requests 500] [--endpoints labels,patient]
+        [--output report.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.bench_response import percentile
+from benchmarks.generate_data import (
+    generate,
+    generate_interactions,
+    patient_id,
+)
+from utils.settings import settings
+from utils.table_schemas import (
+    InteractionCountSchema,
+    InteractionLabelSchema,
+    InteractionSchema,
+    PatientHealthSchema,
+    PatientSchema,
+)
+
+SEARCH_QUERIES = ["chest pain", '"dry skin"', "fever", "cough mucus", "rash", "nausea"]
+
+
+class Workload:
+    """
+    Draws the parameters of the requests from the generated dataset.
+
+    Attributes:
+        patients (int): Number of generated patients.
+        rng (random.Random): Random generator of the requests.
+        next_id (Iterator[int]): Ids of the interactions created by the test.
+    """
+
+    def __init__(self, patients: int, first_id: int, seed: int = 0):
+        self.patients = patients
+        self.rng = random.Random(seed)
+        self.next_id = count(first_id)
+
+    def patient(self) -> str:
+        # same skew as generate_interactions
+        return patient_id(int(self.patients * self.rng.random() ** 2))
+
+    def interaction(self) -> Dict[str, Any]:
+        interaction_id = next(self.next_id)
+        row = next(
+            generate_interactions(1, self.patients, interaction_id, interaction_id)
+        )
+        for column in ("metrics", "qa", "next_steps"):
+            if row[column] is not None:
+                row[column] = json.loads(row[column])
+        return {k: v for k, v in row.items() if v is not None}
+
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+# endpoint name -> request builder
+ENDPOINTS: Dict[str, Callable[[Workload], Request]] = {
+    "patient": lambda w: ("GET", f"/patient/{w.patient()}/", {}),
+    "patient_fields": lambda w: (
+        "GET",
+        f"/patient/{w.patient()}/",
+        {"params": {"fields": "fname,lname,age"}},
+    ),
+    "patients": lambda w: (
+        "GET",
+        "/patients",
+        {"params": {"ids": ",".join(w.patient() for _ in range(10))}},
+    ),
+    "patients_lookup": lambda w: (
+        "POST",
+        "/patients/lookup",
+        {"json": {"insurance_nos": [w.patient() for _ in range(100)]}},
+    ),
+    "interactions": lambda w: (
+        "GET",
+        f"/interactions/{w.patient()}/",
+        {"params": {"limit": 10}},
+    ),
+    "interactions_labels": lambda w: (
+        "GET",
+        f"/interactions/{w.patient()}/",
+        {"params": {"labels": "fever,skin", "limit": 10}},
+    ),
+    "interactions_fields": lambda w: (
+        "GET",
+        f"/interactions/{w.patient()}/",
+        {"params": {"fields": "interaction_date,label", "limit": 50}},
+    ),
+    "search": lambda w: (
+        "GET",
+        "/interactions/search",
+        {"params": {"q": w.rng.choice(SEARCH_QUERIES)}},
+    ),
+    "search_patient": lambda w: (
+        "GET",
+        "/interactions/search",
+        {"params": {"q": w.rng.choice(SEARCH_QUERIES), "insurance_no": w.patient()}},
+    ),
+    "labels": lambda w: ("GET", "/labels", {}),
+    "aggregates_interactions": lambda w: (
+        "GET",
+        "/aggregates/interactions",
+        {"params": {"by": w.rng.choice(["label", "ailment", "month"])}},
+    ),
+    "aggregates_health_status": lambda w: (
+        "GET",
+        "/aggregates/health_status",
+        {"params": {"offset": w.rng.randrange(max(w.patients - 100, 1))}},
+    ),
+    "create_interaction": lambda w: (
+        "POST",
+        "/interactions/",
+        {"json": w.interaction()},
+    ),
+    "create_interactions_batch": lambda w: (
+        "POST",
+        "/interactions/batch",
+        {
+            "content": "\n".join(json.dumps(w.interaction()) for _ in range(20)),
+            "headers": {"Content-Type": "application/x-ndjson"},
+        },
+    ),
+    "system_stats": lambda w: ("GET", "/system/stats", {}),
+    "metrics": lambda w: ("GET", "/metrics", {}),
+}
+
+
+def git_commit() -> Optional[str]:
+    """
+    The commit of the working tree, to tell reports apart.
+
+    Returns:
+        Optional[str]: The commit hash, None outside of a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_database(db_path: str, data_dir: str) -> float:
+    """
+    Create the tables in an SQLite database and bulk load the generated CSVs.
+
+    Args:
+        db_path (str): The database file.
+        data_dir (str): Directory holding ``Patient.csv`` and ``Interaction.csv``.
+
+    Returns:
+        float: Seconds spent loading.
+    """
+    from utils.backends import SQLiteBackend
+    from utils.bulk_loader import BulkLoader
+    from utils.data_utils import DataUtils
+    from utils.ingest import ingest_csv
+
+    started = time.perf_counter()
+    backend = SQLiteBackend(db_path)
+    conn = backend.connect()
+    data_utils = DataUtils(conn, placeholder=backend.placeholder)
+    for schema in (
+        PatientSchema,
+        InteractionSchema,
+        InteractionLabelSchema,
+        InteractionCountSchema,
+        PatientHealthSchema,
+    ):
+        data_utils.create_table(schema=schema)
+    for file_name, schema in (
+        ("Patient.csv", PatientSchema),
+        ("Interaction.csv", InteractionSchema),
+    ):
+        with BulkLoader(data_utils, schema=schema, rebuild_indexes=True) as loader:
+            ingest_csv(
+                path=os.path.join(data_dir, file_name),
+                table=schema.name,
+                insert=loader.insert,
+            )
+        print(loader.report())
+    conn.close()
+    return time.perf_counter() - started
+
+
+async def run_endpoint(
+    client: httpx.AsyncClient,
+    build: Callable[[Workload], Request],
+    workload: Workload,
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """
+    Send requests to one endpoint from concurrent clients.
+
+    Args:
+        client (httpx.AsyncClient): The client.
+        build (Callable[[Workload], Request]): Builds the method, URL and
+            arguments of a request.
+        workload (Workload): Source of the request parameters.
+        requests (int): Number of requests.
+        concurrency (int): Number of concurrent clients.
+
+    Returns:
+        Dict[str, Any]: Requests, errors, throughput and latency percentiles.
+    """
+    remaining = iter(range(requests))
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+
+    async def client_loop():
+        for _ in remaining:
+            method, url, kwargs = build(workload)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": sum(n for status, n in statuses.items() if status >= 400),
+        "statuses": {str(status): n for status, n in sorted(statuses.items())},
+        "seconds": round(seconds, 3),
+        "throughput": round(len(latencies) / seconds, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3),
+        },
+    }
+
+
+async def wait_for_search_index(client: httpx.AsyncClient, timeout: float = 600.0):
+    """
+    Wait until the search index of the app is built, if it has one.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        index = (await client.get("/system/stats")).json().get("search_index")
+        if not index or index["ready"]:
+            return
+        await asyncio.sleep(0.5)
+
+
+async def drive(args: argparse.Namespace, endpoints: List[str]) -> Dict[str, Any]:
+    """
+    Drive the endpoints one after the other and collect their results.
+    """
+    async with AsyncExitStack() as stack:
+        if args.url:
+            client = httpx.AsyncClient(base_url=args.url, timeout=60)
+        else:
+            from app import app
+
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://app",
+                timeout=60,
+            )
+        await stack.enter_async_context(client)
+        await wait_for_search_index(client)
+        workload = Workload(args.patients, args.interactions + 1, args.seed)
+        results = {}
+        for name in endpoints:
+            results[name] = await run_endpoint(
+                client, ENDPOINTS[name], workload, args.requests, args.concurrency
+            )
+            print(f"{name}: {results[name]['throughput']} req/s", flush=True)
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--interactions", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--data-dir", help="Generated CSVs, created if missing (default: temporary)"
+    )
+    parser.add_argument(
+        "--db-path", help="SQLite database, loaded if missing (default: temporary)"
+    )
+    parser.add_argument("--url", help="Drive a running server instead of the app")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="Per endpoint")
+    parser.add_argument(
+        "--endpoints",
+        default=",".join(ENDPOINTS),
+        help=f"Comma-separated subset of {', '.join(ENDPOINTS)}",
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    endpoints = [name for name in args.endpoints.split(",") if name]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    load_seconds = None
+    if not args.url:
+        args.data_dir = args.data_dir or os.path.join(tmp_dir.name, "data")
+        args.db_path = args.db_path or os.path.join(tmp_dir.name, "bench.db")
+        # the backend of the app is created from the settings when it is imported
+        settings.db_backend = "sqlite"
+        settings.db_path = args.db_path
+        if not os.path.exists(os.path.join(args.data_dir, "Interaction.csv")):
+            generate(args.data_dir, args.patients, args.interactions, args.seed)
+        if not os.path.exists(args.db_path):
+            load_seconds = round(load_database(args.db_path, args.data_dir), 3)
+
+    report = {
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "patients": args.patients,
+            "interactions": args.interactions,
+            "seed": args.seed,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "target": args.url or f"in-process, sqlite {args.db_path}",
+        },
+        "load_seconds": load_seconds,
+        "endpoints": asyncio.run(drive(args, endpoints)),
+    }
+    tmp_dir.cleanup()
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -113,3 +113,82 @@ class Patient(BaseModel):
     pre_existing_medications: Optional[str] = None
     blood_type: Optional[str] = None
     insurance_provider: str
+
+
+class PatientLookup(BaseModel):
+    """
+    A class to represent a request for several patients at once.
+
+    Attributes:
+        insurance_nos (List[str]): The insurance numbers of the patients.
+    """
+
+    insurance_nos: List[str]
+
+
+class ScoredInteraction(BaseModel):
+    """
+    A class to represent an interaction found by a search.
+
+    Attributes:
+        score (float): The relevance of the interaction to the query.
+        interaction (Interaction): The interaction.
+    """
+
+    score: float
+    interaction: Interaction
+
+
+class InteractionSearchPage(BaseModel):
+    """
+    A class to represent a page of search results.
+
+    Attributes:
+        total (int): The number of interactions matching the query.
+        results (List[ScoredInteraction]): The interactions of the page, best first.
+    """
+
+    total: int
+    results: List[ScoredInteraction]
+
+
+class GroupCount(BaseModel):
+    """
+    A class to represent the number of interactions of a group.
+
+    Attributes:
+        value (str): The label, ailment or month (``YYYY-MM``) of the group.
+        count (int): The number of interactions in the group.
+    """
+
+    value: str
+    count: int
+
+
+class PatientHealth(BaseModel):
+    """
+    A class to represent the health status summary of a patient.
+
+    Attributes:
+        insurance_no (str): The patient's insurance number.
+        interactions (int): The number of interactions of the patient.
+        average_health_status (Optional[float]): The average health status over
+            the interactions that recorded one.
+    """
+
+    insurance_no: str
+    interactions: int
+    average_health_status: Optional[float] = None
+
+
+class LabelCount(BaseModel):
+    """
+    A class to represent how many interactions carry a label.
+
+    Attributes:
+        label (str): The normalized label.
+        count (int): The number of interactions with the label.
+    """
+
+    label: str
+    count: int
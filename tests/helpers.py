@@ -0,0 +1,38 @@
+import os
+import sqlite3
+
+from utils.data_utils import DataUtils
+from utils.table_schemas import (
+    InteractionCountSchema,
+    InteractionLabelSchema,
+    InteractionSchema,
+    PatientHealthSchema,
+    PatientSchema,
+)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+SCHEMAS = [
+    PatientSchema,
+    InteractionSchema,
+    InteractionLabelSchema,
+    InteractionCountSchema,
+    PatientHealthSchema,
+]
+
+
+def create_tables(data_utils: DataUtils):
+    """
+    Create the tables of the schemas, with their generated columns and indexes.
+    """
+    for schema in SCHEMAS:
+        data_utils.create_table(schema=schema)
+
+
+def sqlite_database():
+    """
+    Create an in-memory database with the tables of the schemas.
+    """
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    create_tables(DataUtils(conn, placeholder="?"))
+    return conn
@@ -1,8 +1,14 @@
 import unittest
 from unittest.mock import MagicMock
 from fastapi.testclient import TestClient
+import app as app_module
 from app import app  
-from utils.data_utils import DataUtils
+from datamodel.models import GroupCount, Interaction, Patient
+from utils.async_data_utils import AsyncDataUtils
+from utils.row_codec import InvalidFieldsError
+from utils.search_index import SearchIndex
+from utils.settings import settings
+from utils.write_coalescer import WriteCoalescer
 from unittest.mock import MagicMock, patch
 
 class TestApp(unittest.TestCase):
@@ -11,10 +17,12 @@ class TestApp(unittest.TestCase):
     """
     def setUp(self):
         """
-        Set up the test client and mock SQL instance for each test.
+        Set up the test client and mock SQL instance, and empty the response
+        cache, for each test.
         """
         self.client = TestClient(app)
         self.mock_sql_instance = MagicMock()
+        app_module.response_cache.clear()
 
     def test_read_main(self):
         """
@@ -25,12 +33,12 @@ class TestApp(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {"msg": "Hello World"})
 
-    @patch.object(DataUtils, 'get_patient_by_insurance_no')
-    @patch.object(DataUtils, 'insert_interactions')
+    @patch.object(AsyncDataUtils, 'get_patient_by_insurance_no')
+    @patch.object(AsyncDataUtils, 'insert_interactions')
     def test_create_interactions(self, mock_insert_interactions, mock_get_patient_by_insurance_no):
         """
         Test the endpoint for creating patient interactions. Mocks the
-        DataUtils methods to test the creation process without a real database.
+        AsyncDataUtils methods to test the creation process without a real database.
         
         Args:
             mock_insert_interactions: Mock for the insert_interactions method.
@@ -79,19 +87,38 @@ class TestApp(unittest.TestCase):
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.json(), {"message": "Patient Interaction created successfully"})
 
-    @patch.object(DataUtils, 'get_patient_by_insurance_no')
-    @patch.object(DataUtils, 'insert_interactions')
+    @patch.object(AsyncDataUtils, 'get_patient_by_insurance_no')
+    @patch.object(AsyncDataUtils, 'insert_interactions')
+    def test_create_interactions_coalesced(self, mock_insert_interactions, mock_get_patient_by_insurance_no):
+        """
+        Test that with the write coalescer the interaction is inserted by the
+        coalescer, in a transaction of its own batch.
+        """
+        mock_get_patient_by_insurance_no.return_value = [
+            Patient(insurance_no="123", fname="John", lname="Doe", sex="M", insurance_provider="XYZ Insurance")
+        ]
+        coalescer = WriteCoalescer(app_module.insert_interaction_group, window=0.001)
+        with patch.object(app_module, 'write_coalescer', coalescer):
+            response = self.client.post("/interactions/", json={"id": 18, "insurance_no": "123"})
+        self.assertEqual(response.status_code, 201)
+        interactions = mock_insert_interactions.call_args.args[0]
+        self.assertEqual([interaction.id for interaction in interactions], [18])
+        self.assertEqual(mock_insert_interactions.call_args.kwargs, {'batch_size': 1, 'atomic': True})
+        self.assertEqual(coalescer.stats()["batches"], 1)
+
+    @patch.object(AsyncDataUtils, 'get_patient_by_insurance_no')
+    @patch.object(AsyncDataUtils, 'insert_interactions')
     def test_get_interactions(self, mock_insert_interactions, mock_get_patient_by_insurance_no):
         """
         Test the endpoint for retrieving interactions by insurance number.
-        Mocks the DataUtils methods to simulate database operations.
+        Mocks the AsyncDataUtils methods to simulate database operations.
         
         Args:
             mock_insert_interactions: Mock for the insert_interactions method.
             mock_get_patient_by_insurance_no: Mock for the get_patient_by_insurance_no method.
         """
         mock_get_patient_by_insurance_no.return_value = [
-            {
+            Patient(**{
                 "insurance_no": "111",
                 "fname": "Vernon",
                 "lname": "Lopez",
@@ -106,7 +133,7 @@ class TestApp(unittest.TestCase):
                 "pre_existing_medications": "GTH 30mg",
                 "blood_type": "B+",
                 "insurance_provider": "ABC"
-            }
+            })
         ]
         mock_insert_interactions.return_value = [{
             "id": 18,
@@ -131,17 +158,166 @@ class TestApp(unittest.TestCase):
         assert response.status_code == 200
         assert response.json()[0]["insurance_no"] == "111"
 
-    @patch.object(DataUtils, 'get_patient_by_insurance_no')
+    @patch.object(AsyncDataUtils, 'get_patient_by_insurance_no')
+    @patch.object(AsyncDataUtils, 'get_interaction_page')
+    def test_get_interactions_next_cursor(self, mock_get_interaction_page, mock_get_patient_by_insurance_no):
+        """
+        Test that the cursor of the next page is returned in the X-Next-Cursor header
+        and that a malformed cursor is rejected.
+
+        Args:
+            mock_get_interaction_page: Mock for the get_interaction_page method.
+            mock_get_patient_by_insurance_no: Mock for the get_patient_by_insurance_no method.
+        """
+        mock_get_patient_by_insurance_no.return_value = [{"insurance_no": "111"}]
+        mock_get_interaction_page.return_value = (
+            [Interaction(id=18, insurance_no="111", label="Cough")],
+            "next-page",
+        )
+
+        response = self.client.get("/interactions/111/?limit=1")
+        assert response.status_code == 200
+        assert response.headers["X-Next-Cursor"] == "next-page"
+        assert response.json()[0]["id"] == 18
+
+        response = self.client.get("/interactions/111/?cursor=abc&offset=2")
+        assert response.status_code == 400
+
+    @patch.object(settings, 'fast_json', True)
+    @patch.object(AsyncDataUtils, 'get_patient_by_insurance_no')
+    @patch.object(AsyncDataUtils, 'get_interaction_page_json')
+    def test_get_interactions_fast_json(self, mock_get_interaction_page_json, mock_get_patient_by_insurance_no):
+        """
+        Test that with fast_json enabled the serialized page is sent as is,
+        together with the X-Next-Cursor header.
+
+        Args:
+            mock_get_interaction_page_json: Mock for the get_interaction_page_json method.
+            mock_get_patient_by_insurance_no: Mock for the get_patient_by_insurance_no method.
+        """
+        mock_get_patient_by_insurance_no.return_value = [{"insurance_no": "111"}]
+        mock_get_interaction_page_json.return_value = (
+            b'[{"id":18,"insurance_no":"111","label":"Cough"}]',
+            "next-page",
+        )
+
+        response = self.client.get("/interactions/111/?limit=1")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.headers["X-Next-Cursor"] == "next-page"
+        assert response.json() == [{"id": 18, "insurance_no": "111", "label": "Cough"}]
+
+    @patch.object(AsyncDataUtils, 'existing_insurance_nos')
+    @patch.object(AsyncDataUtils, 'insert_interactions')
+    def test_create_interactions_batch(self, mock_insert_interactions, mock_existing_insurance_nos):
+        """
+        Test the endpoint for creating interactions in bulk from an NDJSON body.
+        Patients are checked with one query and valid records inserted together.
+
+        Args:
+            mock_insert_interactions: Mock for the insert_interactions method.
+            mock_existing_insurance_nos: Mock for the existing_insurance_nos method.
+        """
+        mock_existing_insurance_nos.return_value = {"111"}
+        body = (
+            '{"id": 18, "insurance_no": "111", "label": "Cough"}\n'
+            '{"id": 19, "insurance_no": "222"}\n'
+            '{"id": 20, "insurance_no": "111"}\n'
+        )
+
+        response = self.client.post(
+            "/interactions/batch", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 207
+        assert [r["status"] for r in response.json()["results"]] == ["created", "rejected", "created"]
+        mock_existing_insurance_nos.assert_called_once()
+        mock_insert_interactions.assert_called_once()
+
+    @patch.object(AsyncDataUtils, 'get_interactions_by_ids')
+    def test_search_interactions(self, mock_get_interactions_by_ids):
+        """
+        Test the search endpoint with a small search index, and that searching is
+        refused while the index is being built.
+
+        Args:
+            mock_get_interactions_by_ids: Mock for the get_interactions_by_ids method.
+        """
+        interaction = Interaction(id=7, insurance_no="111", symptoms="Chest pain")
+        index = SearchIndex()
+        index.add([interaction])
+        mock_get_interactions_by_ids.return_value = [interaction]
+
+        with patch.object(app_module, 'search_index', index):
+            response = self.client.get("/interactions/search?q=chest")
+            assert response.status_code == 503
+
+            index.ready = True
+            response = self.client.get('/interactions/search?q="chest pain"&insurance_no=111')
+            assert response.status_code == 200
+            assert response.json()["total"] == 1
+            assert response.json()["results"][0]["interaction"]["id"] == 7
+            mock_get_interactions_by_ids.assert_called_with([7])
+
+    @patch.object(AsyncDataUtils, 'get_interaction_counts')
+    def test_get_interaction_aggregates(self, mock_get_interaction_counts):
+        """
+        Test the endpoint counting interactions per dimension, and that unknown
+        dimensions are rejected.
+
+        Args:
+            mock_get_interaction_counts: Mock for the get_interaction_counts method.
+        """
+        mock_get_interaction_counts.return_value = [GroupCount(value="2024-01", count=3)]
+
+        response = self.client.get("/aggregates/interactions?by=month")
+        assert response.status_code == 200
+        assert response.json() == [{"value": "2024-01", "count": 3}]
+        mock_get_interaction_counts.assert_called_once_with("month")
+
+        response = self.client.get("/aggregates/interactions?by=doctor")
+        assert response.status_code == 422
+
+    @patch.object(AsyncDataUtils, 'get_patients_by_insurance_nos')
+    def test_get_patients(self, mock_get_patients_by_insurance_nos):
+        """
+        Test the endpoints retrieving several patients at once, with ids in the
+        query string or in the request body.
+
+        Args:
+            mock_get_patients_by_insurance_nos: Mock for the get_patients_by_insurance_nos method.
+        """
+        mock_get_patients_by_insurance_nos.return_value = [
+            Patient(insurance_no="111", fname="Vernon", lname="Lopez", sex="M", insurance_provider="ABC"),
+            Patient(insurance_no="222", fname="Beth", lname="Martin", sex="F", insurance_provider="DEF"),
+        ]
+
+        response = self.client.get("/patients?ids=111,222&ids=333")
+        assert response.status_code == 200
+        assert [p["insurance_no"] for p in response.json()] == ["111", "222"]
+        mock_get_patients_by_insurance_nos.assert_called_with(["111", "222", "333"], fields=None)
+
+        response = self.client.post("/patients/lookup", json={"insurance_nos": ["111", "222"]})
+        assert response.status_code == 200
+        mock_get_patients_by_insurance_nos.assert_called_with(["111", "222"], fields=None)
+
+        response = self.client.post("/patients/lookup?fields=fname", json={"insurance_nos": ["111", "222"]})
+        assert response.status_code == 200
+        mock_get_patients_by_insurance_nos.assert_called_with(["111", "222"], fields=["fname"])
+
+        response = self.client.post("/patients/lookup", json={"insurance_nos": []})
+        assert response.status_code == 400
+
+    @patch.object(AsyncDataUtils, 'get_patient_by_insurance_no')
     def test_get_patient_info_existent_insurance_no(self, mock_get_patient_by_insurance_no):
         """
         Test the endpoint for retrieving patient information by an existing
-        insurance number. Mocks the DataUtils method to simulate a database call.
+        insurance number. Mocks the AsyncDataUtils method to simulate a database call.
         
         Args:
             mock_get_patient_by_insurance_no: Mock for the get_patient_by_insurance_no method.
         """
         mock_get_patient_by_insurance_no.return_value = [
-            {
+            Patient(**{
                 "insurance_no": "111",
                 "fname": "Vernon",
                 "lname": "Lopez",
@@ -156,18 +332,83 @@ class TestApp(unittest.TestCase):
                 "pre_existing_medications": "GTH 30mg",
                 "blood_type": "B+",
                 "insurance_provider": "ABC"
-            }
+            })
         ]
 
         response = self.client.get("/patient/111/")
         assert response.status_code == 200
         assert response.json()[0]["insurance_no"] == "111"
 
-    @patch.object(DataUtils, 'get_patient_by_insurance_no')
+    @patch.object(AsyncDataUtils, 'get_patient_by_insurance_no')
+    def test_get_patient_info_etag(self, mock_get_patient_by_insurance_no):
+        """
+        Test that patient responses are cached with an ETag, that a matching
+        If-None-Match gets a 304, and that a write to the patient drops the response.
+
+        Args:
+            mock_get_patient_by_insurance_no: Mock for the get_patient_by_insurance_no method.
+        """
+        mock_get_patient_by_insurance_no.return_value = [Patient(insurance_no="111", fname="Vernon", lname="Lopez", sex="M", insurance_provider="ABC")]
+
+        response = self.client.get("/patient/111/")
+        etag = response.headers["ETag"]
+        response = self.client.get("/patient/111/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        mock_get_patient_by_insurance_no.assert_called_once()
+
+        mock_get_patient_by_insurance_no.return_value = [Patient(insurance_no="111", fname="Vernon", lname="Martin", sex="M", insurance_provider="ABC")]
+        app_module.response_cache.invalidate("111")
+        response = self.client.get("/patient/111/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert response.json()[0]["lname"] == "Martin"
+
+    @patch.object(AsyncDataUtils, 'get_patient_by_insurance_no')
+    def test_get_metrics(self, mock_get_patient_by_insurance_no):
+        """
+        Test that served requests and their serialization show up, labeled with
+        the endpoint, in the Prometheus metrics.
+
+        Args:
+            mock_get_patient_by_insurance_no: Mock for the get_patient_by_insurance_no method.
+        """
+        mock_get_patient_by_insurance_no.return_value = [Patient(insurance_no="111", fname="Vernon", lname="Lopez", sex="M", insurance_provider="ABC")]
+
+        self.client.get("/patient/111/")
+        response = self.client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_request_duration_seconds_count{method="GET",endpoint="get_patient_info",status="200"}' in response.text
+        assert 'endpoint_stage_duration_seconds_count{endpoint="get_patient_info",stage="serialize"}' in response.text
+
+    @patch.object(AsyncDataUtils, 'get_patient_by_insurance_no')
+    def test_get_patient_info_fields(self, mock_get_patient_by_insurance_no):
+        """
+        Test that the fields parameter is passed down and only the requested
+        fields and the key are returned, and that unknown fields are rejected.
+
+        Args:
+            mock_get_patient_by_insurance_no: Mock for the get_patient_by_insurance_no method.
+        """
+        mock_get_patient_by_insurance_no.return_value = [
+            Patient.model_construct(_fields_set={"insurance_no", "age"}, insurance_no="111", age=30)
+        ]
+
+        response = self.client.get("/patient/111/?fields=age")
+        assert response.status_code == 200
+        assert response.json() == [{"insurance_no": "111", "age": 30}]
+        mock_get_patient_by_insurance_no.assert_called_with("111", fields=["age"])
+
+        mock_get_patient_by_insurance_no.side_effect = InvalidFieldsError("Unknown fields: shoe_size")
+        response = self.client.get("/patient/111/?fields=shoe_size")
+        assert response.status_code == 400
+
+    @patch.object(AsyncDataUtils, 'get_patient_by_insurance_no')
     def test_get_patient_info_nonexistent_insurance_no(self, mock_get_patient_by_insurance_no):
         """
         Test the endpoint for retrieving patient information by a nonexistent
-        insurance number. Mocks the DataUtils method to simulate a database call.
+        insurance number. Mocks the AsyncDataUtils method to simulate a database call.
         
         Args:
             mock_get_patient_by_insurance_no: Mock for the get_patient_by_insurance_no method.
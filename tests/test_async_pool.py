@@ -0,0 +1,124 @@
+import asyncio
+import sqlite3
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from utils.async_data_utils import AsyncDataUtils
+from utils.async_pool import (
+    AsyncConnectionPool,
+    ThreadedAsyncConnection,
+    ThreadedAsyncDriver,
+)
+from utils.connection_pool import PoolTimeoutError
+
+
+def sqlite_connect():
+    """
+    Open an in-memory SQLite database holding a single patient.
+    """
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.execute(
+        "CREATE TABLE PATIENT (insurance_no TEXT, fname TEXT, lname TEXT, addr TEXT, "
+        "age INT, sex TEXT, ph_no TEXT, email TEXT, related_docs TEXT, habits TEXT, "
+        "pre_existing_conditions TEXT, pre_existing_medications TEXT, "
+        "blood_type TEXT, insurance_provider TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO PATIENT VALUES ('A11', 'Vernon', 'Lopez', NULL, 30, 'M', NULL, "
+        "NULL, NULL, NULL, NULL, NULL, 'B+', 'ABC')"
+    )
+    return conn
+
+
+class TestAsyncConnectionPool(unittest.IsolatedAsyncioTestCase):
+    """
+    Test suite for the AsyncConnectionPool and AsyncDataUtils classes.
+    """
+
+    async def asyncSetUp(self):
+        """
+        Create a pool of threaded SQLite connections before each test.
+        """
+        self.pool = AsyncConnectionPool(
+            driver=ThreadedAsyncDriver(sqlite_connect), max_size=2, timeout=0.2
+        )
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+    async def test_fetch_patient(self):
+        """
+        Test that AsyncDataUtils reads a patient through the pool.
+        """
+        patients = await AsyncDataUtils(
+            self.pool, placeholder="?"
+        ).get_patient_by_insurance_no("A11")
+        self.assertEqual(len(patients), 1)
+        self.assertEqual(patients[0].fname, "Vernon")
+        self.assertEqual(self.pool.stats()["in_use"], 0)
+
+    async def test_concurrent_operations_share_the_pool(self):
+        """
+        Test that more concurrent operations than connections all complete.
+        """
+        data_utils = AsyncDataUtils(self.pool, placeholder="?")
+        results = await asyncio.gather(
+            *[data_utils.get_patient_by_insurance_no("A11") for _ in range(10)]
+        )
+        self.assertEqual(len(results), 10)
+        self.assertLessEqual(self.pool.stats()["size"], 2)
+
+    async def test_times_out_when_exhausted(self):
+        """
+        Test that acquiring beyond max_size raises PoolTimeoutError.
+        """
+        await self.pool.acquire()
+        await self.pool.acquire()
+        with self.assertRaises(PoolTimeoutError):
+            await self.pool.acquire()
+
+    async def test_recycles_idle_connection(self):
+        """
+        Test that connections idle for longer than max_idle_time are recycled,
+        with the same counters as the synchronous pool.
+        """
+        self.pool.max_idle_time = 0.01
+        async with self.pool.connection() as conn:
+            pass
+        await asyncio.sleep(0.02)
+        async with self.pool.connection() as fresh:
+            self.assertIsNot(fresh, conn)
+        stats = self.pool.stats()
+        self.assertEqual(stats["recycled"], 1)
+        self.assertEqual(stats["created"], 2)
+        self.assertEqual(stats["acquired"], 2)
+
+    async def test_threaded_connection_runs_on_its_own_thread(self):
+        """
+        Test that the calls of a threaded connection run on a thread of its own,
+        so that a call blocked on a lock never delays another connection.
+        """
+        threads = []
+        blocking, waiting = MagicMock(), MagicMock()
+        released = threading.Event()
+        blocking.commit.side_effect = lambda: released.wait(5)
+        waiting.commit.side_effect = lambda: threads.append(threading.get_ident())
+        waiting.rollback.side_effect = lambda: threads.append(threading.get_ident())
+        blocked = ThreadedAsyncConnection(blocking)
+        conn = ThreadedAsyncConnection(waiting)
+
+        pending = asyncio.ensure_future(blocked.commit())
+        await asyncio.wait_for(conn.commit(), 1)
+        await conn.rollback()
+        released.set()
+        await pending
+        await blocked.close()
+        await conn.close()
+
+        self.assertEqual(len(set(threads)), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import date
+
+from datamodel.models import Interaction, Patient
+from tests.helpers import create_tables
+from utils.async_data_utils import AsyncDataUtils
+from utils.async_pool import AsyncConnectionPool
+from utils.backends import MemoryBackend, SQLiteBackend
+from utils.bulk_loader import BulkLoader
+from utils.data_utils import DataUtils
+from utils.sql_query_builder import SQLQueryBuilder
+from utils.table_schemas import InteractionSchema
+
+
+class TestSQLiteBackend(unittest.TestCase):
+    """
+    Test suite for the embedded SQLite backend.
+    """
+
+    def setUp(self):
+        """
+        Create the tables from the schemas in a temporary database file.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.backend = SQLiteBackend(os.path.join(self.tmp_dir.name, "test.db"))
+        self.conn = self.backend.connect()
+        self.data_utils = DataUtils(self.conn, placeholder=self.backend.placeholder)
+        create_tables(self.data_utils)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp_dir.cleanup()
+
+    def test_pragmas(self):
+        """
+        Test that connections use the write-ahead log and enforce foreign keys.
+        """
+        self.assertEqual(self.conn.execute("PRAGMA journal_mode").fetchone(), ("wal",))
+        self.assertEqual(self.conn.execute("PRAGMA foreign_keys").fetchone(), (1,))
+        self.assertEqual(self.data_utils.dialect, "sqlite")
+
+    def test_schema_indexes(self):
+        """
+        Test that the indexes of the schemas are created with the tables.
+        """
+        self.assertEqual(self.data_utils.create_missing_indexes(InteractionSchema), [])
+        names = {
+            row[0]
+            for row in self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )
+        }
+        for index in InteractionSchema.indexes:
+            self.assertIn(index.name, names)
+        query = (
+            SQLQueryBuilder("?")
+            .drop_index("INTERACTION", "idx_x", "sqlite")
+            .construct_query()
+        )
+        self.assertEqual(query, "DROP INDEX idx_x;")
+
+    def test_query_paths(self):
+        """
+        Test that writes and reads run unchanged on SQLite, including the
+        derived label and summary rows, and that foreign keys are enforced.
+        """
+        self.data_utils.insert_patients(
+            [
+                Patient(
+                    insurance_no="A11",
+                    fname="Vernon",
+                    lname="Lopez",
+                    sex="M",
+                    insurance_provider="ABC",
+                )
+            ]
+        )
+        BulkLoader(self.data_utils, InteractionSchema).insert(
+            [
+                Interaction(
+                    id=i,
+                    insurance_no="A11",
+                    interaction_date=date(2024, 1, 1 + i),
+                    label="fever",
+                )
+                for i in range(3)
+            ]
+        )
+        page, next_cursor = self.data_utils.get_interaction_page(
+            "A11", labels="fever", limit=2
+        )
+        self.assertEqual([interaction.id for interaction in page], [0, 1])
+        self.assertIsNotNone(next_cursor)
+        self.assertEqual(self.data_utils.get_interaction_counts("month")[0].count, 3)
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.data_utils.insert_interactions([Interaction(id=9, insurance_no="Z99")])
+        with self.assertRaises(ValueError):
+            BulkLoader(self.data_utils, InteractionSchema, method="infile")
+
+
+class TestMemoryBackend(unittest.IsolatedAsyncioTestCase):
+    """
+    Test suite for the in-memory backend.
+    """
+
+    async def test_async_pool(self):
+        """
+        Test that the connections of a backend share one in-memory database and
+        that the asyncio pool runs the async data utilities on it.
+        """
+        backend = MemoryBackend()
+        create_tables(DataUtils(backend.connect(), placeholder="?"))
+        other = MemoryBackend()
+        self.assertEqual(
+            other.connect().execute("SELECT name FROM sqlite_master").fetchall(), []
+        )
+
+        pool = AsyncConnectionPool(driver=backend.async_driver(), max_size=1)
+        data_utils = AsyncDataUtils(pool, placeholder=backend.placeholder)
+        await data_utils.insert_patients(
+            [
+                Patient(
+                    insurance_no="A11",
+                    fname="Vernon",
+                    lname="Lopez",
+                    sex="M",
+                    insurance_provider="ABC",
+                )
+            ]
+        )
+        patients = await data_utils.get_patient_by_insurance_no("A11")
+        self.assertEqual(patients[0].lname, "Lopez")
+        await pool.close()
+
+    async def test_async_atomic_insert_rolls_back(self):
+        """
+        Test that the async data utilities run the shared insert operation: a
+        failing atomic insert leaves neither interactions nor derived rows.
+        """
+        backend = MemoryBackend()
+        sync_utils = DataUtils(backend.connect(), placeholder="?")
+        create_tables(sync_utils)
+        sync_utils.insert_patients(
+            [
+                Patient(
+                    insurance_no="A11",
+                    fname="Vernon",
+                    lname="Lopez",
+                    sex="M",
+                    insurance_provider="ABC",
+                )
+            ]
+        )
+        pool = AsyncConnectionPool(driver=backend.async_driver(), max_size=1)
+        data_utils = AsyncDataUtils(pool, placeholder=backend.placeholder)
+        with self.assertRaises(sqlite3.IntegrityError):
+            await data_utils.insert_interactions(
+                [
+                    Interaction(id=1, insurance_no="A11", label="fever"),
+                    Interaction(id=1, insurance_no="A11", label="cough"),
+                ],
+                batch_size=1,
+                atomic=True,
+            )
+        self.assertEqual(await data_utils.get_label_counts(), [])
+        self.assertEqual(await data_utils.get_patient_health(), [])
+        await data_utils.insert_interactions(
+            [Interaction(id=1, insurance_no="A11", label="fever")]
+        )
+        self.assertEqual(sync_utils.get_interaction_counts("label")[0].count, 1)
+        await pool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
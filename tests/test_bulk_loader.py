@@ -0,0 +1,116 @@
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from datamodel.models import Interaction
+from tests.helpers import sqlite_database
+from utils.bulk_loader import BulkLoader, infile_value
+from utils.data_utils import DataUtils
+from utils.table_schemas import InteractionSchema, TableSchema
+
+
+def make_interactions(n):
+    return [
+        Interaction(id=i, insurance_no="A11", metrics={"temp": 37}, label="fever")
+        for i in range(n)
+    ]
+
+
+class TestBulkLoader(unittest.TestCase):
+    """
+    Test suite for the BulkLoader class.
+    """
+
+    def test_multi_row_values(self):
+        """
+        Test that records are inserted with multi-row statements, together with
+        their labels and summary counts, in one transaction.
+        """
+        conn = sqlite_database()
+        loader = BulkLoader(
+            DataUtils(conn, placeholder="?"), InteractionSchema, rows_per_statement=3
+        )
+        records = make_interactions(6) + [{"id": 6, "insurance_no": "B11"}]
+        loader.insert(records)
+        self.assertEqual(
+            conn.execute("SELECT COUNT(*) FROM INTERACTION").fetchone(), (7,)
+        )
+        self.assertEqual(
+            conn.execute("SELECT COUNT(*) FROM INTERACTION_LABEL").fetchone(), (6,)
+        )
+        self.assertEqual(
+            conn.execute("SELECT * FROM PATIENT_HEALTH").fetchall(),
+            [("A11", 6, 0, 0), ("B11", 1, 0, 0)],
+        )
+        report = loader.report()
+        self.assertEqual((report.rows, report.transactions), (7, 1))
+        self.assertGreater(report.rows_per_second, 0)
+
+    def test_load_data_infile(self):
+        """
+        Test that the infile method sends a tab-separated file through LOAD DATA.
+        """
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+        contents = []
+        cursor.execute.side_effect = lambda query, params: (
+            contents.append(open(params[0]).read())
+            if query.startswith("LOAD DATA")
+            else None
+        )
+        loader = BulkLoader(DataUtils(conn), InteractionSchema, method="infile")
+        loader.insert(make_interactions(2))
+        query = cursor.execute.call_args_list[0][0][0]
+        self.assertTrue(
+            query.startswith("LOAD DATA LOCAL INFILE %s INTO TABLE INTERACTION")
+        )
+        label_query, label_rows = cursor.executemany.call_args_list[0][0]
+        self.assertTrue(label_query.startswith("INSERT INTO INTERACTION_LABEL"))
+        self.assertEqual(label_rows, [(0, "fever"), (1, "fever")])
+        count_query, count_rows = cursor.executemany.call_args_list[1][0]
+        self.assertIn("ON DUPLICATE KEY UPDATE", count_query)
+        self.assertEqual(count_rows, [("label", "fever", 2)])
+        lines = contents[0].splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(
+            lines[0].split("\t")[:6], ["0", "A11", "\\N", "\\N", "\\N", '{"temp":37}']
+        )
+        conn.commit.assert_called_once()
+
+    def test_infile_value_escaping(self):
+        """
+        Test that separators in values are escaped and dates are formatted.
+        """
+        self.assertEqual(infile_value("a\tb\nc\\"), "a\\tb\\nc\\\\")
+        self.assertEqual(infile_value(date(2024, 1, 2)), "2024-01-02")
+
+    def test_rebuild_indexes(self):
+        """
+        Test that droppable indexes are dropped on enter and rebuilt on exit.
+        """
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+        cursor.execute.side_effect = [Exception("needed in a foreign key"), None, None]
+        data_utils = DataUtils(conn)
+        schema = InteractionSchema.model_copy(
+            update={
+                "indexes": InteractionSchema.indexes
+                + [
+                    TableSchema.Index(
+                        name="idx_interaction_ailment", columns=["ailment"]
+                    )
+                ]
+            }
+        )
+        with patch.object(DataUtils, "create_missing_indexes") as mock_create:
+            with BulkLoader(data_utils, schema, rebuild_indexes=True) as loader:
+                mock_create.assert_not_called()
+            mock_create.assert_called_once_with(schema=schema)
+        self.assertEqual(
+            loader.report().dropped_indexes,
+            ["idx_interaction_next_visit", "idx_interaction_ailment"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import threading
+import time
+import unittest
+
+from utils.connection_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    """
+    A fake database connection recording whether it is alive or closed.
+    """
+
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+        self.rolled_back = False
+
+    def is_connected(self):
+        return self.alive and not self.closed
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool(unittest.TestCase):
+    """
+    Test suite for the ConnectionPool class.
+    """
+
+    def setUp(self):
+        """
+        Create a pool backed by fake connections before each test.
+        """
+        self.opened = []
+
+        def connect():
+            conn = FakeConnection()
+            self.opened.append(conn)
+            return conn
+
+        self.pool = ConnectionPool(connect=connect, min_size=1, max_size=2, timeout=0.2)
+
+    def test_reuses_released_connection(self):
+        """
+        Test that a released connection is handed out again instead of opening a new one.
+        """
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_times_out_when_exhausted(self):
+        """
+        Test that acquiring beyond max_size waits and then raises PoolTimeoutError.
+        """
+        self.pool.acquire()
+        self.pool.acquire()
+        with self.assertRaises(PoolTimeoutError):
+            self.pool.acquire()
+        stats = self.pool.stats()
+        self.assertEqual(stats["in_use"], 2)
+        self.assertEqual(stats["timeouts"], 1)
+
+    def test_waiter_receives_released_connection(self):
+        """
+        Test that a thread blocked on a full pool is woken up by a release.
+        """
+        conn = self.pool.acquire()
+        self.pool.acquire()
+        threading.Timer(0.05, self.pool.release, args=(conn,)).start()
+        self.assertIs(self.pool.acquire(), conn)
+        self.assertEqual(self.pool.stats()["waited"], 1)
+
+    def test_reconnects_dead_connection(self):
+        """
+        Test that a connection failing the health check is replaced on checkout.
+        """
+        with self.pool.connection() as conn:
+            pass
+        conn.alive = False
+        with self.pool.connection() as fresh:
+            self.assertIsNot(fresh, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(self.pool.stats()["reconnects"], 1)
+
+    def test_recycles_idle_connection(self):
+        """
+        Test that connections idle for longer than max_idle_time are recycled.
+        """
+        self.pool.max_idle_time = 0.01
+        with self.pool.connection() as conn:
+            pass
+        time.sleep(0.02)
+        with self.pool.connection() as fresh:
+            self.assertIsNot(fresh, conn)
+        self.assertEqual(self.pool.stats()["recycled"], 1)
+
+    def test_failed_block_rolls_back_and_discards_dead_connection(self):
+        """
+        Test that an exception inside the block rolls back and drops a dead connection.
+        """
+        with self.assertRaises(RuntimeError):
+            with self.pool.connection() as conn:
+                conn.alive = False
+                raise RuntimeError("boom")
+        self.assertTrue(conn.rolled_back)
+        self.assertTrue(conn.closed)
+        self.assertEqual(self.pool.stats()["size"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
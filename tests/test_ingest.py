@@ -0,0 +1,175 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from tests.helpers import DATA_DIR, sqlite_database
+from utils.bulk_loader import BulkLoader
+from utils.data_utils import DataUtils
+from utils.ingest import MAX_REJECTION_SAMPLES, Checkpoint, ingest_csv, read_chunks
+from utils.table_schemas import InteractionSchema
+
+
+class TestIngest(unittest.TestCase):
+    """
+    Test suite for the streaming CSV ingest pipeline.
+    """
+
+    def setUp(self):
+        """
+        Create the database and a temporary checkpoint file before each test.
+        """
+        self.conn = sqlite_database()
+        self.data_utils = DataUtils(self.conn, placeholder="?")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.tmp_dir.name, "checkpoint.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def insert_interactions(self, rows):
+        self.data_utils.insert_interactions(rows, atomic=True)
+
+    def count_interactions(self):
+        return self.conn.execute("SELECT COUNT(*) FROM INTERACTION").fetchone()[0]
+
+    def test_read_chunks(self):
+        """
+        Test that chunks cover the file once and start at the requested row.
+        """
+        path = os.path.join(DATA_DIR, "Interaction.csv")
+        positions = [
+            (position, len(rows)) for position, rows in read_chunks(path, 5, start=2)
+        ]
+        self.assertEqual(positions, [(2, 5), (7, 5), (12, 1)])
+
+    def test_ingest_with_worker_processes(self):
+        """
+        Test that the sample exports load completely through worker processes.
+        """
+        patients = ingest_csv(
+            path=os.path.join(DATA_DIR, "Patient.csv"),
+            table="PATIENT",
+            insert=lambda rows: self.data_utils.insert_patients(rows, atomic=True),
+            chunk_size=1,
+            workers=2,
+        )
+        interactions = ingest_csv(
+            path=os.path.join(DATA_DIR, "Interaction.csv"),
+            table="INTERACTION",
+            insert=self.insert_interactions,
+            chunk_size=4,
+            workers=2,
+            max_in_flight=2,
+        )
+        self.assertEqual(patients.rows_inserted, 2)
+        self.assertEqual(interactions.rows_inserted, 13)
+        self.assertEqual(self.count_interactions(), 13)
+        interaction = self.data_utils.get_interaction_info(insurance_no="A11")[0]
+        self.assertEqual(interaction.metrics["BP"], "120/80")
+        self.assertEqual(interaction.next_steps.prescribed_meds[0], "ABC 20mg")
+
+    def test_rejected_rows_are_reported_once(self):
+        """
+        Test that rejected rows are collected in the report and logged once at
+        the end, not one by one while loading.
+        """
+        path = os.path.join(self.tmp_dir.name, "Interaction.csv")
+        with open(path, "w") as f:
+            f.write("id,insurance_no,health_status\n")
+            f.write("1,A11,3\n")
+            for i in range(30):
+                f.write(f"x{i},A11,bad\n")
+        with self.assertLogs("utils.ingest", level="WARNING") as logs:
+            report = ingest_csv(
+                path=path,
+                table="INTERACTION",
+                insert=self.insert_interactions,
+                chunk_size=4,
+                workers=0,
+            )
+        self.assertEqual((report.rows_inserted, report.rows_rejected), (1, 30))
+        self.assertEqual(len(report.rejections), MAX_REJECTION_SAMPLES)
+        self.assertEqual(report.rejections[0][0], 1)
+        self.assertEqual(len(logs.output), 1)
+
+    def test_resume_after_failure(self):
+        """
+        Test that a load interrupted mid-file resumes after the last committed chunk.
+        """
+        path = os.path.join(DATA_DIR, "Interaction.csv")
+        calls = []
+
+        def failing_insert(rows):
+            calls.append(len(rows))
+            if len(calls) == 3:
+                raise RuntimeError("connection lost")
+            self.insert_interactions(rows)
+
+        with self.assertRaises(RuntimeError):
+            ingest_csv(
+                path=path,
+                table="INTERACTION",
+                insert=failing_insert,
+                chunk_size=4,
+                workers=0,
+                checkpoint=Checkpoint(self.checkpoint_path),
+            )
+        self.assertEqual(self.count_interactions(), 8)
+        report = ingest_csv(
+            path=path,
+            table="INTERACTION",
+            insert=self.insert_interactions,
+            chunk_size=4,
+            workers=0,
+            checkpoint=Checkpoint(self.checkpoint_path),
+        )
+        self.assertEqual((report.resumed_at, report.rows_inserted), (8, 5))
+        self.assertEqual(self.count_interactions(), 13)
+
+    def test_resume_after_crash_before_checkpoint(self):
+        """
+        Test that a chunk committed right before a crash, but not recorded in
+        the checkpoint, is loaded again without duplicates or double counts.
+        """
+        path = os.path.join(DATA_DIR, "Interaction.csv")
+        loader = BulkLoader(self.data_utils, InteractionSchema, skip_existing=True)
+        advance = Checkpoint.advance
+        calls = []
+
+        def crashing_advance(checkpoint, table, position):
+            calls.append(position)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            advance(checkpoint, table, position)
+
+        with patch.object(Checkpoint, "advance", crashing_advance):
+            with self.assertRaises(KeyboardInterrupt):
+                ingest_csv(
+                    path=path,
+                    table="INTERACTION",
+                    insert=loader.insert,
+                    chunk_size=4,
+                    workers=0,
+                    checkpoint=Checkpoint(self.checkpoint_path),
+                )
+        self.assertEqual(self.count_interactions(), 8)
+        report = ingest_csv(
+            path=path,
+            table="INTERACTION",
+            insert=loader.insert,
+            chunk_size=4,
+            workers=0,
+            checkpoint=Checkpoint(self.checkpoint_path),
+        )
+        self.assertEqual(report.resumed_at, 4)
+        self.assertEqual(self.count_interactions(), 13)
+        self.assertEqual(loader.report().rows_skipped, 4)
+        self.assertEqual(
+            sum(health.interactions for health in self.data_utils.get_patient_health()),
+            13,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
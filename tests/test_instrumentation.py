@@ -0,0 +1,105 @@
+import unittest
+
+from datamodel.models import Interaction, Patient
+from tests.helpers import sqlite_database
+from utils.data_utils import DataUtils
+from utils.instrumentation import (
+    Histogram,
+    Instrumentation,
+    PrometheusInstrumentation,
+    query_shape,
+)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """
+    Test suite for the query shapes, histograms and PrometheusInstrumentation.
+    """
+
+    def setUp(self):
+        """
+        Create data utilities on an SQLite database reporting to a fresh
+        instrumentation that samples every slow query.
+        """
+        self.instrumentation = PrometheusInstrumentation(
+            slow_query_seconds=0.0, slow_query_sample_rate=1.0
+        )
+        self.data_utils = DataUtils(sqlite_database(), placeholder="?")
+        self.data_utils.instrumentation = self.instrumentation
+
+    def test_query_shape(self):
+        """
+        Test that queries differing only in the length of their lists share a
+        shape, named after the statement and the table.
+        """
+        one, sql = query_shape("SELECT * FROM PATIENT WHERE insurance_no IN (?);")
+        many, _ = query_shape(
+            "SELECT *  FROM PATIENT\nWHERE insurance_no IN (?, ?, ?);"
+        )
+        self.assertEqual(one, many)
+        self.assertTrue(one.startswith("select_patient_"))
+        self.assertEqual(sql, "SELECT * FROM PATIENT WHERE insurance_no IN (...);")
+        self.assertEqual(
+            query_shape("INSERT INTO X (a,b) VALUES (%s,%s),(%s,%s)")[0],
+            query_shape("INSERT INTO X (a,b) VALUES (%s,%s)")[0],
+        )
+
+    def test_histogram_render(self):
+        """
+        Test that histograms render cumulative buckets, sum and count per label.
+        """
+        histogram = Histogram("latency_seconds", "Latency.", ("shape",), (0.1, 1.0))
+        histogram.observe(0.05, 'a"b')
+        histogram.observe(0.5, 'a"b')
+        histogram.observe(5, 'a"b')
+        lines = histogram.render()
+        self.assertIn('latency_seconds_bucket{shape="a\\"b",le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{shape="a\\"b",le="1.0"} 2', lines)
+        self.assertIn('latency_seconds_bucket{shape="a\\"b",le="+Inf"} 3', lines)
+        self.assertIn('latency_seconds_count{shape="a\\"b"} 3', lines)
+
+    def test_queries_and_decoding_are_recorded(self):
+        """
+        Test that reads and inserts report their shape and rows, that decoding
+        is timed, and that slow queries are sampled without their parameters.
+        """
+        self.data_utils.insert_patients(
+            [
+                Patient(
+                    insurance_no="A11",
+                    fname="Vernon",
+                    lname="Lopez",
+                    sex="M",
+                    insurance_provider="ABC",
+                )
+            ]
+        )
+        self.data_utils.insert_interactions([Interaction(id=1, insurance_no="A11")])
+        self.data_utils.get_patients_by_insurance_nos(["A11", "B11"])
+
+        shape, _ = query_shape(self.data_utils._patients_in_query(["A11"])[0])
+        metrics = self.instrumentation.render()
+        self.assertIn(f'db_query_rows_sum{{shape="{shape}"}} 1', metrics)
+        self.assertIn('db_query_rows_sum{shape="insert_interaction_', metrics)
+        self.assertIn(
+            'endpoint_stage_duration_seconds_count{endpoint="none",stage="decode"} 1',
+            metrics,
+        )
+        samples = self.instrumentation.slow_query_samples()
+        self.assertIn(shape, [sample["shape"] for sample in samples])
+        self.assertFalse(any("A11" in sample["sql"] for sample in samples))
+
+    def test_no_op_instrumentation(self):
+        """
+        Test that the base instrumentation records nothing.
+        """
+        instrumentation = Instrumentation()
+        self.data_utils.instrumentation = instrumentation
+        self.data_utils.get_patient_by_insurance_no("A11")
+        with instrumentation.timer("decode"):
+            pass
+        self.assertEqual(instrumentation.render(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import json
+import unittest
+
+from tests.helpers import sqlite_database
+from utils.async_data_utils import AsyncDataUtils
+from utils.async_pool import AsyncConnectionPool, ThreadedAsyncDriver
+from utils.interaction_batch import insert_interaction_stream
+from utils.json_stream import iter_json_records
+
+
+async def body(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(chunks):
+    return [item async for item in iter_json_records(chunks)]
+
+
+class TestJSONStream(unittest.IsolatedAsyncioTestCase):
+    """
+    Test suite for the incremental JSON record parser.
+    """
+
+    async def test_array_split_across_chunks(self):
+        """
+        Test that records of a JSON array are parsed across chunk boundaries,
+        including a multi-byte character split in two.
+        """
+        data = json.dumps(
+            [{"id": 1, "remarks": "Straße"}, {"id": 2}], ensure_ascii=False
+        ).encode()
+        split = data.index("ß".encode()) + 1
+        records = await collect(body(data[:split], data[split:]))
+        self.assertEqual(
+            records, [({"id": 1, "remarks": "Straße"}, None), ({"id": 2}, None)]
+        )
+
+    async def test_ndjson_with_malformed_line(self):
+        """
+        Test that a malformed NDJSON line is reported without stopping the parse.
+        """
+        records = await collect(body(b'{"id": 1}\n{"id": \n{"id"', b": 3}"))
+        self.assertEqual(records[0], ({"id": 1}, None))
+        self.assertIsNotNone(records[1][1])
+        self.assertEqual(records[2], ({"id": 3}, None))
+
+    async def test_array_with_malformed_element(self):
+        """
+        Test that a malformed element in the middle of a large array is reported
+        when it is read and that the records after it keep streaming.
+        """
+        records = [json.dumps({"id": i, "remarks": "a, [b]"}) for i in range(1000)]
+        records[500] = '{"id": x, "qa": {"a": "}]"}}'
+        data = ("[" + ",".join(records) + "]").encode()
+        chunks = [data[i : i + 64] for i in range(0, len(data), 64)]
+        sent = []
+
+        async def tracked():
+            for chunk in chunks:
+                sent.append(chunk)
+                yield chunk
+
+        parsed = []
+        async for item in iter_json_records(tracked()):
+            parsed.append((item, len(sent)))
+        self.assertEqual(len(parsed), 1000)
+        error, received = parsed[500]
+        self.assertIsNone(error[0])
+        self.assertIn("Malformed JSON", error[1])
+        self.assertLess(received, len(chunks) // 2 + 2)
+        self.assertEqual(parsed[501][0], ({"id": 501, "remarks": "a, [b]"}, None))
+        self.assertLess(parsed[501][1], len(chunks) // 2 + 3)
+        self.assertEqual(parsed[-1][0], ({"id": 999, "remarks": "a, [b]"}, None))
+
+    async def test_array_token_split_across_chunks(self):
+        """
+        Test that literals and numbers cut by a chunk boundary are not reported.
+        """
+        records = await collect(body(b'[{"ok": tr', b'ue, "n": 1.', b"5}]"))
+        self.assertEqual(records, [({"ok": True, "n": 1.5}, None)])
+
+    async def test_truncated_array(self):
+        """
+        Test that an array without its closing bracket is reported.
+        """
+        records = await collect(body(b'[{"id": 1}, {"id"'))
+        self.assertEqual(records, [({"id": 1}, None), (None, "Malformed JSON array")])
+
+
+class TestInteractionBatch(unittest.IsolatedAsyncioTestCase):
+    """
+    Test suite for inserting a stream of interactions.
+    """
+
+    async def asyncSetUp(self):
+        """
+        Create a pool over an SQLite database holding one patient and one interaction.
+        """
+        self.conn = sqlite_database()
+        self.conn.execute(
+            "INSERT INTO PATIENT (insurance_no, fname, lname, sex, insurance_provider) "
+            "VALUES ('A11', 'Vernon', 'Lopez', 'M', 'ABC')"
+        )
+        self.conn.execute(
+            "INSERT INTO INTERACTION (id, insurance_no) VALUES (1, 'A11')"
+        )
+        self.conn.commit()
+        self.pool = AsyncConnectionPool(
+            driver=ThreadedAsyncDriver(lambda: self.conn), max_size=1
+        )
+        self.data_utils = AsyncDataUtils(self.pool, placeholder="?")
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+    async def test_per_record_results(self):
+        """
+        Test that valid records are created and the others get their own result,
+        including a duplicate id that makes the chunk transaction fail.
+        """
+        lines = [
+            {"id": 2, "insurance_no": "A11"},
+            {"id": 3, "insurance_no": "X99"},
+            {"id": "four", "insurance_no": "A11"},
+            {"id": 1, "insurance_no": "A11"},
+            {"id": 5, "insurance_no": "A11"},
+        ]
+        ndjson = "\n".join(json.dumps(line) for line in lines).encode()
+        batch = await insert_interaction_stream(
+            self.data_utils, iter_json_records(body(ndjson)), chunk_size=10
+        )
+        self.assertEqual(
+            [result.status for result in batch.results],
+            ["created", "rejected", "rejected", "failed", "created"],
+        )
+        self.assertEqual((batch.created, batch.rejected, batch.failed), (2, 2, 1))
+        ids = self.conn.execute("SELECT id FROM INTERACTION ORDER BY id").fetchall()
+        self.assertEqual(ids, [(1,), (2,), (5,)])
+
+
+if __name__ == "__main__":
+    unittest.main()
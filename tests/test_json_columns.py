@@ -0,0 +1,276 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from datamodel.models import Interaction, NextSteps, Patient
+from tests.helpers import DATA_DIR, create_tables
+from utils.backends import MemoryBackend
+from utils.bulk_loader import BulkLoader
+from utils.data_utils import DataUtils, interaction_encoder
+from utils.ingest import ingest_csv
+from utils.row_codec import RowDecoder, RowEncoder, make_json_codec
+from utils.sql_query_builder import SQLQueryBuilder, SQLTypes
+from utils.schema_registry import INTERACTION
+from utils.table_schemas import InteractionSchema, PatientSchema, TableSchema
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def interaction(id, **fields):
+    return Interaction(id=id, insurance_no="A11", **fields)
+
+
+class TestJSONColumnDDL(unittest.TestCase):
+    """
+    Test suite for the DDL of JSON and generated columns.
+    """
+
+    def test_create_table(self):
+        """
+        Test that JSON columns are native on MySQL, TEXT on SQLite, and that the
+        generated columns read their key with each dialect's JSON functions.
+        """
+        mysql = SQLQueryBuilder().create(InteractionSchema, "mysql").construct_query()
+        self.assertIn("metrics JSON", mysql)
+        self.assertIn(
+            "next_visit VARCHAR(255) GENERATED ALWAYS AS (NULLIF(JSON_UNQUOTE("
+            "JSON_EXTRACT(next_steps, '$.next_visit')), 'null')) VIRTUAL",
+            mysql,
+        )
+        self.assertIn("INDEX idx_interaction_next_visit (next_visit)", mysql)
+
+        sqlite = SQLQueryBuilder().create(InteractionSchema, "sqlite").construct_query()
+        self.assertIn("metrics TEXT", sqlite)
+        self.assertIn(
+            "bp VARCHAR(255) GENERATED ALWAYS AS (json_extract(metrics, '$.BP')) VIRTUAL",
+            sqlite,
+        )
+
+    def test_create_table_without_generated_columns(self):
+        """
+        Test that generated columns and their indexes can be left out.
+        """
+        query = (
+            SQLQueryBuilder()
+            .create(InteractionSchema, "mysql", generated=False)
+            .construct_query()
+        )
+        self.assertNotIn("next_visit", query)
+        self.assertIn("INDEX idx_interaction_patient_date", query)
+
+    def test_add_and_modify_column(self):
+        """
+        Test the ALTER TABLE queries of the JSON upgrade.
+        """
+        column = TableSchema.Column(name="qa", dtype=SQLTypes.JSON, json_encoded=True)
+        self.assertEqual(
+            SQLQueryBuilder().modify_column("INTERACTION", column).construct_query(),
+            "ALTER TABLE INTERACTION MODIFY COLUMN qa JSON;",
+        )
+        generated = TableSchema.Column(
+            name="next_visit",
+            dtype=SQLTypes.VARCHAR,
+            generated_from="next_steps.next_visit",
+        )
+        self.assertEqual(
+            SQLQueryBuilder()
+            .add_column("INTERACTION", generated, "sqlite")
+            .construct_query(),
+            "ALTER TABLE INTERACTION ADD COLUMN next_visit VARCHAR(255) GENERATED "
+            "ALWAYS AS (json_extract(next_steps, '$.next_visit')) VIRTUAL;",
+        )
+
+
+class TestJSONColumns(unittest.TestCase):
+    """
+    Test suite for JSON and generated columns on SQLite.
+    """
+
+    def setUp(self):
+        """
+        Create the tables in an in-memory database with one patient.
+        """
+        self.conn = MemoryBackend().connect()
+        self.data_utils = DataUtils(self.conn, placeholder="?")
+        create_tables(self.data_utils)
+        self.data_utils.insert_patients(
+            [
+                Patient(
+                    insurance_no="A11",
+                    fname="Vernon",
+                    lname="Lopez",
+                    sex="M",
+                    insurance_provider="ABC",
+                )
+            ]
+        )
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_generated_columns(self):
+        """
+        Test that the generated columns hold the keys of the written documents
+        and that the next visit is looked up through its index.
+        """
+        self.data_utils.insert_interactions(
+            [
+                interaction(
+                    1,
+                    metrics={"BP": "120/80"},
+                    next_steps=NextSteps(next_visit="2024-06-29"),
+                ),
+                interaction(2),
+            ]
+        )
+        self.assertEqual(
+            self.conn.execute(
+                "SELECT id, next_visit, bp FROM INTERACTION ORDER BY id"
+            ).fetchall(),
+            [(1, "2024-06-29", "120/80"), (2, None, None)],
+        )
+        plan = self.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM INTERACTION WHERE next_visit = ?",
+            ("2024-06-29",),
+        ).fetchall()
+        self.assertIn("idx_interaction_next_visit", plan[0][3])
+        self.assertEqual(
+            self.data_utils.get_interaction_info("A11")[0].next_steps.next_visit,
+            "2024-06-29",
+        )
+
+    def test_empty_documents_are_stored_as_null(self):
+        """
+        Test that empty strings, which are no JSON documents, are written as NULL.
+        """
+        self.data_utils.insert_interactions(
+            [{"id": 1, "insurance_no": "A11", "metrics": "", "qa": '{"a":"b"}'}]
+        )
+        self.assertEqual(
+            self.conn.execute("SELECT metrics, qa FROM INTERACTION").fetchall(),
+            [(None, '{"a":"b"}')],
+        )
+
+    def test_upgrade_json_columns(self):
+        """
+        Test that a table created before the generated columns gets them and
+        their index, with the empty documents replaced by NULL.
+        """
+        self.conn.execute("DROP TABLE INTERACTION_LABEL")
+        self.conn.execute("DROP TABLE INTERACTION")
+        legacy = InteractionSchema.model_copy(
+            update={
+                "columns": [
+                    col for col in InteractionSchema.columns if not col.generated_from
+                ],
+                "indexes": InteractionSchema.indexes[:1],
+            }
+        )
+        self.data_utils.create_table(legacy)
+        self.conn.execute(
+            "INSERT INTO INTERACTION (id, insurance_no, metrics, next_steps) "
+            "VALUES (1, 'A11', '', '{\"next_visit\": \"2024-06-29\"}')"
+        )
+        self.conn.commit()
+
+        self.assertEqual(
+            self.data_utils.upgrade_json_columns(InteractionSchema),
+            ["next_visit", "bp"],
+        )
+        self.assertEqual(
+            self.data_utils.create_missing_indexes(InteractionSchema),
+            ["idx_interaction_next_visit"],
+        )
+        self.assertEqual(
+            self.conn.execute("SELECT metrics, next_visit FROM INTERACTION").fetchall(),
+            [(None, "2024-06-29")],
+        )
+        self.assertEqual(self.data_utils.upgrade_json_columns(InteractionSchema), [])
+
+
+class TestJSONCodecs(unittest.TestCase):
+    """
+    Test suite for the storage formats of the JSON columns.
+    """
+
+    def test_unknown_codec(self):
+        """
+        Test that an unknown storage format is rejected.
+        """
+        with self.assertRaises(ValueError):
+            make_json_codec("bson")
+
+    def test_encoder_skips_generated_columns(self):
+        """
+        Test that generated columns are not part of the encoded rows.
+        """
+        encoder = RowEncoder(InteractionSchema)
+        self.assertNotIn("next_visit", encoder.columns)
+        self.assertEqual(len(encoder.encode_one(interaction(1))), len(encoder.columns))
+
+    @unittest.skipUnless(msgpack, "msgpack is not installed")
+    def test_msgpack_round_trip(self):
+        """
+        Test that documents are stored as MessagePack and decoded back, and that
+        documents still stored as JSON text are decoded too.
+        """
+        codec = make_json_codec("msgpack")
+        encoder = RowEncoder(InteractionSchema, json_codec=codec)
+        decoder = RowDecoder(InteractionSchema, Interaction, json_codec=codec)
+        original = interaction(
+            1, metrics={"BP": "120/80"}, next_steps=NextSteps(next_visit="2024-06-29")
+        )
+        row = encoder.encode_one(original)
+        metrics = row[encoder.columns.index("metrics")]
+        self.assertIsInstance(metrics, bytes)
+        self.assertEqual(msgpack.unpackb(metrics), {"BP": "120/80"})
+        self.assertEqual(decoder.decode([row], encoder.columns), [original])
+        self.assertEqual(codec.decode('{"BP": "90/60"}'), {"BP": "90/60"})
+        self.assertEqual(encoder.encode_one(row), row)
+
+    @unittest.skipUnless(msgpack, "msgpack is not installed")
+    def test_msgpack_ingest_and_bulk_load(self):
+        """
+        Test that rows encoded by the ingest workers are stored once encoded by
+        the bulk loader, and read back, with the interactions stored as
+        MessagePack (as with ``JSON_STORAGE=msgpack``).
+        """
+        codec = make_json_codec("msgpack")
+        decoder = RowDecoder(
+            InteractionSchema,
+            Interaction,
+            keys=["id", "insurance_no", "interaction_date"],
+            json_codec=codec,
+        )
+        conn = MemoryBackend().connect()
+        with patch.object(INTERACTION, "json_codec", codec), patch.object(
+            interaction_encoder, "json_codec", codec
+        ), patch("utils.data_utils.interaction_decoder", decoder):
+            data_utils = DataUtils(conn, placeholder="?")
+            create_tables(data_utils)
+            for schema, file_name in [
+                (PatientSchema, "Patient.csv"),
+                (InteractionSchema, "Interaction.csv"),
+            ]:
+                with BulkLoader(data_utils, schema) as loader:
+                    ingest_csv(
+                        path=os.path.join(DATA_DIR, file_name),
+                        table=schema.name,
+                        insert=loader.insert,
+                        workers=0,
+                    )
+            interaction = data_utils.get_interaction_info(insurance_no="A11")[0]
+        metrics = conn.execute(
+            "SELECT metrics FROM INTERACTION WHERE id = ?", (interaction.id,)
+        ).fetchone()[0]
+        conn.close()
+        self.assertEqual(msgpack.unpackb(metrics), interaction.metrics)
+        self.assertEqual(interaction.metrics["BP"], "120/80")
+        self.assertEqual(interaction.next_steps.prescribed_meds[0], "ABC 20mg")
+
+
+if __name__ == "__main__":
+    unittest.main()
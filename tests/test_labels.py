@@ -0,0 +1,95 @@
+import unittest
+from unittest.mock import patch
+
+from datamodel.models import Interaction, LabelCount
+from tests.helpers import sqlite_database
+from utils.data_utils import DataUtils, split_labels
+
+
+class TestInteractionLabels(unittest.TestCase):
+    """
+    Test suite for the normalized label index of interactions.
+    """
+
+    def setUp(self):
+        """
+        Insert interactions with single, multiple and missing labels.
+        """
+        self.conn = sqlite_database()
+        self.data_utils = DataUtils(self.conn, placeholder="?")
+        self.data_utils.insert_interactions(
+            [
+                Interaction(id=1, insurance_no="A11", label="Cough"),
+                Interaction(id=2, insurance_no="A11", label="cough, Fever"),
+                Interaction(id=3, insurance_no="A11", label="headache"),
+                Interaction(id=4, insurance_no="A11"),
+                Interaction(id=5, insurance_no="B11", label="fever"),
+            ]
+        )
+
+    def test_split_labels(self):
+        """
+        Test that labels are split, stripped, lower-cased and deduplicated.
+        """
+        self.assertEqual(split_labels(" Cough,FEVER,,cough "), ["cough", "fever"])
+        self.assertEqual(split_labels(None), [])
+
+    def test_label_filter(self):
+        """
+        Test that a label filter matches any of the labels, case-insensitively,
+        and returns every interaction once.
+        """
+        page = self.data_utils.get_interaction_info(
+            insurance_no="A11", labels="FEVER,cough"
+        )
+        self.assertEqual([interaction.id for interaction in page], [1, 2])
+
+    def test_label_counts(self):
+        """
+        Test that every label is counted once per interaction carrying it.
+        """
+        self.assertEqual(
+            self.data_utils.get_label_counts(),
+            [
+                LabelCount(label="cough", count=2),
+                LabelCount(label="fever", count=2),
+                LabelCount(label="headache", count=1),
+            ],
+        )
+
+    def test_rebuild_labels(self):
+        """
+        Test that the index is rebuilt from the labels of the interactions.
+        """
+        self.conn.execute(
+            "INSERT INTO INTERACTION (id, insurance_no, label) VALUES (6, 'B11', 'Rash')"
+        )
+        self.conn.execute("DELETE FROM INTERACTION_LABEL WHERE label = 'fever'")
+        self.assertEqual(self.data_utils.rebuild_labels(batch_size=2), 6)
+        self.assertEqual(
+            [count.label for count in self.data_utils.get_label_counts()],
+            ["cough", "fever", "headache", "rash"],
+        )
+
+    def test_failed_rebuild_keeps_the_index(self):
+        """
+        Test that the index is replaced in one transaction: a rebuild failing
+        midway leaves the previous labels in place.
+        """
+        scan = self.data_utils._interaction_scan_query
+        calls = []
+
+        def failing_scan(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+            return scan(*args)
+
+        with patch.object(self.data_utils, "_interaction_scan_query", failing_scan):
+            with self.assertRaises(RuntimeError):
+                self.data_utils.rebuild_labels(batch_size=2)
+        self.assertEqual(len(self.data_utils.get_label_counts()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import sqlite3
+import unittest
+from datetime import date
+
+from datamodel.models import Interaction
+from utils.data_utils import DataUtils
+from utils.pagination import (
+    InvalidCursorError,
+    decode_interaction_cursor,
+    encode_interaction_cursor,
+)
+
+
+class TestInteractionPagination(unittest.TestCase):
+    """
+    Test suite for cursor based pagination of interactions.
+    """
+
+    def setUp(self):
+        """
+        Create an in-memory INTERACTION table with dated and undated rows.
+        """
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute(
+            "CREATE TABLE INTERACTION (id INT, insurance_no TEXT, ailment TEXT, "
+            "symptoms TEXT, interaction_date DATE, metrics TEXT, remarks TEXT, "
+            "health_status INT, qa TEXT, next_steps TEXT, label TEXT)"
+        )
+        dates = [None, None, "2024-01-05", "2024-01-02", "2024-01-02", "2024-03-01"]
+        for i, day in enumerate(dates, start=1):
+            self.conn.execute(
+                "INSERT INTO INTERACTION (id, insurance_no, interaction_date, label) "
+                "VALUES (?, 'A11', ?, 'fever')",
+                (i, day),
+            )
+        self.conn.execute(
+            "INSERT INTO INTERACTION (id, insurance_no, label) VALUES (99, 'B11', 'fever')"
+        )
+        self.data_utils = DataUtils(self.conn, placeholder="?")
+
+    def test_cursor_round_trip(self):
+        """
+        Test that a cursor decodes to the sort key of the interaction it was made from.
+        """
+        interaction = Interaction(
+            id=4, insurance_no="A11", interaction_date=date(2024, 1, 2)
+        )
+        cursor = encode_interaction_cursor(interaction)
+        self.assertEqual(decode_interaction_cursor(cursor), (date(2024, 1, 2), 4))
+
+    def test_invalid_cursor(self):
+        """
+        Test that a tampered cursor is rejected.
+        """
+        with self.assertRaises(InvalidCursorError):
+            decode_interaction_cursor("not-a-cursor")
+
+    def test_cursor_pages_cover_all_rows_in_order(self):
+        """
+        Test that following next cursors visits every interaction of the patient once.
+        """
+        seen, cursor = [], None
+        while True:
+            page, cursor = self.data_utils.get_interaction_page(
+                insurance_no="A11", limit=2, cursor=cursor
+            )
+            seen += [interaction.id for interaction in page]
+            if cursor is None:
+                break
+        self.assertEqual(seen, [1, 2, 4, 5, 3, 6])
+
+    def test_offset_mode_is_ordered(self):
+        """
+        Test that offset pagination uses the same ordering as cursor pagination.
+        """
+        page = self.data_utils.get_interaction_info(
+            insurance_no="A11", offset=2, limit=2
+        )
+        self.assertEqual([interaction.id for interaction in page], [4, 5])
+
+    def test_json_pages_match_model_pages(self):
+        """
+        Test that pages serialized straight from the rows carry the same
+        interactions and cursors as the decoded pages, with and without fields.
+        """
+        for fields in (None, ["label"]):
+            page, cursor = self.data_utils.get_interaction_page(
+                insurance_no="A11", limit=4, fields=fields
+            )
+            body, json_cursor = self.data_utils.get_interaction_page_json(
+                insurance_no="A11", limit=4, fields=fields
+            )
+            expected = [
+                interaction.model_dump(mode="json", exclude_unset=fields is not None)
+                for interaction in page
+            ]
+            self.assertEqual(json.loads(body), expected)
+            self.assertEqual(json_cursor, cursor)
+
+
+if __name__ == "__main__":
+    unittest.main()
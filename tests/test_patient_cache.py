@@ -0,0 +1,130 @@
+import sqlite3
+import unittest
+from unittest.mock import MagicMock, patch
+
+from datamodel.models import Patient
+from utils.data_utils import DataUtils
+from utils.patient_cache import PatientCache
+
+
+class FakeClock:
+    """
+    A manually advanced clock for testing expirations.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_patient(insurance_no):
+    return Patient(
+        insurance_no=insurance_no,
+        fname="Vernon",
+        lname="Lopez",
+        sex="M",
+        insurance_provider="ABC",
+    )
+
+
+class TestPatientCache(unittest.TestCase):
+    """
+    Test suite for the PatientCache class.
+    """
+
+    def setUp(self):
+        """
+        Create a small cache driven by a fake clock before each test.
+        """
+        self.clock = FakeClock()
+        self.cache = PatientCache(max_size=2, ttl=10, negative_ttl=1, clock=self.clock)
+
+    def test_hit_and_miss(self):
+        """
+        Test that a cached patient is returned and counted as a hit.
+        """
+        self.assertIsNone(self.cache.get("A11"))
+        self.cache.put("A11", [make_patient("A11")])
+        self.assertEqual(self.cache.get("A11")[0].insurance_no, "A11")
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_negative_entries_expire_sooner(self):
+        """
+        Test that a cached miss is served until the negative TTL elapses.
+        """
+        self.cache.put("X", [])
+        self.assertEqual(self.cache.get("X"), [])
+        self.clock.now = 2
+        self.assertIsNone(self.cache.get("X"))
+        self.assertEqual(self.cache.stats()["negative_hits"], 1)
+
+    def test_evicts_least_recently_used(self):
+        """
+        Test that the least recently used entry is evicted when the cache is full.
+        """
+        self.cache.put("A", [make_patient("A")])
+        self.cache.put("B", [make_patient("B")])
+        self.cache.get("A")
+        self.cache.put("C", [make_patient("C")])
+        self.assertIsNone(self.cache.get("B"))
+        self.assertIsNotNone(self.cache.get("A"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_put_after_invalidation_is_dropped(self):
+        """
+        Test that a lookup racing with a write does not cache the stale result.
+        """
+        generation = self.cache.generation()
+        self.cache.invalidate("A11")
+        self.cache.put("A11", [], generation)
+        self.assertIsNone(self.cache.get("A11"))
+
+    def test_data_utils_uses_cache_and_insert_invalidates(self):
+        """
+        Test that DataUtils queries the database once per patient and that
+        insert_patients drops the cached entry.
+        """
+        data_utils = DataUtils(MagicMock(), patient_cache=self.cache)
+        with patch.object(DataUtils, "_fetch", return_value=([], None)) as mock_fetch:
+            data_utils.get_patient_by_insurance_no("A11")
+            data_utils.get_patient_by_insurance_no("A11")
+            self.assertEqual(mock_fetch.call_count, 1)
+            with patch.object(DataUtils, "_insert_items"):
+                data_utils.insert_patients([make_patient("A11")])
+            data_utils.get_patient_by_insurance_no("A11")
+            self.assertEqual(mock_fetch.call_count, 2)
+
+    def test_multi_patient_lookup(self):
+        """
+        Test that several patients are fetched with one query, in request order,
+        and that a repeated lookup is served from the cache, misses included.
+        """
+        conn = sqlite3.connect(":memory:")
+        conn.execute(
+            "CREATE TABLE PATIENT (insurance_no TEXT, fname TEXT, lname TEXT, sex TEXT, "
+            "insurance_provider TEXT)"
+        )
+        for insurance_no in ["A11", "B11", "C11"]:
+            conn.execute(
+                "INSERT INTO PATIENT VALUES (?, 'Vernon', 'Lopez', 'M', 'ABC')",
+                (insurance_no,),
+            )
+        self.cache = PatientCache(
+            max_size=10, ttl=10, negative_ttl=10, clock=self.clock
+        )
+        data_utils = DataUtils(conn, patient_cache=self.cache, placeholder="?")
+        with patch.object(DataUtils, "_fetch", wraps=data_utils._fetch) as mock_fetch:
+            patients = data_utils.get_patients_by_insurance_nos(
+                ["C11", "X", "A11", "C11"]
+            )
+            self.assertEqual([p.insurance_no for p in patients], ["C11", "A11"])
+            self.assertEqual(mock_fetch.call_count, 1)
+            data_utils.get_patients_by_insurance_nos(["A11", "X"])
+            self.assertEqual(mock_fetch.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+import os
+import tempfile
+import unittest
+
+from datamodel.models import Interaction, Patient
+from tests.helpers import create_tables
+from utils.async_data_utils import AsyncDataUtils
+from utils.async_pool import AsyncConnectionPool
+from utils.backends import SQLiteBackend
+from utils.data_utils import DataUtils
+from utils.replica_router import ReplicaRouter, replica_lag
+
+
+def patient(insurance_no):
+    return Patient(
+        insurance_no=insurance_no,
+        fname="Vernon",
+        lname="Lopez",
+        sex="M",
+        insurance_provider="ABC",
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestReplicaRouter(unittest.TestCase):
+    """
+    Test suite for the routing decisions of ReplicaRouter.
+    """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.router = ReplicaRouter(
+            ["r1", "r2"], max_lag=5.0, sticky_seconds=10.0, clock=self.clock
+        )
+        self.router.report_lag(0, 0.0)
+        self.router.report_lag(1, 1.0)
+
+    def test_round_robin_over_fresh_replicas(self):
+        """
+        Test that reads alternate between the replicas within the lag threshold.
+        """
+        self.assertEqual({self.router.replica_for() for _ in range(4)}, {"r1", "r2"})
+        self.router.report_lag(1, 30.0)
+        self.assertEqual({self.router.replica_for() for _ in range(4)}, {"r1"})
+
+    def test_lagging_or_unknown_replicas_fall_back_to_primary(self):
+        """
+        Test that reads go to the primary when no replica is fresh enough.
+        """
+        self.router.report_lag(0, 30.0)
+        self.router.report_lag(1, None)
+        self.assertIsNone(self.router.replica_for())
+        self.assertEqual(self.router.stats()["lagging_reads"], 1)
+
+    def test_read_your_writes(self):
+        """
+        Test that the reads of a written patient go to the primary until the
+        stickiness expires, and that other patients are still read from replicas.
+        """
+        self.router.mark_written(["A11"])
+        self.assertIsNone(self.router.replica_for(["A11"]))
+        self.assertIsNone(self.router.replica_for(["B11", "A11"]))
+        self.assertIsNotNone(self.router.replica_for(["B11"]))
+        self.clock.now = 10.0
+        self.assertIsNotNone(self.router.replica_for(["A11"]))
+        self.router.mark_written(["B11"])
+        self.assertEqual(self.router.stats()["sticky_keys"], 1)
+
+    def test_sticky_keys_are_bounded(self):
+        """
+        Test that the oldest written insurance numbers are forgotten first.
+        """
+        self.router.max_sticky_keys = 2
+        self.router.mark_written(["A11", "B11", "C11"])
+        self.assertFalse(self.router.is_sticky(["A11"]))
+        self.assertTrue(self.router.is_sticky(["C11"]))
+
+    def test_lag_check_interval(self):
+        """
+        Test that lag checks are due once per interval.
+        """
+        self.assertTrue(self.router.lag_check_due())
+        self.assertFalse(self.router.lag_check_due())
+        self.clock.now = 1.0
+        self.assertTrue(self.router.lag_check_due())
+
+    def test_replica_lag(self):
+        """
+        Test reading the delay from the rows of SHOW REPLICA STATUS.
+        """
+        self.assertEqual(replica_lag([("x", 3)], ("Host", "Seconds_Behind_Source")), 3)
+        self.assertIsNone(replica_lag([("x", None)], ("Host", "Seconds_Behind_Master")))
+        self.assertIsNone(replica_lag([], ("Seconds_Behind_Source",)))
+
+
+class TestReplicaRouting(unittest.TestCase):
+    """
+    Test suite for DataUtils routing reads over two SQLite files acting as
+    primary and replica.
+    """
+
+    def setUp(self):
+        """
+        Create the tables in a primary and a replica file; rows are "replicated"
+        by inserting them into the replica directly.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.primary = SQLiteBackend(os.path.join(self.tmp_dir.name, "primary.db"))
+        self.replica = SQLiteBackend(os.path.join(self.tmp_dir.name, "replica.db"))
+        self.primary_conn = self.primary.connect()
+        self.replica_conn = self.replica.connect()
+        self.replica_utils = DataUtils(self.replica_conn, placeholder="?")
+        create_tables(DataUtils(self.primary_conn, placeholder="?"))
+        create_tables(self.replica_utils)
+        self.clock = FakeClock()
+        self.router = ReplicaRouter(
+            [self.replica_conn],
+            max_lag=5.0,
+            sticky_seconds=10.0,
+            lag_check_interval=60.0,
+            clock=self.clock,
+        )
+        self.data_utils = DataUtils(
+            self.primary_conn, placeholder="?", replicas=self.router
+        )
+
+    def tearDown(self):
+        self.primary_conn.close()
+        self.replica_conn.close()
+        self.tmp_dir.cleanup()
+
+    def test_reads_go_to_the_replica(self):
+        """
+        Test that reads are served by the replica, whose lag SQLite reports as 0.
+        """
+        self.replica_utils.insert_patients([patient("B11")])
+        self.assertEqual(len(self.data_utils.get_patient_by_insurance_no("B11")), 1)
+        self.assertEqual(self.router.stats()["lags"], [0.0])
+        self.assertEqual(self.router.stats()["replica_reads"], 1)
+
+    def test_writes_are_read_from_the_primary(self):
+        """
+        Test that written patients and interactions are read back from the
+        primary until the stickiness expires, while the replica has not caught up.
+        """
+        self.data_utils.insert_patients([patient("A11")])
+        self.data_utils.insert_interactions([Interaction(id=1, insurance_no="A11")])
+        self.assertEqual(len(self.data_utils.get_patient_by_insurance_no("A11")), 1)
+        self.assertEqual(len(self.data_utils.get_interaction_info("A11")), 1)
+        self.assertEqual(self.data_utils.get_label_counts(), [])
+
+        self.clock.now = 10.0
+        self.assertEqual(self.data_utils.get_interaction_info("A11"), [])
+
+    def test_lagging_replica(self):
+        """
+        Test that reads fall back to the primary while the replica lags.
+        """
+        self.data_utils.insert_patients([patient("A11")])
+        self.clock.now = 10.0
+        self.assertEqual(self.data_utils.get_patient_by_insurance_no("A11"), [])
+        self.router.report_lag(0, 30.0)
+        self.assertEqual(len(self.data_utils.get_patient_by_insurance_no("A11")), 1)
+
+
+class TestAsyncReplicaRouting(unittest.IsolatedAsyncioTestCase):
+    """
+    Test suite for AsyncDataUtils routing reads to a replica pool.
+    """
+
+    async def test_read_your_writes(self):
+        """
+        Test that a written patient is read from the primary pool and others
+        from the replica pool.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            primary = SQLiteBackend(os.path.join(tmp_dir, "primary.db"))
+            replica = SQLiteBackend(os.path.join(tmp_dir, "replica.db"))
+            create_tables(DataUtils(primary.connect(), placeholder="?"))
+            create_tables(DataUtils(replica.connect(), placeholder="?"))
+            primary_pool = AsyncConnectionPool(driver=primary.async_driver())
+            replica_pool = AsyncConnectionPool(driver=replica.async_driver())
+            router = ReplicaRouter([replica_pool])
+            data_utils = AsyncDataUtils(primary_pool, placeholder="?", replicas=router)
+            try:
+                await data_utils.insert_patients([patient("A11")])
+                await data_utils.get_patient_by_insurance_no("A11")
+                await data_utils.get_patients_by_insurance_nos(["B11"])
+                self.assertEqual(router.stats()["sticky_reads"], 1)
+                self.assertEqual(router.stats()["replica_reads"], 1)
+                self.assertEqual(replica_pool.stats()["size"], 1)
+            finally:
+                await primary_pool.close()
+                await replica_pool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+from datamodel.models import Interaction
+from tests.helpers import sqlite_database
+from tests.test_patient_cache import FakeClock
+from utils.data_utils import DataUtils
+from utils.response_cache import ResponseCache, etag_matches
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    Test suite for the ResponseCache class.
+    """
+
+    def setUp(self):
+        """
+        Create a cache of about three small responses driven by a fake clock.
+        """
+        self.clock = FakeClock()
+        self.cache = ResponseCache(max_bytes=700, ttl=10, clock=self.clock)
+
+    def test_etag(self):
+        """
+        Test that equal bodies get equal strong tags and that If-None-Match
+        accepts lists, weak tags and the wildcard.
+        """
+        first = self.cache.put("/patient/A11/?", "A11", b"[1]")
+        self.assertEqual(first.etag, self.cache.put("/other?", "B11", b"[1]").etag)
+        self.assertNotEqual(first.etag, self.cache.put("/x?", "A11", b"[2]").etag)
+        self.assertTrue(etag_matches(f'"abc", W/{first.etag}', first.etag))
+        self.assertTrue(etag_matches("*", first.etag))
+        self.assertFalse(etag_matches(None, first.etag))
+        self.assertTrue(self.cache.not_modified(first, first.etag))
+        self.assertEqual(self.cache.stats()["not_modified"], 1)
+
+    def test_bytes_bound_evicts_least_recently_used(self):
+        """
+        Test that the cached size stays below max_bytes by evicting the least
+        recently used responses.
+        """
+        for i in range(3):
+            self.cache.put(f"/patient/{i}/?", str(i), b"x" * 10)
+        self.cache.get("/patient/0/?")
+        self.cache.put("/patient/3/?", "3", b"x" * 10)
+        self.assertIsNone(self.cache.get("/patient/1/?"))
+        self.assertIsNotNone(self.cache.get("/patient/0/?"))
+        stats = self.cache.stats()
+        self.assertEqual((stats["size"], stats["evictions"]), (3, 1))
+        self.assertLessEqual(stats["bytes"], stats["max_bytes"])
+        self.cache.put("/huge?", "4", b"x" * 1000)
+        self.assertIsNone(self.cache.get("/huge?"))
+
+    def test_invalidate_and_expire(self):
+        """
+        Test that invalidating a patient drops all of its responses, that a
+        response read before a write is not cached, and that entries expire.
+        """
+        self.cache.put("/patient/A11/?", "A11", b"[1]")
+        self.cache.put("/interactions/A11/?limit=1", "A11", b"[2]")
+        self.cache.put("/patient/B11/?", "B11", b"[3]")
+        generation = self.cache.generation()
+        self.cache.invalidate("A11")
+        self.assertIsNone(self.cache.get("/patient/A11/?"))
+        self.assertIsNone(self.cache.get("/interactions/A11/?limit=1"))
+        self.cache.put("/patient/A11/?", "A11", b"[1]", generation=generation)
+        self.assertIsNone(self.cache.get("/patient/A11/?"))
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get("/patient/B11/?"))
+        self.assertEqual(self.cache.stats()["expirations"], 1)
+
+    def test_inserts_invalidate(self):
+        """
+        Test that inserting interactions drops the responses of their patients.
+        """
+        data_utils = DataUtils(
+            sqlite_database(), placeholder="?", response_cache=self.cache
+        )
+        self.cache.put("/interactions/A11/?", "A11", b"[]")
+        self.cache.put("/interactions/B11/?", "B11", b"[]")
+        data_utils.insert_interactions([Interaction(id=1, insurance_no="A11")])
+        self.assertIsNone(self.cache.get("/interactions/A11/?"))
+        self.assertIsNotNone(self.cache.get("/interactions/B11/?"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import json
+import unittest
+from datetime import date
+
+from datamodel.models import Interaction, NextSteps
+from utils.data_utils import interaction_decoder, interaction_encoder, patient_decoder
+from utils.row_codec import InvalidFieldsError
+
+
+class TestRowDecoder(unittest.TestCase):
+    """
+    Test suite for the RowDecoder class.
+    """
+
+    def test_decodes_only_json_columns(self):
+        """
+        Test that JSON columns are parsed and plain text columns are kept as is.
+        """
+        row = (
+            1,
+            "A11",
+            "[1]",
+            "Sore throat",
+            "2024-01-05",
+            json.dumps({"bp": "120/80"}),
+            "",
+            3,
+            "",
+            json.dumps({"prescribed_meds": ["Paracetamol"]}),
+            "cold",
+        )
+        interaction = interaction_decoder.decode([row])[0]
+        self.assertEqual(interaction.ailment, "[1]")
+        self.assertEqual(interaction.interaction_date, date(2024, 1, 5))
+        self.assertEqual(interaction.metrics, {"bp": "120/80"})
+        self.assertIsNone(interaction.qa)
+        self.assertIsInstance(interaction.next_steps, NextSteps)
+        self.assertEqual(interaction.next_steps.prescribed_meds, ["Paracetamol"])
+
+    def test_maps_columns_by_name(self):
+        """
+        Test that a projection is decoded using the reported column names.
+        """
+        rows = [("Lopez", "A11", '["x.pdf"]')]
+        fields = patient_decoder.decode_dicts(
+            rows, columns=("lname", "insurance_no", "related_docs")
+        )
+        self.assertEqual(
+            fields,
+            [{"lname": "Lopez", "insurance_no": "A11", "related_docs": ["x.pdf"]}],
+        )
+
+    def test_projection_decodes_partial_models(self):
+        """
+        Test that a projection always includes the keys, rejects unknown fields
+        and decodes into models with only the selected fields set.
+        """
+        columns = patient_decoder.projection(["age", "lname"])
+        self.assertEqual(columns, ["insurance_no", "lname", "age"])
+        self.assertIsNone(patient_decoder.projection(None))
+        with self.assertRaises(InvalidFieldsError):
+            patient_decoder.projection(["shoe_size"])
+
+        patient = patient_decoder.decode([("A11", "Lopez", 30)], columns)[0]
+        self.assertEqual(patient.model_fields_set, {"insurance_no", "lname", "age"})
+        self.assertEqual(patient.age, 30)
+        self.assertEqual(
+            patient.model_dump(exclude_unset=True),
+            {"insurance_no": "A11", "lname": "Lopez", "age": 30},
+        )
+
+
+class TestRowEncoder(unittest.TestCase):
+    """
+    Test suite for the RowEncoder class.
+    """
+
+    def test_models_dicts_and_tuples_encode_alike(self):
+        """
+        Test that a model, a dict and a tuple of the same record give the same row.
+        """
+        interaction = Interaction(
+            id=1,
+            insurance_no="A11",
+            interaction_date=date(2024, 1, 5),
+            metrics={"bp": "120/80"},
+            next_steps=NextSteps(prescribed_meds=["Paracetamol"]),
+            label="cold",
+        )
+        row = interaction_encoder.encode_one(interaction)
+        self.assertEqual(len(row), len(interaction_encoder.columns))
+        self.assertEqual(json.loads(row[5]), {"bp": "120/80"})
+        self.assertEqual(json.loads(row[9])["prescribed_meds"], ["Paracetamol"])
+        self.assertIsNone(row[8])
+        self.assertEqual(interaction_encoder.encode_one(interaction.model_dump()), row)
+        self.assertEqual(
+            interaction_encoder.encode_one(tuple(interaction.model_dump().values())),
+            row,
+        )
+
+    def test_round_trip(self):
+        """
+        Test that decoding an encoded row gives back the original model.
+        """
+        interaction = Interaction(
+            id=2, insurance_no="A11", qa={"Do you smoke?": "No"}, label="cold"
+        )
+        rows = interaction_encoder.encode([interaction])
+        self.assertEqual(interaction_decoder.decode(rows), [interaction])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+from datamodel.models import Patient
+from utils.schema_registry import INTERACTION, PATIENT, PATIENT_HEALTH, registry
+from utils.sql_query_builder import SQLOperators, SQLQueryBuilder, SQLTypes
+from utils.table_schemas import InteractionSchema, PatientSchema
+
+
+class TestSchemaRegistry(unittest.TestCase):
+    """
+    Test suite for the SchemaRegistry and its precomputed tables.
+    """
+
+    def test_lookups(self):
+        """
+        Test that the columns, types, JSON columns and codecs of a table are
+        registered under its name.
+        """
+        self.assertIs(registry[PatientSchema.name], PATIENT)
+        self.assertEqual(
+            INTERACTION.column_names,
+            tuple(col.name for col in InteractionSchema.columns),
+        )
+        self.assertEqual(INTERACTION.column("id").dtype, SQLTypes.INT)
+        self.assertEqual(INTERACTION.dtypes["id"], SQLTypes.INT)
+        self.assertEqual(
+            INTERACTION.json_columns,
+            {col.name for col in InteractionSchema.columns if col.json_encoded},
+        )
+        self.assertIs(PATIENT.model, Patient)
+        self.assertIsNone(PATIENT_HEALTH.decoder)
+        with self.assertRaises(KeyError):
+            PATIENT.column("unknown")
+
+    def test_templates_are_built_once(self):
+        """
+        Test that the templates match those of the query builder and are built
+        once per parameter marker.
+        """
+        query = PATIENT.select_query("?", "insurance_no")
+        expected, _ = (
+            SQLQueryBuilder("?")
+            .select(columns=["*"], table=PatientSchema.name)
+            .conditions(
+                intersections=[(PATIENT.column("insurance_no"), SQLOperators.EQ, "")]
+            )
+            .construct()
+        )
+        self.assertEqual(query, expected)
+        self.assertIs(PATIENT.select_query("?", "insurance_no"), query)
+        self.assertNotEqual(PATIENT.select_query("%s", "insurance_no"), query)
+        self.assertIn("ON CONFLICT", PATIENT_HEALTH.upsert_query("?"))
+        self.assertIn("ON DUPLICATE KEY", PATIENT_HEALTH.upsert_query("%s"))
+
+    def test_precompile(self):
+        """
+        Test that precompiling builds the templates of every table.
+        """
+        registry.precompile("?")
+        for table in registry:
+            self.assertIn(("insert", "?"), table._templates)
+        self.assertIn(("select", "?", "insurance_no", None), PATIENT._templates)
+
+
+if __name__ == "__main__":
+    unittest.main()
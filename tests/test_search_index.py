@@ -0,0 +1,120 @@
+import unittest
+
+from datamodel.models import Interaction
+from tests.helpers import sqlite_database
+from utils.data_utils import DataUtils
+from utils.search_index import SearchIndex, tokenize
+
+
+def make_interactions():
+    return [
+        Interaction(
+            id=1,
+            insurance_no="A11",
+            ailment="Angina",
+            symptoms="Chest pain when climbing stairs",
+        ),
+        Interaction(
+            id=2,
+            insurance_no="A11",
+            symptoms="Pain in the chest, chest tightness",
+            qa={"Do you smoke?": "Yes, daily"},
+        ),
+        Interaction(
+            id=3,
+            insurance_no="B11",
+            symptoms="Back pain",
+            remarks="Pain in the chest ruled out",
+        ),
+        Interaction(id=4, insurance_no="B11", ailment="Chest pain"),
+    ]
+
+
+class TestSearchIndex(unittest.TestCase):
+    """
+    Test suite for the in-process full-text search index.
+    """
+
+    def setUp(self):
+        """
+        Index a few interactions of two patients.
+        """
+        self.index = SearchIndex()
+        self.index.add(make_interactions())
+
+    def test_tokenize(self):
+        """
+        Test that text is split into lower-cased words.
+        """
+        self.assertEqual(
+            tokenize("Chest-pain, 2 days!"), ["chest", "pain", "2", "days"]
+        )
+
+    def test_all_terms_must_match(self):
+        """
+        Test that a query matches the interactions containing all its terms, best
+        first, with the total number of matches.
+        """
+        hits, total = self.index.search("chest pain")
+        self.assertEqual(total, 4)
+        self.assertEqual(hits[0].id, 4)
+        self.assertEqual(self.index.search("chest smoke")[1], 0)
+        self.assertEqual([hit.id for hit in self.index.search("daily")[0]], [2])
+
+    def test_phrase(self):
+        """
+        Test that a quoted phrase needs consecutive words within one column.
+        """
+        hits, _ = self.index.search('"chest pain"')
+        self.assertEqual(sorted(hit.id for hit in hits), [1, 4])
+
+    def test_patient_and_pagination(self):
+        """
+        Test that a search can be restricted to a patient and paginated.
+        """
+        hits, total = self.index.search("pain", insurance_no="A11")
+        self.assertEqual((sorted(hit.id for hit in hits), total), ([1, 2], 2))
+        first, _ = self.index.search("pain", limit=3)
+        second, _ = self.index.search("pain", offset=3, limit=3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 1)
+        self.assertNotIn(second[0].id, [hit.id for hit in first])
+
+    def test_update_and_remove(self):
+        """
+        Test that re-adding an interaction replaces its postings and that removed
+        interactions are no longer found.
+        """
+        self.index.add([Interaction(id=4, insurance_no="B11", ailment="Migraine")])
+        self.assertEqual(self.index.search("migraine")[1], 1)
+        self.assertEqual(self.index.search('"chest pain"')[1], 1)
+        self.index.remove([4])
+        self.assertEqual(self.index.search("migraine")[1], 0)
+        self.assertEqual(self.index.stats()["interactions"], 3)
+
+    def test_incremental_update_and_rebuild(self):
+        """
+        Test that inserted interactions are indexed and that the index can be
+        rebuilt from the database.
+        """
+        conn = sqlite_database()
+        data_utils = DataUtils(conn, placeholder="?", search_index=SearchIndex())
+        data_utils.insert_interactions(make_interactions())
+        self.assertEqual(data_utils.search_index.search("stairs")[1], 1)
+
+        rebuilt = SearchIndex()
+        data_utils.rebuild_search_index(rebuilt, batch_size=3)
+        self.assertTrue(rebuilt.ready)
+        self.assertEqual(rebuilt.stats(), {**self.index.stats(), "ready": True})
+        hits, _ = rebuilt.search("daily")
+        self.assertEqual(
+            [
+                i.id
+                for i in data_utils.get_interactions_by_ids([hit.id for hit in hits])
+            ],
+            [2],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,11 @@
 import unittest
-from utils.sql_query_builder import SQLQueryBuilder, SQLOperators, SQLTypes
+from utils.sql_query_builder import (
+    SQLQueryBuilder,
+    SQLOperators,
+    SQLTypes,
+    split_in_list,
+)
+from utils.table_schemas import TableSchema
 
 
 class MockColumn:
@@ -55,8 +61,11 @@ class TestSQLQueryBuilder(unittest.TestCase):
             .conditions(intersections=conditions)
             .construct_query()
         )
-        expected_query = "SELECT col1,col2 FROM table WHERE  table.col1 = 'val1' AND table.col2 <= 'val2';"
+        expected_query = (
+            "SELECT col1,col2 FROM table WHERE  table.col1 = %s AND table.col2 <= %s;"
+        )
         self.assertEqual(query, expected_query)
+        self.assertEqual(self.sql_builder.params, ["val1", "val2"])
 
     def test_select_with_order_by(self):
         """
@@ -71,6 +80,110 @@ class TestSQLQueryBuilder(unittest.TestCase):
         expected_query = "SELECT col1,col2 FROM table ORDER BY col1 ASC;"
         self.assertEqual(query, expected_query)
 
+    def test_select_with_conditions_and_unions(self):
+        """
+        Test that OR-ed conditions are grouped when combined with AND-ed ones.
+        """
+        mock_col1 = MockColumn(name="col1", dtype=SQLTypes.VARCHAR)
+        mock_col2 = MockColumn(name="col2", dtype=SQLTypes.VARCHAR)
+        query = (
+            self.sql_builder.select(columns=["*"], table="table")
+            .conditions(
+                intersections=[(mock_col1, SQLOperators.EQ, "val1")],
+                unions=[
+                    (mock_col2, SQLOperators.LIKE, "a"),
+                    (mock_col2, SQLOperators.LIKE, "b"),
+                ],
+            )
+            .construct_query()
+        )
+        expected_query = "SELECT * FROM table WHERE  table.col1 = %s AND (table.col2 LIKE %s OR table.col2 LIKE %s);"
+        self.assertEqual(query, expected_query)
+        self.assertEqual(self.sql_builder.params, ["val1", "a", "b"])
+
+    def test_select_with_in_condition(self):
+        """
+        Test that an IN list is bound and padded to a power of two.
+        """
+        mock_col1 = MockColumn(name="col1", dtype=SQLTypes.VARCHAR)
+        query, params = (
+            self.sql_builder.select(columns=["col1"], table="table")
+            .conditions(intersections=[(mock_col1, SQLOperators.IN, ["a", "b", "c"])])
+            .construct()
+        )
+        expected_query = "SELECT col1 FROM table WHERE  table.col1 IN (%s,%s,%s,%s);"
+        self.assertEqual(query, expected_query)
+        self.assertEqual(params, ("a", "b", "c", "c"))
+
+    def test_select_with_in_select(self):
+        """
+        Test that a semi-join through a junction table follows the other conditions.
+        """
+        mock_col1 = MockColumn(name="col1", dtype=SQLTypes.VARCHAR)
+        query, params = (
+            self.sql_builder.select(columns=["*"], table="table")
+            .conditions(intersections=[(mock_col1, SQLOperators.EQ, "val1")])
+            .in_select("id", "table_tag", "table_id", "tag", ["a", "b", "c"])
+            .limit(limit=10)
+            .construct()
+        )
+        expected_query = (
+            "SELECT * FROM table WHERE  table.col1 = %s AND table.id IN "
+            "(SELECT table_tag.table_id FROM table_tag WHERE table_tag.tag IN (%s,%s,%s,%s)) "
+            "LIMIT %s;"
+        )
+        self.assertEqual(query, expected_query)
+        self.assertEqual(params, ("val1", "a", "b", "c", "c", 10))
+
+    def test_split_in_list(self):
+        """
+        Test that long IN lists are deduplicated and split into bounded lists.
+        """
+        self.assertEqual(
+            split_in_list(["a", "b", "a", "c", "d", "e"], max_size=2),
+            [["a", "b"], ["c", "d"], ["e"]],
+        )
+
+    def test_select_with_seek(self):
+        """
+        Test building a keyset pagination query with a seek predicate.
+        """
+        mock_col1 = MockColumn(name="col1", dtype=SQLTypes.VARCHAR)
+        mock_date = MockColumn(name="day", dtype=SQLTypes.DATE)
+        mock_id = MockColumn(name="id", dtype=SQLTypes.INT)
+        query = (
+            self.sql_builder.select(columns=["*"], table="table")
+            .conditions(intersections=[(mock_col1, SQLOperators.EQ, "val1")])
+            .seek(columns=[mock_date, mock_id], values=["2024-06-29", 7])
+            .order_by(col=["day", "id"], type=SQLOperators.ASC)
+            .limit(limit=10)
+            .construct_query()
+        )
+        expected_query = (
+            "SELECT * FROM table WHERE  table.col1 = %s AND "
+            "(table.day > %s OR (table.day = %s AND table.id > %s)) "
+            "ORDER BY day ASC,id ASC LIMIT %s;"
+        )
+        self.assertEqual(query, expected_query)
+        self.assertEqual(
+            self.sql_builder.params, ["val1", "2024-06-29", "2024-06-29", 7, 10]
+        )
+
+    def test_seek_after_null(self):
+        """
+        Test that a NULL sort key seeks to the non-NULL rows and the later NULL rows.
+        """
+        mock_date = MockColumn(name="day", dtype=SQLTypes.DATE)
+        mock_id = MockColumn(name="id", dtype=SQLTypes.INT)
+        query = (
+            self.sql_builder.select(columns=["*"], table="table")
+            .seek(columns=[mock_date, mock_id], values=[None, 7])
+            .construct_query()
+        )
+        expected_query = "SELECT * FROM table WHERE (table.day IS NOT NULL OR (table.day IS NULL AND table.id > %s));"
+        self.assertEqual(query, expected_query)
+        self.assertEqual(self.sql_builder.params, [7])
+
     def test_select_with_limit(self):
         """
         Test building a SELECT query with a LIMIT clause.
@@ -81,8 +194,9 @@ class TestSQLQueryBuilder(unittest.TestCase):
             .limit(limit=10)
             .construct_query()
         )
-        expected_query = "SELECT col1,col2 FROM table LIMIT 10;"
+        expected_query = "SELECT col1,col2 FROM table LIMIT %s;"
         self.assertEqual(query, expected_query)
+        self.assertEqual(self.sql_builder.params, [10])
 
     def test_select_with_offset(self):
         """
@@ -94,8 +208,9 @@ class TestSQLQueryBuilder(unittest.TestCase):
             .offset(offset=5)
             .construct_query()
         )
-        expected_query = "SELECT col1,col2 FROM table OFFSET 5;"
+        expected_query = "SELECT col1,col2 FROM table OFFSET %s;"
         self.assertEqual(query, expected_query)
+        self.assertEqual(self.sql_builder.params, [5])
 
     def test_select_with_group_by(self):
         """
@@ -154,6 +269,63 @@ class TestSQLQueryBuilder(unittest.TestCase):
         expected_query = "CREATE TABLE IF NOT EXISTS test_table (id INT AUTO_INCREMENT,name VARCHAR(255), PRIMARY KEY (id));"
         self.assertEqual(query, expected_query)
 
+    def test_create_table_with_indexes_query(self):
+        """
+        Test building a CREATE TABLE query declaring secondary indexes.
+        """
+        table = TableSchema(
+            name="test_table",
+            columns=[
+                TableSchema.Column(name="id", dtype=SQLTypes.INT),
+                TableSchema.Column(name="name", dtype=SQLTypes.VARCHAR),
+                TableSchema.Column(name="day", dtype=SQLTypes.DATE),
+            ],
+            constraints=["PRIMARY KEY (id)"],
+            indexes=[
+                TableSchema.Index(name="idx_name_day", columns=["name", "day"]),
+                TableSchema.Index(name="idx_day", columns=["day"], unique=True),
+            ],
+        )
+        query = self.sql_builder.create(table=table).construct_query()
+        expected_query = (
+            "CREATE TABLE IF NOT EXISTS test_table (id INT,name VARCHAR(255),day DATE, "
+            "PRIMARY KEY (id), INDEX idx_name_day (name,day), UNIQUE INDEX idx_day (day));"
+        )
+        self.assertEqual(query, expected_query)
+
+    def test_create_index_query(self):
+        """
+        Test building a CREATE INDEX query for an existing table.
+        """
+        index = TableSchema.Index(name="idx_name_day", columns=["name", "day"])
+        query = self.sql_builder.create_index(
+            table="test_table", index=index
+        ).construct_query()
+        expected_query = "CREATE INDEX idx_name_day ON test_table (name,day);"
+        self.assertEqual(query, expected_query)
+
+    def test_template_is_reused_across_values(self):
+        """
+        Test that queries of the same shape share one template and differ only
+        in their parameters.
+        """
+        mock_col1 = MockColumn(name="col1", dtype=SQLTypes.VARCHAR)
+        first_query, first_params = (
+            SQLQueryBuilder()
+            .select(columns=["*"], table="table")
+            .conditions(intersections=[(mock_col1, SQLOperators.EQ, "a")])
+            .construct()
+        )
+        second_query, second_params = (
+            SQLQueryBuilder()
+            .select(columns=["*"], table="table")
+            .conditions(intersections=[(mock_col1, SQLOperators.EQ, "b' OR 1=1 --")])
+            .construct()
+        )
+        self.assertIs(first_query, second_query)
+        self.assertEqual(first_params, ("a",))
+        self.assertEqual(second_params, ("b' OR 1=1 --",))
+
     def test_insert_batch_query(self):
         """
         Test building an INSERT INTO query.
@@ -165,6 +337,55 @@ class TestSQLQueryBuilder(unittest.TestCase):
         expected_query = "INSERT INTO table (col1,col2) VALUES (%s,%s);"
         self.assertEqual(query, expected_query)
 
+    def test_multi_row_insert_query(self):
+        """
+        Test building an INSERT INTO query taking several rows.
+        """
+        query = self.sql_builder.insert_batch(
+            table="table", columns=["col1", "col2"], rows=3
+        ).construct_query()
+        expected_query = "INSERT INTO table (col1,col2) VALUES (%s,%s),(%s,%s),(%s,%s);"
+        self.assertEqual(query, expected_query)
+
+    def test_upsert_increment_query(self):
+        """
+        Test that counters are incremented on a duplicate key in both dialects.
+        """
+        query = self.sql_builder.upsert_increment(
+            table="table", keys=["k"], counters=["c1", "c2"]
+        ).construct_query()
+        expected_query = (
+            "INSERT INTO table (k,c1,c2) VALUES (%s,%s,%s) "
+            "ON DUPLICATE KEY UPDATE c1 = c1 + VALUES(c1),c2 = c2 + VALUES(c2);"
+        )
+        self.assertEqual(query, expected_query)
+        query = (
+            SQLQueryBuilder("?")
+            .upsert_increment(
+                table="table", keys=["k"], counters=["c1"], dialect="sqlite"
+            )
+            .construct_query()
+        )
+        expected_query = (
+            "INSERT INTO table (k,c1) VALUES (?,?) "
+            "ON CONFLICT (k) DO UPDATE SET c1 = c1 + excluded.c1;"
+        )
+        self.assertEqual(query, expected_query)
+
+    def test_load_data_query(self):
+        """
+        Test that LOAD DATA binds the file path.
+        """
+        query, params = self.sql_builder.load_data(
+            table="table", columns=["col1", "col2"], path="/tmp/rows.tsv"
+        ).construct()
+        expected_query = (
+            "LOAD DATA LOCAL INFILE %s INTO TABLE table CHARACTER SET utf8mb4 "
+            "(col1,col2);"
+        )
+        self.assertEqual(query, expected_query)
+        self.assertEqual(params, ("/tmp/rows.tsv",))
+
 
 if __name__ == "__main__":
     unittest.main()
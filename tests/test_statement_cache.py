@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import MagicMock
+
+from utils.data_utils import DataUtils
+from utils.statement_cache import StatementCache
+
+
+class TestStatementCache(unittest.TestCase):
+    """
+    Test suite for the reuse of prepared statements per connection.
+    """
+
+    def setUp(self):
+        """
+        Create a mocked connection and a DataUtils instance with a private cache.
+        """
+        self.conn = MagicMock()
+        self.conn.cursor.return_value.fetchall.return_value = []
+        self.data_utils = DataUtils(self.conn)
+        self.data_utils.statement_cache = StatementCache(max_statements=1)
+
+    def test_same_shape_reuses_prepared_cursor(self):
+        """
+        Test that queries of the same shape run on one prepared cursor with new parameters.
+        """
+        self.data_utils.get_interaction_info(insurance_no="A11")
+        self.data_utils.get_interaction_info(insurance_no="B11", limit=5)
+        self.conn.cursor.assert_called_once_with(prepared=True)
+        (first, first_params), (second, second_params) = [
+            call.args for call in self.conn.cursor.return_value.execute.call_args_list
+        ]
+        self.assertIs(first, second)
+        self.assertEqual(first_params, ("A11", 11, 0))
+        self.assertEqual(second_params, ("B11", 6, 0))
+
+    def test_evicts_least_recently_used_statement(self):
+        """
+        Test that statements beyond max_statements are closed.
+        """
+        self.data_utils.get_interaction_info(insurance_no="A11")
+        self.data_utils.get_patient_by_insurance_no("A11")
+        self.conn.cursor.return_value.close.assert_called_once()
+        self.assertEqual(self.data_utils.statement_cache.stats()["evictions"], 1)
+
+    def test_driver_without_prepared_cursors(self):
+        """
+        Test that a driver rejecting prepared cursors falls back to plain cursors.
+        """
+        self.conn.cursor.side_effect = lambda *args, **kwargs: (
+            self._raise() if kwargs else self.conn.cursor.return_value
+        )
+        self.data_utils.get_patient_by_insurance_no("A11")
+        self.data_utils.get_patient_by_insurance_no("A11")
+        self.assertEqual(self.conn.cursor.call_count, 3)
+
+    @staticmethod
+    def _raise():
+        raise TypeError("cursor() takes no keyword arguments")
+
+
+if __name__ == "__main__":
+    unittest.main()
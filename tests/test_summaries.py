@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from datamodel.models import GroupCount, Interaction, PatientHealth
+from tests.helpers import create_tables, sqlite_database
+from utils.backends import SQLiteBackend
+from utils.data_utils import DataUtils
+
+
+class TestSummaries(unittest.TestCase):
+    """
+    Test suite for the interaction summary tables.
+    """
+
+    def setUp(self):
+        """
+        Insert interactions of two patients in two batches.
+        """
+        self.conn = sqlite_database()
+        self.data_utils = DataUtils(self.conn, placeholder="?")
+        self.data_utils.insert_interactions(
+            [
+                Interaction(
+                    id=1,
+                    insurance_no="A11",
+                    ailment="Flu",
+                    interaction_date=date(2024, 1, 5),
+                    health_status=2,
+                    label="cough, fever",
+                ),
+                Interaction(
+                    id=2,
+                    insurance_no="A11",
+                    ailment="Flu",
+                    interaction_date=date(2024, 1, 20),
+                    health_status=4,
+                    label="fever",
+                ),
+                Interaction(
+                    id=3,
+                    insurance_no="A11",
+                    interaction_date=date(2024, 2, 1),
+                ),
+                Interaction(id=4, insurance_no="B11", ailment="Migraine"),
+            ],
+            batch_size=2,
+        )
+
+    def test_interaction_counts(self):
+        """
+        Test that interactions are counted per label, ailment and month as they
+        are inserted, missing values left out.
+        """
+        self.assertEqual(
+            self.data_utils.get_interaction_counts("label"),
+            [GroupCount(value="cough", count=1), GroupCount(value="fever", count=2)],
+        )
+        self.assertEqual(
+            self.data_utils.get_interaction_counts("ailment"),
+            [GroupCount(value="Flu", count=2), GroupCount(value="Migraine", count=1)],
+        )
+        self.assertEqual(
+            self.data_utils.get_interaction_counts("month"),
+            [
+                GroupCount(value="2024-01", count=2),
+                GroupCount(value="2024-02", count=1),
+            ],
+        )
+
+    def test_patient_health(self):
+        """
+        Test that the average health status only counts interactions with one.
+        """
+        self.assertEqual(
+            self.data_utils.get_patient_health(),
+            [
+                PatientHealth(
+                    insurance_no="A11", interactions=3, average_health_status=3.0
+                ),
+                PatientHealth(
+                    insurance_no="B11", interactions=1, average_health_status=None
+                ),
+            ],
+        )
+        self.assertEqual(
+            [p.insurance_no for p in self.data_utils.get_patient_health("B11")],
+            ["B11"],
+        )
+
+    def test_rebuild_summaries(self):
+        """
+        Test that rebuilding from the interactions gives the incremental result.
+        """
+        counts = {
+            dimension: self.data_utils.get_interaction_counts(dimension)
+            for dimension in ("label", "ailment", "month")
+        }
+        health = self.data_utils.get_patient_health()
+        self.conn.execute("DELETE FROM INTERACTION_COUNT")
+        self.conn.execute("UPDATE PATIENT_HEALTH SET interactions = 0")
+        self.assertEqual(self.data_utils.rebuild_summaries(), (6, 2))
+        for dimension, expected in counts.items():
+            self.assertEqual(
+                self.data_utils.get_interaction_counts(dimension), expected
+            )
+        self.assertEqual(self.data_utils.get_patient_health(), health)
+
+    def test_rebuild_does_not_lose_concurrent_inserts(self):
+        """
+        Test that an interaction inserted from another connection while the
+        summaries are rebuilt is counted once the rebuild has committed.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            backend = SQLiteBackend(
+                os.path.join(tmp_dir, "test.db"), {"foreign_keys": "OFF"}
+            )
+            data_utils = DataUtils(backend.connect(), placeholder="?")
+            create_tables(data_utils)
+            data_utils.insert_interactions(
+                [Interaction(id=1, insurance_no="B11", ailment="Migraine")]
+            )
+            backend.pragmas["busy_timeout"] = 0
+            other = DataUtils(backend.connect(), placeholder="?")
+            interaction = Interaction(id=2, insurance_no="B11", ailment="Migraine")
+            label_counts_query = data_utils._label_counts_query
+            blocked = []
+
+            def insert_meanwhile():
+                try:
+                    other.insert_interactions([interaction])
+                except sqlite3.OperationalError:
+                    blocked.append(interaction)
+                return label_counts_query()
+
+            with patch.object(data_utils, "_label_counts_query", insert_meanwhile):
+                data_utils.rebuild_summaries()
+            for pending in blocked:
+                other.insert_interactions([pending])
+            self.assertEqual(
+                data_utils.get_interaction_counts("ailment"),
+                [GroupCount(value="Migraine", count=2)],
+            )
+            self.assertEqual(data_utils.get_patient_health()[0].interactions, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
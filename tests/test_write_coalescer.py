@@ -0,0 +1,159 @@
+import asyncio
+import unittest
+
+from datamodel.models import Interaction, Patient
+from tests.helpers import create_tables
+from utils.async_data_utils import AsyncDataUtils
+from utils.async_pool import AsyncConnectionPool
+from utils.backends import MemoryBackend
+from utils.data_utils import DataUtils
+from utils.instrumentation import PrometheusInstrumentation
+from utils.write_coalescer import WriteCoalescer
+
+
+class TestWriteCoalescer(unittest.IsolatedAsyncioTestCase):
+    """
+    Test suite for the WriteCoalescer group commit.
+    """
+
+    async def asyncSetUp(self):
+        """
+        Record the batches written by a coalescer reporting to a fresh
+        instrumentation.
+        """
+        self.batches = []
+        self.instrumentation = PrometheusInstrumentation()
+
+    async def insert(self, records):
+        self.batches.append(list(records))
+        if "bad" in records:
+            raise ValueError("bad record")
+
+    def coalescer(self, **kwargs) -> WriteCoalescer:
+        return WriteCoalescer(
+            self.insert,
+            table="INTERACTION",
+            instrumentation=self.instrumentation,
+            **kwargs,
+        )
+
+    async def test_concurrent_records_share_a_write(self):
+        """
+        Test that records submitted within the window are written together and
+        that the batch size and added delay are reported.
+        """
+        coalescer = self.coalescer(window=0.01)
+        await asyncio.gather(*[coalescer.submit(i) for i in range(3)])
+        self.assertEqual(self.batches, [[0, 1, 2]])
+        self.assertEqual(coalescer.stats()["batches"], 1)
+        metrics = self.instrumentation.render()
+        self.assertIn('db_write_batch_size_sum{table="INTERACTION"} 3', metrics)
+        self.assertIn(
+            'db_write_coalesce_delay_seconds_count{table="INTERACTION"} 3', metrics
+        )
+
+    async def test_full_batch_is_written_without_waiting(self):
+        """
+        Test that a batch reaching the bound is written before the window ends.
+        """
+        coalescer = self.coalescer(window=60.0, max_batch=2)
+        await asyncio.wait_for(
+            asyncio.gather(*[coalescer.submit(i) for i in range(4)]), timeout=5
+        )
+        self.assertEqual(self.batches, [[0, 1], [2, 3]])
+
+    async def test_each_record_gets_its_own_outcome(self):
+        """
+        Test that a failed batch is retried record by record, so that only the
+        offending record fails.
+        """
+        coalescer = self.coalescer(window=0.01)
+        results = await asyncio.gather(
+            coalescer.submit("a"),
+            coalescer.submit("bad"),
+            coalescer.submit("b"),
+            return_exceptions=True,
+        )
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], ValueError)
+        self.assertIsNone(results[2])
+        self.assertEqual(self.batches[0], ["a", "bad", "b"])
+        self.assertEqual(coalescer.stats()["retried_batches"], 1)
+
+    async def test_close_writes_pending_records(self):
+        """
+        Test that closing writes the open batch.
+        """
+        coalescer = self.coalescer(window=60.0)
+        submitted = asyncio.ensure_future(coalescer.submit("a"))
+        await asyncio.sleep(0)
+        await coalescer.close()
+        await submitted
+        self.assertEqual(self.batches, [["a"]])
+
+    async def test_interrupted_write_fails_its_submitters(self):
+        """
+        Test that submitters get an error instead of waiting forever when the
+        write of their batch is cancelled.
+        """
+
+        async def hanging_insert(records):
+            await asyncio.Event().wait()
+
+        coalescer = WriteCoalescer(hanging_insert, window=0.0)
+        submitted = asyncio.gather(
+            coalescer.submit("a"), coalescer.submit("b"), return_exceptions=True
+        )
+        await asyncio.sleep(0.01)
+        for write in coalescer._writes:
+            write.cancel()
+        results = await asyncio.wait_for(submitted, timeout=5)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+    async def test_group_commit_on_sqlite(self):
+        """
+        Test that coalesced interactions are committed in one transaction of
+        the async data utilities and that a duplicate id only fails its request.
+        """
+        backend = MemoryBackend()
+        create_tables(DataUtils(backend.connect(), placeholder="?"))
+        pool = AsyncConnectionPool(driver=backend.async_driver(), max_size=1)
+        data_utils = AsyncDataUtils(pool, placeholder="?")
+        await data_utils.insert_patients(
+            [
+                Patient(
+                    insurance_no="A11",
+                    fname="Vernon",
+                    lname="Lopez",
+                    sex="M",
+                    insurance_provider="ABC",
+                )
+            ]
+        )
+        await data_utils.insert_interactions([Interaction(id=1, insurance_no="A11")])
+
+        async def insert(interactions):
+            await data_utils.insert_interactions(
+                interactions, batch_size=len(interactions), atomic=True
+            )
+
+        coalescer = WriteCoalescer(insert, window=0.01)
+        try:
+            results = await asyncio.gather(
+                *[
+                    coalescer.submit(Interaction(id=i, insurance_no="A11"))
+                    for i in (2, 1, 3)
+                ],
+                return_exceptions=True,
+            )
+            self.assertIsNone(results[0])
+            self.assertIsInstance(results[1], Exception)
+            self.assertIsNone(results[2])
+            interactions = await data_utils.get_interaction_info("A11", limit=10)
+            self.assertEqual([i.id for i in interactions], [1, 2, 3])
+        finally:
+            await pool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
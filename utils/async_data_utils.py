@@ -0,0 +1,352 @@
+import time
+from typing import Any, List, Optional, Sequence, Set, Tuple, Union
+
+from utils.async_pool import AsyncConnectionPool
+from utils.data_utils import COMMIT, BaseDataUtils, Operation, Read, Record
+from utils.patient_cache import PatientCache
+from utils.replica_router import ReplicaRouter
+from utils.response_cache import ResponseCache
+from utils.row_codec import RowDecoder
+from utils.search_index import SearchIndex
+from datamodel.models import (
+    GroupCount,
+    Interaction,
+    LabelCount,
+    Patient,
+    PatientHealth,
+)
+
+
+class AsyncDataUtils(BaseDataUtils):
+    """
+    Asyncio counterpart of ``DataUtils`` for the API endpoints.
+
+    Every operation borrows a connection from an ``AsyncConnectionPool`` and
+    awaits the database round trips, so a single worker can keep many queries
+    in flight. Patient lookups are served from ``patient_cache`` when one is given.
+    ``placeholder`` is the parameter marker of the driver, e.g. ``?`` for sqlite3.
+    The replicas of a ``ReplicaRouter`` are ``AsyncConnectionPool`` objects as well.
+    """
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        patient_cache: PatientCache = None,
+        placeholder: str = "%s",
+        search_index: SearchIndex = None,
+        response_cache: ResponseCache = None,
+        replicas: ReplicaRouter = None,
+    ):
+        self.pool = pool
+        self.patient_cache = patient_cache
+        self.placeholder = placeholder
+        self.search_index = search_index
+        self.response_cache = response_cache
+        self.replicas = replicas
+
+    async def _read_source(
+        self, insurance_nos: Sequence[str] = ()
+    ) -> Optional[AsyncConnectionPool]:
+        """
+        Choose where a read goes.
+
+        Args:
+            insurance_nos (Sequence[str], optional): The insurance numbers the read
+                is about, empty for reads across patients.
+
+        Returns:
+            Optional[AsyncConnectionPool]: A replica, or None for the primary.
+        """
+        if self.replicas is None:
+            return None
+        if self.replicas.lag_check_due():
+            await self._run(self._check_replica_lag())
+        return self.replicas.replica_for(insurance_nos)
+
+    async def _read_cursor(self, conn: Any, query: str) -> Tuple[Any, bool]:
+        """
+        Get a cursor to run a read query on, preferring a cached prepared statement.
+
+        Args:
+            conn (Any): The borrowed connection.
+            query (str): The query template.
+
+        Returns:
+            Tuple[Any, bool]: The cursor and whether it is a cached prepared cursor,
+            which must stay open.
+        """
+        if not self.statement_cache.supports(conn):
+            return await conn.cursor(), False
+        cursor = self.statement_cache.get(conn, query)
+        if cursor is None:
+            try:
+                cursor = await conn.cursor(prepared=True)
+            except TypeError:
+                self.statement_cache.mark_unsupported(conn)
+                return await conn.cursor(), False
+            evicted = self.statement_cache.put(conn, query, cursor)
+            if evicted is not None:
+                await evicted.close()
+        return cursor, True
+
+    async def _fetch(
+        self,
+        query: str,
+        params: Tuple = (),
+        prepared: bool = True,
+        source: Optional[AsyncConnectionPool] = None,
+    ) -> Tuple[List[Tuple], Optional[Tuple[str, ...]]]:
+        """
+        Run a read query on a borrowed connection and return all rows.
+
+        Args:
+            query (str): The SQL query template.
+            params (Tuple, optional): The values bound to the placeholders.
+            prepared (bool, optional): Run it as a reusable prepared statement.
+            source (Optional[AsyncConnectionPool], optional): The replica to read
+                from, None for the primary.
+
+        Returns:
+            Tuple[List[Tuple], Optional[Tuple[str, ...]]]: The fetched rows and
+            the names of their columns.
+        """
+        started = time.perf_counter()
+        async with (source or self.pool).connection() as conn:
+            acquired = time.perf_counter()
+            if prepared:
+                cursor, cached = await self._read_cursor(conn, query)
+            else:
+                cursor, cached = await conn.cursor(), False
+            await cursor.execute(query, params)
+            rows = await cursor.fetchall()
+            columns = RowDecoder.columns_of(cursor.description)
+            if not cached:
+                await cursor.close()
+        self.instrumentation.observe_query(
+            query, time.perf_counter() - acquired, len(rows), acquired - started
+        )
+        return rows, columns
+
+    async def _run(self, operation: Operation) -> Any:
+        """
+        Run an operation, every read on a connection borrowed for it alone.
+
+        Errors of a read are raised inside the operation.
+
+        Args:
+            operation (Operation): The operation, yielding ``Read`` steps.
+
+        Returns:
+            Any: The value the operation returns.
+        """
+        send, value = operation.send, None
+        while True:
+            try:
+                read = send(value)
+            except StopIteration as done:
+                return done.value
+            try:
+                source = read.source
+                if source is None and read.route is not None:
+                    source = await self._read_source(read.route)
+                value = await self._fetch(
+                    read.query, read.params, read.prepared, source
+                )
+                send = operation.send
+            except Exception as e:
+                send, value = operation.throw, e
+
+    async def _transact(self, operation: Operation) -> Any:
+        """
+        Run an operation in a transaction on one connection of the primary.
+
+        Work left uncommitted when the operation fails is rolled back.
+
+        Args:
+            operation (Operation): The operation, yielding ``Read``, ``Write``
+                and ``COMMIT`` steps.
+
+        Returns:
+            Any: The value the operation returns.
+        """
+        started = time.perf_counter()
+        async with self.pool.connection() as conn:
+            pool_wait = time.perf_counter() - started
+            cursor = await conn.cursor()
+            try:
+                send, value = operation.send, None
+                while True:
+                    try:
+                        step = send(value)
+                    except StopIteration as done:
+                        return done.value
+                    send, value = operation.send, None
+                    if step is COMMIT:
+                        await conn.commit()
+                        continue
+                    step_started = time.perf_counter()
+                    try:
+                        if isinstance(step, Read):
+                            await cursor.execute(step.query, step.params)
+                            value = (
+                                await cursor.fetchall(),
+                                RowDecoder.columns_of(cursor.description),
+                            )
+                            rows = len(value[0])
+                        elif step.many:
+                            await cursor.executemany(step.query, step.params)
+                            rows = len(step.params)
+                        else:
+                            await cursor.execute(step.query, step.params)
+                            rows = max(cursor.rowcount, 0)
+                    except Exception as e:
+                        send, value = operation.throw, e
+                        continue
+                    self.instrumentation.observe_query(
+                        step.query, time.perf_counter() - step_started, rows, pool_wait
+                    )
+                    pool_wait = 0.0
+            except BaseException:
+                await conn.rollback()
+                raise
+            finally:
+                await cursor.close()
+
+    async def get_patient_by_insurance_no(
+        self, insurance_no: str, fields: Optional[List[str]] = None
+    ) -> List[Patient]:
+        """
+        Async counterpart of ``DataUtils.get_patient_by_insurance_no``.
+        """
+        return await self._run(self._get_patient_by_insurance_no(insurance_no, fields))
+
+    async def get_patients_by_insurance_nos(
+        self, insurance_nos: List[str], fields: Optional[List[str]] = None
+    ) -> List[Patient]:
+        """
+        Async counterpart of ``DataUtils.get_patients_by_insurance_nos``.
+        """
+        return await self._run(
+            self._get_patients_by_insurance_nos(insurance_nos, fields)
+        )
+
+    async def existing_insurance_nos(self, insurance_nos: List[str]) -> Set[str]:
+        """
+        Async counterpart of ``DataUtils.existing_insurance_nos``.
+        """
+        return await self._run(self._existing_insurance_nos(insurance_nos))
+
+    async def get_interaction_info(
+        self,
+        insurance_no: int = None,
+        labels: str = None,
+        offset: int = 0,
+        limit: int = 10,
+        cursor: str = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[Interaction]:
+        """
+        Async counterpart of ``DataUtils.get_interaction_info``.
+        """
+        interactions, _ = await self._run(
+            self._get_interaction_page(
+                insurance_no, labels, offset, limit, cursor, fields
+            )
+        )
+        return interactions
+
+    async def get_interaction_page(
+        self,
+        insurance_no: int = None,
+        labels: str = None,
+        offset: int = 0,
+        limit: int = 10,
+        cursor: str = None,
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[List[Interaction], Optional[str]]:
+        """
+        Async counterpart of ``DataUtils.get_interaction_page``.
+        """
+        return await self._run(
+            self._get_interaction_page(
+                insurance_no, labels, offset, limit, cursor, fields
+            )
+        )
+
+    async def get_interaction_page_json(
+        self,
+        insurance_no: int = None,
+        labels: str = None,
+        offset: int = 0,
+        limit: int = 10,
+        cursor: str = None,
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[bytes, Optional[str]]:
+        """
+        Async counterpart of ``DataUtils.get_interaction_page_json``.
+        """
+        return await self._run(
+            self._get_interaction_page_json(
+                insurance_no, labels, offset, limit, cursor, fields
+            )
+        )
+
+    async def get_interactions_by_ids(
+        self, interaction_ids: List[int]
+    ) -> List[Interaction]:
+        """
+        Async counterpart of ``DataUtils.get_interactions_by_ids``.
+        """
+        return await self._run(self._get_interactions_by_ids(interaction_ids))
+
+    async def rebuild_search_index(
+        self, search_index: SearchIndex, batch_size: int = 10000
+    ):
+        """
+        Async counterpart of ``DataUtils.rebuild_search_index``.
+        """
+        await self._run(self._rebuild_search_index(search_index, batch_size))
+
+    async def get_label_counts(self) -> List[LabelCount]:
+        """
+        Async counterpart of ``DataUtils.get_label_counts``.
+        """
+        return await self._run(self._get_label_counts())
+
+    async def get_interaction_counts(self, dimension: str) -> List[GroupCount]:
+        """
+        Async counterpart of ``DataUtils.get_interaction_counts``.
+        """
+        return await self._run(self._get_interaction_counts(dimension))
+
+    async def get_patient_health(
+        self, insurance_no: Optional[str] = None, offset: int = 0, limit: int = 100
+    ) -> List[PatientHealth]:
+        """
+        Async counterpart of ``DataUtils.get_patient_health``.
+        """
+        return await self._run(self._get_patient_health(insurance_no, offset, limit))
+
+    async def insert_interactions(
+        self,
+        interactions: List[Union[Interaction, Record]],
+        batch_size: int = 100,
+        atomic: bool = False,
+    ):
+        """
+        Async counterpart of ``DataUtils.insert_interactions``.
+        """
+        await self._transact(
+            self._insert_interactions(interactions, batch_size, atomic)
+        )
+
+    async def insert_patients(
+        self,
+        patients: List[Union[Patient, Record]],
+        batch_size: int = 100,
+        atomic: bool = False,
+    ):
+        """
+        Async counterpart of ``DataUtils.insert_patients``.
+        """
+        await self._transact(self._insert_patients(patients, batch_size, atomic))
@@ -0,0 +1,295 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, List, Tuple
+
+import mysql.connector.aio
+
+from utils.connection_pool import BasePool
+
+
+class AsyncDriver:
+    """
+    Abstraction over an asyncio database driver.
+
+    ``connect`` must return a connection exposing the coroutine methods
+    ``cursor``, ``commit``, ``rollback``, ``close`` and ``is_connected``; the
+    cursor exposes the coroutines ``execute``, ``executemany``, ``fetchall``
+    and ``close`` plus the ``description`` attribute, as in ``mysql.connector.aio``.
+    """
+
+    async def connect(self) -> Any:
+        raise NotImplementedError
+
+
+class MySQLAsyncDriver(AsyncDriver):
+    """
+    Native asyncio MySQL driver backed by ``mysql.connector.aio``.
+
+    Attributes:
+        connect_kwargs (dict): Keyword arguments passed to ``mysql.connector.aio.connect``.
+    """
+
+    def __init__(self, **connect_kwargs):
+        self.connect_kwargs = connect_kwargs
+
+    async def connect(self) -> Any:
+        return await mysql.connector.aio.connect(**self.connect_kwargs)
+
+
+class ThreadedAsyncCursor:
+    """
+    Async facade over a blocking DB-API cursor; every call runs in the worker
+    thread of its connection.
+    """
+
+    def __init__(self, cursor: Any, run: Callable[..., Any]):
+        self._cursor = cursor
+        self._run = run
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    async def execute(self, query: str, params: Any = ()):
+        return await self._run(self._cursor.execute, query, params)
+
+    async def executemany(self, query: str, seq_params: Any):
+        return await self._run(self._cursor.executemany, query, seq_params)
+
+    async def fetchall(self) -> List[Tuple]:
+        return await self._run(self._cursor.fetchall)
+
+    async def close(self):
+        return await self._run(self._cursor.close)
+
+
+class ThreadedAsyncConnection:
+    """
+    Async facade over a blocking DB-API connection; every call runs in a worker
+    thread owned by the connection.
+
+    A dedicated thread rather than the shared default executor: a call blocked
+    on a database lock, e.g. an SQLite writer waiting for ``busy_timeout``,
+    must not hold up the thread the lock holder needs to commit.
+    """
+
+    def __init__(self, conn: Any):
+        self._conn = conn
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def cursor(self, *args, **kwargs) -> ThreadedAsyncCursor:
+        cursor = await self._run(self._conn.cursor, *args, **kwargs)
+        return ThreadedAsyncCursor(cursor, self._run)
+
+    async def commit(self):
+        return await self._run(self._conn.commit)
+
+    async def rollback(self):
+        return await self._run(self._conn.rollback)
+
+    async def close(self):
+        try:
+            return await self._run(self._conn.close)
+        finally:
+            self._executor.shutdown(wait=False)
+
+    async def is_connected(self) -> bool:
+        is_connected = getattr(self._conn, "is_connected", None)
+        if not callable(is_connected):
+            return True
+        return await self._run(is_connected)
+
+
+class ThreadedAsyncDriver(AsyncDriver):
+    """
+    Adapts a blocking driver to the ``AsyncDriver`` interface using worker threads.
+
+    This is the fallback for drivers without native asyncio support.
+
+    Attributes:
+        connect (Callable[[], Any]): Function opening a blocking connection.
+    """
+
+    def __init__(self, connect: Callable[[], Any]):
+        self._connect = connect
+
+    async def connect(self) -> Any:
+        conn = await asyncio.to_thread(self._connect)
+        return ThreadedAsyncConnection(conn)
+
+
+class AsyncConnectionPool(BasePool):
+    """
+    An asyncio pool of database connections opened through an ``AsyncDriver``.
+
+    It shares its bookkeeping with ``ConnectionPool``: connections are opened
+    lazily up to ``max_size``, idle ones are recycled after ``max_idle_time``
+    and dead ones are replaced on checkout when ``health_check`` is enabled.
+    Waiting for a connection suspends the coroutine instead of blocking a thread.
+
+    Attributes:
+        driver (AsyncDriver): Driver used to open connections.
+        min_size (int): Number of connections kept open while idle.
+        max_size (int): Maximum number of simultaneously open connections.
+        timeout (float): Seconds to wait for a free connection before failing.
+        max_idle_time (float): Seconds after which an idle connection is recycled.
+        health_check (bool): Whether to ping connections on checkout.
+    """
+
+    def __init__(
+        self,
+        driver: AsyncDriver,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        max_idle_time: float = 300.0,
+        health_check: bool = True,
+    ):
+        super().__init__(min_size, max_size, timeout, max_idle_time, health_check)
+        self.driver = driver
+        self._cond = asyncio.Condition()
+
+    async def warm_up(self):
+        """
+        Open connections until the pool holds ``min_size`` of them.
+        """
+        while True:
+            async with self._cond:
+                if not self._reserve_warm_up():
+                    return
+            try:
+                conn = await self._open()
+            except Exception:
+                async with self._cond:
+                    self._size -= 1
+                raise
+            async with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    async def acquire(self) -> Any:
+        """
+        Check a connection out of the pool, waiting up to ``timeout`` seconds.
+
+        Returns:
+            Any: A live async database connection.
+
+        Raises:
+            PoolTimeoutError: If no connection became available in time.
+            PoolClosedError: If the pool has been closed.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        async with self._cond:
+            while True:
+                ready, conn, last_used = self._try_checkout()
+                if ready:
+                    break
+                remaining = self._remaining(deadline)
+                waited = True
+                try:
+                    await asyncio.wait_for(self._cond.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            self._checked_out(start, waited)
+
+        try:
+            if conn is None:
+                conn = await self._open()
+            else:
+                conn = await self._validate(conn, last_used)
+        except BaseException:
+            async with self._cond:
+                self._checkout_failed()
+                self._cond.notify()
+            raise
+        return conn
+
+    async def release(self, conn: Any, discard: bool = False):
+        """
+        Return a connection to the pool.
+
+        Args:
+            conn (Any): The connection obtained from ``acquire``.
+            discard (bool, optional): Close the connection instead of reusing it.
+        """
+        async with self._cond:
+            to_close = self._checkin(conn, discard)
+            self._cond.notify()
+        for expired in to_close:
+            await self._close(expired)
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Borrow a connection for the duration of an ``async with`` block.
+
+        If the block raises, the open transaction is rolled back and the
+        connection is dropped from the pool when it is no longer alive.
+
+        Yields:
+            Any: A live async database connection.
+        """
+        conn = await self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            try:
+                await conn.rollback()
+            except Exception:
+                pass
+            await self.release(conn, discard=not await self._is_alive(conn))
+            raise
+        else:
+            await self.release(conn)
+
+    async def close(self):
+        """
+        Close all idle connections; connections in use are closed on release.
+        """
+        async with self._cond:
+            idle = self._close_idle()
+            self._cond.notify_all()
+        for conn in idle:
+            await self._close(conn)
+
+    async def _open(self) -> Any:
+        conn = await self.driver.connect()
+        self._created += 1
+        return conn
+
+    async def _validate(self, conn: Any, last_used: float) -> Any:
+        if self._stale(last_used):
+            await self._close(conn)
+            self._recycled += 1
+            return await self._open()
+        if self.health_check and not await self._is_alive(conn):
+            await self._close(conn)
+            self._reconnects += 1
+            return await self._open()
+        return conn
+
+    @staticmethod
+    async def _is_alive(conn: Any) -> bool:
+        try:
+            return bool(await conn.is_connected())
+        except Exception:
+            return False
+
+    @staticmethod
+    async def _close(conn: Any):
+        try:
+            await conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,167 @@
+import sqlite3
+import uuid
+from datetime import date
+from typing import Any, Dict, Optional, Tuple, Type
+
+import mysql.connector
+
+from utils.async_pool import AsyncDriver, MySQLAsyncDriver, ThreadedAsyncDriver
+
+# parameter marker of the driver of every SQL dialect
+PLACEHOLDERS = {"mysql": "%s", "sqlite": "?"}
+
+# store dates as ISO text, explicitly rather than through the default adapter
+# deprecated in Python 3.12
+sqlite3.register_adapter(date, date.isoformat)
+
+
+def dialect_of(placeholder: str) -> str:
+    """
+    The SQL dialect of a driver, from its parameter marker.
+
+    Args:
+        placeholder (str): The parameter marker, e.g. ``?``.
+
+    Returns:
+        str: ``sqlite`` for ``?``, ``mysql`` otherwise.
+    """
+    return "sqlite" if placeholder == PLACEHOLDERS["sqlite"] else "mysql"
+
+
+class Backend:
+    """
+    A storage engine the data utilities can run on.
+
+    A backend opens DB-API connections for ``DataUtils`` and ``ConnectionPool``
+    and an ``AsyncDriver`` for ``AsyncConnectionPool``, and names the SQL
+    dialect and parameter marker its queries are built with.
+
+    Attributes:
+        dialect (str): SQL dialect, ``mysql`` or ``sqlite``.
+        errors (Tuple[Type[Exception], ...]): Exceptions raised by the driver when
+            the database cannot be reached.
+        max_connections (Optional[int]): Upper bound of simultaneously open
+            connections the engine supports, None for no limit.
+    """
+
+    dialect: str = "mysql"
+    errors: Tuple[Type[Exception], ...] = ()
+    max_connections: Optional[int] = None
+
+    @property
+    def placeholder(self) -> str:
+        return PLACEHOLDERS[self.dialect]
+
+    def connect(self) -> Any:
+        """
+        Open a new connection.
+
+        Returns:
+            Any: A DB-API connection.
+        """
+        raise NotImplementedError
+
+    def async_driver(self) -> AsyncDriver:
+        """
+        The driver opening connections of the asyncio pool.
+
+        Returns:
+            AsyncDriver: The driver, by default running ``connect`` in worker threads.
+        """
+        return ThreadedAsyncDriver(self.connect)
+
+
+class MySQLBackend(Backend):
+    """
+    A MySQL server, reached through ``mysql.connector``.
+
+    Attributes:
+        connect_kwargs (dict): Keyword arguments of ``mysql.connector.connect``.
+    """
+
+    dialect = "mysql"
+    errors = (mysql.connector.Error,)
+
+    def __init__(self, **connect_kwargs):
+        self.connect_kwargs = connect_kwargs
+
+    def connect(self) -> Any:
+        return mysql.connector.connect(**self.connect_kwargs)
+
+    def async_driver(self) -> AsyncDriver:
+        return MySQLAsyncDriver(**self.connect_kwargs)
+
+
+class SQLiteBackend(Backend):
+    """
+    An embedded SQLite database file.
+
+    Every connection can be used from any thread and is tuned with
+    ``pragmas``: the write-ahead log lets readers run while a writer commits,
+    ``synchronous=NORMAL`` syncs at checkpoints only, and a larger page cache
+    and memory map keep hot pages out of the file system.
+    Writers are serialized by SQLite and wait up to ``busy_timeout`` ms for the
+    write lock.
+
+    Attributes:
+        path (str): Path of the database file.
+        pragmas (Dict[str, Any]): PRAGMA statements run on every new connection.
+    """
+
+    dialect = "sqlite"
+    errors = (sqlite3.Error,)
+
+    PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "foreign_keys": "ON",
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+        # negative: in KiB, i.e. a 64 MiB page cache
+        "cache_size": -64 * 1024,
+        "mmap_size": 256 * 1024 * 1024,
+    }
+
+    def __init__(self, path: str, pragmas: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.pragmas = {**self.PRAGMAS, **(pragmas or {})}
+
+    def _open(self, database: str, **kwargs) -> sqlite3.Connection:
+        conn = sqlite3.connect(database, check_same_thread=False, **kwargs)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def connect(self) -> sqlite3.Connection:
+        return self._open(self.path)
+
+
+class MemoryBackend(SQLiteBackend):
+    """
+    A throwaway in-memory SQLite database, for tests, benchmarks and demos.
+
+    The database lives as long as the backend object: a first connection is
+    kept open, and all connections share its data through SQLite's shared
+    cache. A shared-cache database locks whole tables, so the pools built on
+    it hold a single connection.
+    """
+
+    max_connections = 1
+
+    PRAGMAS = {
+        **SQLiteBackend.PRAGMAS,
+        # no file to write ahead of
+        "journal_mode": "MEMORY",
+    }
+
+    def __init__(self, pragmas: Optional[Dict[str, Any]] = None):
+        super().__init__(
+            f"file:memory-{uuid.uuid4().hex}?mode=memory&cache=shared", pragmas
+        )
+        self._anchor = self.connect()
+
+    def connect(self) -> sqlite3.Connection:
+        return self._open(self.path, uri=True)
+
+
+BACKENDS = {"mysql": MySQLBackend, "sqlite": SQLiteBackend, "memory": MemoryBackend}
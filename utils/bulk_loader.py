@@ -0,0 +1,251 @@
+import logging
+import os
+import tempfile
+import time
+from datetime import date
+from typing import Any, List, Sequence
+
+from pydantic import BaseModel
+
+from utils.data_utils import DataUtils, Record, row_encoders
+from utils.schema_registry import registry
+from utils.sql_query_builder import SQLQueryBuilder, split_in_list
+from utils.table_schemas import PatientSchema, TableSchema
+
+logger = logging.getLogger(__name__)
+
+METHODS = ("values", "infile")
+
+_INFILE_ESCAPES = str.maketrans(
+    {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"}
+)
+
+
+def infile_value(value: Any) -> str:
+    """
+    Format a value as a field of a tab-separated LOAD DATA file.
+
+    Args:
+        value (Any): An encoded column value.
+
+    Returns:
+        str: The field, with NULL written as ``\\N`` and separators escaped.
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return str(int(value))
+    return str(value).translate(_INFILE_ESCAPES)
+
+
+class BulkLoadReport(BaseModel):
+    """
+    Throughput of a bulk load.
+
+    Attributes:
+        table (str): The loaded table.
+        method (str): ``values`` or ``infile``.
+        rows (int): Rows inserted.
+        rows_skipped (int): Rows skipped because their key was already stored.
+        transactions (int): Transactions committed.
+        seconds (float): Time spent inserting.
+        rows_per_second (float): Insert throughput.
+        dropped_indexes (List[str]): Secondary indexes dropped during the load.
+        index_rebuild_seconds (float): Time spent rebuilding them.
+    """
+
+    table: str
+    method: str
+    rows: int = 0
+    rows_skipped: int = 0
+    transactions: int = 0
+    seconds: float = 0.0
+    rows_per_second: float = 0.0
+    dropped_indexes: List[str] = []
+    index_rebuild_seconds: float = 0.0
+
+
+class BulkLoader:
+    """
+    High-throughput insert path for initial and nightly loads.
+
+    Every call to ``insert`` writes its records in a single transaction, so the
+    transaction size is the number of records per call (the chunk size of the
+    ingest pipeline). Within a transaction the rows are sent either as multi-row
+    ``INSERT ... VALUES`` statements of ``rows_per_statement`` rows (``values``),
+    or written to a temporary tab-separated file and sent with
+    ``LOAD DATA LOCAL INFILE`` (``infile``), which needs ``allow_local_infile``
+    on the connection and ``local_infile`` enabled on the server.
+
+    Used as a context manager, the loader can drop the secondary indexes of the
+    table on enter and rebuild them on exit, which is faster than maintaining
+    them row by row. Indexes the database refuses to drop, e.g. because a
+    foreign key needs them, are kept.
+
+    The labels of interactions and their summary counts are written in the same
+    transaction (see ``DataUtils._derived_statements``).
+
+    With ``skip_existing``, records whose primary key is already stored are
+    dropped inside the insert transaction, before their rows and derived rows
+    are written. A chunk committed by a load that was interrupted before its
+    checkpoint was recorded is then loaded again without duplicate key errors
+    or double counted summaries, at the cost of one key lookup per call.
+
+    Attributes:
+        data_utils (DataUtils): Data utilities bound to the database.
+        schema (TableSchema): Schema of the loaded table.
+        method (str): ``values`` or ``infile``.
+        rows_per_statement (int): Rows per multi-row INSERT.
+        rebuild_indexes (bool): Drop and rebuild the secondary indexes.
+        skip_existing (bool): Skip the records whose primary key is stored.
+    """
+
+    def __init__(
+        self,
+        data_utils: DataUtils,
+        schema: TableSchema,
+        method: str = "values",
+        rows_per_statement: int = 500,
+        rebuild_indexes: bool = False,
+        skip_existing: bool = False,
+    ):
+        if method not in METHODS:
+            raise ValueError(f"Unknown bulk load method: {method}")
+        if method == "infile" and data_utils.dialect != "mysql":
+            raise ValueError("LOAD DATA INFILE is only available on MySQL")
+        self.data_utils = data_utils
+        self.schema = schema
+        self.method = method
+        self.rows_per_statement = rows_per_statement
+        self.rebuild_indexes = rebuild_indexes
+        self.skip_existing = skip_existing
+        self._encoder = row_encoders[schema.name]
+        self._report = BulkLoadReport(table=schema.name, method=method)
+
+    def __enter__(self) -> "BulkLoader":
+        if self.rebuild_indexes:
+            self._drop_indexes()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._report.dropped_indexes:
+            started = time.perf_counter()
+            self.data_utils.create_missing_indexes(schema=self.schema)
+            self._report.index_rebuild_seconds = time.perf_counter() - started
+
+    def _execute(self, query: str, params: Sequence = ()):
+        with self.data_utils._borrow() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params)
+                conn.commit()
+            finally:
+                cursor.close()
+
+    def _drop_indexes(self):
+        for index in self.schema.indexes or []:
+            query = (
+                SQLQueryBuilder(self.data_utils.placeholder)
+                .drop_index(self.schema.name, index.name, self.data_utils.dialect)
+                .construct_query()
+            )
+            try:
+                self._execute(query)
+            except Exception as e:
+                logger.warning("Keeping index %s: %s", index.name, e)
+                continue
+            self._report.dropped_indexes.append(index.name)
+
+    def _insert_values(
+        self, cursor: Any, table: str, columns: List[str], rows: List[Sequence]
+    ):
+        size = self.rows_per_statement
+        for i in range(0, len(rows), size):
+            batch = rows[i : i + size]
+            query = (
+                SQLQueryBuilder(self.data_utils.placeholder)
+                .insert_batch(table, columns, rows=len(batch))
+                .construct_query()
+            )
+            cursor.execute(query, [value for row in batch for value in row])
+
+    def _insert_infile(self, cursor: Any, rows: List[Sequence]):
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".tsv", encoding="utf-8", newline="\n", delete=False
+        ) as f:
+            for row in rows:
+                f.write("\t".join(infile_value(value) for value in row))
+                f.write("\n")
+        try:
+            cursor.execute(
+                *SQLQueryBuilder(self.data_utils.placeholder)
+                .load_data(self.schema.name, self._encoder.columns, f.name)
+                .construct()
+            )
+        finally:
+            os.remove(f.name)
+
+    def _unstored(self, cursor: Any, records: List[Record]) -> List[Record]:
+        # called in the insert transaction, so the keys cannot change meanwhile
+        (key,) = registry[self.schema.name].primary_key
+        keys = [self._encoder.value_of(record, key) for record in records]
+        stored = set()
+        for chunk in split_in_list(list(dict.fromkeys(keys))):
+            cursor.execute(*self.data_utils._stored_keys_query(self.schema.name, chunk))
+            stored.update(row[0] for row in cursor.fetchall())
+        return [record for record, k in zip(records, keys) if k not in stored]
+
+    def insert(self, records: List[Record]):
+        """
+        Insert records in a single transaction.
+
+        Args:
+            records (List[Record]): Models, dicts or tuples in column order.
+        """
+        if not records:
+            return
+        started = time.perf_counter()
+        with self.data_utils._borrow() as conn:
+            cursor = conn.cursor()
+            try:
+                received = len(records)
+                if self.skip_existing:
+                    records = self._unstored(cursor, records)
+                rows = self._encoder.encode(records)
+                if self.method == "infile" and rows:
+                    self._insert_infile(cursor, rows)
+                elif rows:
+                    self._insert_values(
+                        cursor, self.schema.name, self._encoder.columns, rows
+                    )
+                for query, derived_rows in self.data_utils._derived_statements(
+                    self.schema.name, records
+                ):
+                    if derived_rows:
+                        cursor.executemany(query, derived_rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        if self.schema.name == PatientSchema.name:
+            self.data_utils._invalidate_patients(records)
+        self._report.seconds += time.perf_counter() - started
+        self._report.rows += len(rows)
+        self._report.rows_skipped += received - len(rows)
+        self._report.transactions += 1
+
+    def report(self) -> BulkLoadReport:
+        """
+        Throughput of the records inserted so far.
+
+        Returns:
+            BulkLoadReport: Rows, time and rows/sec of the load.
+        """
+        report = self._report.model_copy(deep=True)
+        if report.seconds:
+            report.rows_per_second = report.rows / report.seconds
+        return report
@@ -0,0 +1,377 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+class PoolTimeoutError(Exception):
+    """
+    Raised when no connection becomes available within the pool timeout.
+    """
+
+
+class PoolClosedError(Exception):
+    """
+    Raised when a connection is requested from a pool that has been closed.
+    """
+
+
+class BasePool:
+    """
+    Bookkeeping shared by ``ConnectionPool`` and ``AsyncConnectionPool``.
+
+    It holds the sizes, the idle connections and the usage counters, and
+    decides the checkout, pruning and recycling policy. The subclasses own the
+    lock (a ``threading`` or ``asyncio`` condition) and open, ping and close
+    connections; the methods below are called with the lock held.
+
+    Attributes:
+        min_size (int): Number of connections kept open while idle.
+        max_size (int): Maximum number of simultaneously open connections.
+        timeout (float): Seconds to wait for a free connection before failing.
+        max_idle_time (float): Seconds after which an idle connection is recycled.
+        health_check (bool): Whether to ping connections on checkout.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        max_idle_time: float = 300.0,
+        health_check: bool = True,
+    ):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(
+                f"Invalid pool size: min_size={min_size}, max_size={max_size}"
+            )
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle_time = max_idle_time
+        self.health_check = health_check
+
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+
+        self._acquired = 0
+        self._waited = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._reconnects = 0
+
+    def _reserve_warm_up(self) -> bool:
+        # claims a slot for a warm-up connection while below min_size
+        if self._closed or self._size >= self.min_size:
+            return False
+        self._size += 1
+        return True
+
+    def _try_checkout(self) -> Tuple[bool, Any, Optional[float]]:
+        """
+        Take an idle connection or a slot for a new one, without waiting.
+
+        Returns:
+            Tuple[bool, Any, Optional[float]]: Whether the checkout succeeded,
+            and the idle connection with its last use (None for a new slot).
+
+        Raises:
+            PoolClosedError: If the pool has been closed.
+        """
+        if self._closed:
+            raise PoolClosedError("Connection pool is closed")
+        if self._idle:
+            # LIFO keeps the hot connections busy and lets the rest age out
+            conn, last_used = self._idle.pop()
+            return True, conn, last_used
+        if self._size < self.max_size:
+            self._size += 1
+            return True, None, None
+        return False, None, None
+
+    def _remaining(self, deadline: float) -> float:
+        """
+        Time left to wait for a connection.
+
+        Args:
+            deadline (float): ``time.monotonic()`` value at which to give up.
+
+        Returns:
+            float: Seconds left, positive.
+
+        Raises:
+            PoolTimeoutError: If the deadline has passed.
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._timeouts += 1
+            raise PoolTimeoutError(
+                f"No connection available after {self.timeout}s "
+                f"({self._in_use}/{self.max_size} in use)"
+            )
+        return remaining
+
+    def _checked_out(self, start: float, waited: bool):
+        self._in_use += 1
+        wait_time = time.monotonic() - start
+        self._acquired += 1
+        self._wait_time_total += wait_time
+        self._wait_time_max = max(self._wait_time_max, wait_time)
+        if waited:
+            self._waited += 1
+
+    def _checkout_failed(self):
+        # the connection could not be opened or replaced: give its slot back
+        self._size -= 1
+        self._in_use -= 1
+
+    def _checkin(self, conn: Any, discard: bool) -> List[Any]:
+        """
+        Take a connection back and prune the idle ones.
+
+        Args:
+            conn (Any): The returned connection.
+            discard (bool): Drop the connection instead of reusing it.
+
+        Returns:
+            List[Any]: The connections to close.
+        """
+        to_close = []
+        self._in_use -= 1
+        if discard or self._closed:
+            self._size -= 1
+            to_close.append(conn)
+        else:
+            self._idle.append((conn, time.monotonic()))
+        return to_close + self._prune_idle()
+
+    def _close_idle(self) -> List[Any]:
+        # marks the pool closed and hands over the idle connections to close
+        self._closed = True
+        idle = [conn for conn, _ in self._idle]
+        self._size -= len(idle)
+        self._idle.clear()
+        return idle
+
+    def _stale(self, last_used: float) -> bool:
+        # whether an idle connection has outlived max_idle_time
+        return time.monotonic() - last_used > self.max_idle_time
+
+    def _prune_idle(self) -> List[Any]:
+        # The oldest idle connections sit on the left.
+        expired = []
+        while (
+            self._idle and self._size > self.min_size and self._stale(self._idle[0][1])
+        ):
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._recycled += 1
+            expired.append(conn)
+        return expired
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the pool usage, useful to size the pool.
+
+        Returns:
+            Dict[str, Any]: Counters and gauges describing the pool.
+        """
+        return {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": self._size,
+            "in_use": self._in_use,
+            "idle": len(self._idle),
+            "acquired": self._acquired,
+            "waited": self._waited,
+            "wait_time_total": self._wait_time_total,
+            "wait_time_max": self._wait_time_max,
+            "wait_time_avg": self._wait_time_total / self._acquired
+            if self._acquired
+            else 0.0,
+            "timeouts": self._timeouts,
+            "created": self._created,
+            "recycled": self._recycled,
+            "reconnects": self._reconnects,
+        }
+
+
+class ConnectionPool(BasePool):
+    """
+    A thread-safe pool of database connections.
+
+    Connections are opened lazily up to ``max_size`` and handed out one per
+    caller. On checkout, connections that have been idle for longer than
+    ``max_idle_time`` are recycled and, if ``health_check`` is enabled, dead
+    connections are transparently replaced by fresh ones.
+
+    Attributes:
+        min_size (int): Number of connections kept open while idle.
+        max_size (int): Maximum number of simultaneously open connections.
+        timeout (float): Seconds to wait for a free connection before failing.
+        max_idle_time (float): Seconds after which an idle connection is recycled.
+        health_check (bool): Whether to ping connections on checkout.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        max_idle_time: float = 300.0,
+        health_check: bool = True,
+    ):
+        super().__init__(min_size, max_size, timeout, max_idle_time, health_check)
+        self._connect = connect
+        self._cond = threading.Condition()
+
+    def warm_up(self):
+        """
+        Open connections until the pool holds ``min_size`` of them.
+        """
+        while True:
+            with self._cond:
+                if not self._reserve_warm_up():
+                    return
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def acquire(self) -> Any:
+        """
+        Check a connection out of the pool, waiting up to ``timeout`` seconds.
+
+        Returns:
+            Any: A live database connection.
+
+        Raises:
+            PoolTimeoutError: If no connection became available in time.
+            PoolClosedError: If the pool has been closed.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                ready, conn, last_used = self._try_checkout()
+                if ready:
+                    break
+                remaining = self._remaining(deadline)
+                waited = True
+                self._cond.wait(remaining)
+            self._checked_out(start, waited)
+
+        try:
+            if conn is None:
+                conn = self._open()
+            else:
+                conn = self._validate(conn, last_used)
+        except Exception:
+            with self._cond:
+                self._checkout_failed()
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn: Any, discard: bool = False):
+        """
+        Return a connection to the pool.
+
+        Args:
+            conn (Any): The connection obtained from ``acquire``.
+            discard (bool, optional): Close the connection instead of reusing it.
+        """
+        with self._cond:
+            to_close = self._checkin(conn, discard)
+            self._cond.notify()
+        for expired in to_close:
+            self._close(expired)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a ``with`` block.
+
+        If the block raises, the open transaction is rolled back and the
+        connection is dropped from the pool when it is no longer alive.
+
+        Yields:
+            Any: A live database connection.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            self.release(conn, discard=not self._is_alive(conn))
+            raise
+        else:
+            self.release(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return super().stats()
+
+    def close(self):
+        """
+        Close all idle connections; connections in use are closed on release.
+        """
+        with self._cond:
+            idle = self._close_idle()
+            self._cond.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+    def _open(self) -> Any:
+        conn = self._connect()
+        if conn is None:
+            raise ConnectionError("Could not open a database connection")
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _validate(self, conn: Any, last_used: float) -> Any:
+        if self._stale(last_used):
+            self._close(conn)
+            with self._cond:
+                self._recycled += 1
+            return self._open()
+        if self.health_check and not self._is_alive(conn):
+            self._close(conn)
+            with self._cond:
+                self._reconnects += 1
+            return self._open()
+        return conn
+
+    @staticmethod
+    def _is_alive(conn: Any) -> bool:
+        is_connected = getattr(conn, "is_connected", None)
+        if not callable(is_connected):
+            return True
+        try:
+            return bool(is_connected())
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn: Any):
+        try:
+            conn.close()
+        except Exception:
+            pass
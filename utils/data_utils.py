@@ -1,72 +1,1379 @@
-from typing import List, Union, Any, Tuple
+from typing import (
+    List,
+    Optional,
+    Union,
+    Any,
+    Tuple,
+    Dict,
+    Generator,
+    NamedTuple,
+    Sequence,
+    Set,
+)
+from contextlib import contextmanager
+from datetime import date
+import logging
+import time
 
 from pydantic import BaseModel
 
 import json
 
-from utils.sql_query_builder import SQLQueryBuilder, SQLOperators
-from datamodel.models import Interaction, Patient
-from utils.table_schemas import TableSchema, InteractionSchema, PatientSchema
+from utils.connection_pool import ConnectionPool
+from utils.pagination import encode_interaction_cursor, decode_interaction_cursor
+from utils.backends import dialect_of
+from utils.instrumentation import Instrumentation, instrumentation
+from utils.patient_cache import PatientCache
+from utils.replica_router import REPLICA_LAG_QUERIES, ReplicaRouter, replica_lag
+from utils.response_cache import ResponseCache
+from utils.row_codec import RowDecoder, RowEncoder
+from utils.schema_registry import (
+    INTERACTION,
+    INTERACTION_COUNT,
+    INTERACTION_LABEL,
+    PATIENT,
+    PATIENT_HEALTH,
+    registry,
+)
+from utils.search_index import SEARCH_COLUMNS, SearchIndex
+from utils.statement_cache import StatementCache, statement_cache
+from utils.sql_query_builder import (
+    SQLOperators,
+    SQLQueryBuilder,
+    SQLTypes,
+    split_in_list,
+)
+from datamodel.models import (
+    GroupCount,
+    Interaction,
+    LabelCount,
+    Patient,
+    PatientHealth,
+)
+from utils.table_schemas import (
+    TableSchema,
+    InteractionCountSchema,
+    InteractionLabelSchema,
+    InteractionSchema,
+    PatientHealthSchema,
+    PatientSchema,
+)
 
 
 def convert_obj_to_lists(objs: List[BaseModel]) -> Union[List, List[List]]:
-    cols = list(objs[0].model_dump().keys())
+    """
+    Convert models of a table without a ``RowEncoder`` into rows, dumping each
+    model once.
+
+    Args:
+        objs (List[BaseModel]): The models to convert.
+
+    Returns:
+        Union[List, List[List]]: The column names and one row per model.
+    """
+    cols = list(type(objs[0]).model_fields)
     rows = []
-    # @TODO make it more clean and readable
     for obj in objs:
-        row = []
-        for col in cols:
-            value = obj.model_dump()[col]
-            if isinstance(value, (dict, BaseModel)):
-                value = json.dumps(value)
-            row.append(value)
+        dumped = obj.model_dump()
+        row = [dumped[col] for col in cols]
+        for i, value in enumerate(row):
+            if isinstance(value, dict):
+                row[i] = json.dumps(value)
         rows.append(row)
     return cols, rows
 
 
-class DataUtils:
+def split_labels(label: Optional[str]) -> List[str]:
     """
-    A utility class for database operations related to patients and interactions.
+    Split the label of an interaction into normalized labels.
+
+    A label may hold several comma-separated labels. They are stripped and
+    lower-cased, and duplicates are dropped.
+
+    Args:
+        label (Optional[str]): The label, e.g. ``"Cough, fever"``.
+
+    Returns:
+        List[str]: The normalized labels, e.g. ``["cough", "fever"]``.
     """
+    if not label:
+        return []
+    parts = (part.strip().lower() for part in label.split(","))
+    return list(dict.fromkeys(part for part in parts if part))
 
-    def __init__(self, connection_obj: Any):
-        self.sql_builder = SQLQueryBuilder()
-        self.conn = connection_obj
 
-    def get_patient_by_insurance_no(self, insurance_no: str) -> List[Patient]:
+# dimensions of the interaction counts kept in INTERACTION_COUNT
+SUMMARY_DIMENSIONS = ("label", "ailment", "month")
+
+
+def interaction_month(interaction_date: Any) -> Optional[str]:
+    """
+    The month of an interaction date.
+
+    Args:
+        interaction_date (Any): A date, an ISO date string or None.
+
+    Returns:
+        Optional[str]: The month as ``YYYY-MM``, or None without a date.
+    """
+    if not interaction_date:
+        return None
+    return str(interaction_date)[:7]
+
+
+# codecs of the tables read into models, built once by the schema registry
+patient_decoder = PATIENT.decoder
+interaction_decoder = INTERACTION.decoder
+patient_encoder = PATIENT.encoder
+interaction_encoder = INTERACTION.encoder
+row_encoders = {
+    PatientSchema.name: patient_encoder,
+    InteractionSchema.name: interaction_encoder,
+}
+
+logger = logging.getLogger(__name__)
+
+# an item to insert: a model, a dict keyed by column name or a tuple in column order
+Record = Union[BaseModel, Dict[str, Any], Sequence]
+
+
+class Read(NamedTuple):
+    """
+    A read query of an operation; the result sent back is ``(rows, columns)``.
+
+    Attributes:
+        query (str): The SQL query template.
+        params (Tuple): The values bound to the placeholders.
+        route (Optional[Sequence[str]]): The insurance numbers the read is about,
+            to choose a replica (empty for reads across patients); None reads
+            from the primary.
+        source (Any): The connection or pool to read from, overrides ``route``.
+        prepared (bool): Run it as a reusable prepared statement.
+    """
+
+    query: str
+    params: Tuple = ()
+    route: Optional[Sequence[str]] = None
+    source: Any = None
+    prepared: bool = True
+
+
+class Write(NamedTuple):
+    """
+    A statement of a transactional operation.
+
+    Attributes:
+        query (str): The SQL statement template.
+        params (Sequence): The rows bound one after the other, or the values
+            bound once when ``many`` is False.
+        many (bool): Run the statement with ``executemany``.
+    """
+
+    query: str
+    params: Sequence = ()
+    many: bool = True
+
+
+class Commit(NamedTuple):
+    """
+    Commit the transaction of an operation.
+    """
+
+
+COMMIT = Commit()
+
+# An operation of ``BaseDataUtils``: a generator yielding the queries to run and
+# receiving the rows of every ``Read``. ``DataUtils`` and ``AsyncDataUtils`` run
+# operations (``_run`` and ``_transact``) and differ only in how they do it.
+Operation = Generator[Union[Read, Write, Commit], Any, Any]
+
+
+class BaseDataUtils:
+    """
+    Query construction and row decoding shared by the sync and async data utilities.
+
+    Every operation is written once here, as a generator of ``Read`` and
+    ``Write`` steps (see ``Operation``); ``DataUtils`` runs the steps blocking
+    and ``AsyncDataUtils`` awaits them.
+
+    A new ``SQLQueryBuilder`` is used for every query since the builder is stateful.
+    Queries are built as templates plus bound parameters; reads run as prepared
+    statements reused per connection through ``statement_cache``. Columns and
+    fixed templates are looked up in the schema ``registry`` instead of rebuilt.
+    Every query and the decoding of its rows are timed by ``instrumentation``.
+
+    With ``replicas``, reads are routed to read replicas while writes, and the
+    reads of recently written patients, go to the primary.
+    """
+
+    placeholder: str = "%s"
+    patient_cache: Optional[PatientCache] = None
+    search_index: Optional[SearchIndex] = None
+    response_cache: Optional[ResponseCache] = None
+    replicas: Optional[ReplicaRouter] = None
+    statement_cache: StatementCache = statement_cache
+    instrumentation: Instrumentation = instrumentation
+
+    def _patient_query(
+        self, insurance_no: str, columns: Optional[List[str]] = None
+    ) -> Tuple[str, Tuple]:
         """
-        Retrieve patient details by insurance number.
+        Build the query fetching a patient by insurance number.
 
         Args:
             insurance_no (str): The insurance number of the patient.
+            columns (Optional[List[str]]): The columns to fetch, None for all.
 
         Returns:
-            List[Patient]: A list of Patient objects.
+            Tuple[str, Tuple]: The SQL query template and its parameters.
         """
-        colnames_vs_objs = {col.name: col for col in PatientSchema.columns}
-        self.cursor = self.conn.cursor()
-        query = (
-            self.sql_builder.select(columns=["*"], table=PatientSchema.name)
+        query = PATIENT.select_query(
+            self.placeholder, "insurance_no", tuple(columns) if columns else None
+        )
+        return query, (insurance_no,)
+
+    def _patients_in_query(
+        self, insurance_nos: List[str], columns: Optional[List[str]] = None
+    ) -> Tuple[str, Tuple]:
+        """
+        Build the set-based query fetching the patients of several insurance numbers.
+
+        Args:
+            insurance_nos (List[str]): The insurance numbers, not empty and at most
+                ``IN_LIST_MAX_SIZE`` long.
+            columns (Optional[List[str]]): The columns to fetch, None for all.
+
+        Returns:
+            Tuple[str, Tuple]: The SQL query template and its parameters.
+        """
+        return (
+            SQLQueryBuilder(self.placeholder)
+            .select(columns=columns or ["*"], table=PatientSchema.name)
+            .conditions(
+                intersections=[
+                    (
+                        PATIENT.column("insurance_no"),
+                        SQLOperators.IN,
+                        list(insurance_nos),
+                    )
+                ]
+            )
+            .construct()
+        )
+
+    def _cached_patients(
+        self, insurance_nos: List[str]
+    ) -> Tuple[Dict[str, List[Patient]], List[str]]:
+        """
+        Split insurance numbers into those the patient cache can answer and those
+        that must be looked up.
+
+        Args:
+            insurance_nos (List[str]): The insurance numbers.
+
+        Returns:
+            Tuple[Dict[str, List[Patient]], List[str]]: The cached patients by
+            insurance number (empty for a cached miss) and the distinct insurance
+            numbers left to query.
+        """
+        found, unknown = {}, []
+        for insurance_no in dict.fromkeys(insurance_nos):
+            cached = (
+                self.patient_cache.get(insurance_no)
+                if self.patient_cache is not None
+                else None
+            )
+            if cached is None:
+                unknown.append(insurance_no)
+            else:
+                found[insurance_no] = cached
+        return found, unknown
+
+    def _store_patients(
+        self,
+        found: Dict[str, List[Patient]],
+        insurance_nos: List[str],
+        patients: List[Patient],
+        generation: Optional[int],
+        cache: bool = True,
+    ):
+        """
+        Group the patients fetched for some insurance numbers and cache them,
+        including the numbers that have no patient.
+
+        Args:
+            found (Dict[str, List[Patient]]): Patients by insurance number, updated.
+            insurance_nos (List[str]): The queried insurance numbers.
+            patients (List[Patient]): The fetched patients.
+            generation (Optional[int]): Cache generation read before the query.
+            cache (bool, optional): Cache the patients, False for partial ones.
+        """
+        for insurance_no in insurance_nos:
+            found[insurance_no] = []
+        for patient in patients:
+            found.setdefault(patient.insurance_no, []).append(patient)
+        if self.patient_cache is not None and cache:
+            for insurance_no in insurance_nos:
+                self.patient_cache.put(insurance_no, found[insurance_no], generation)
+
+    def _interactions_in_query(self, interaction_ids: List[int]) -> Tuple[str, Tuple]:
+        """
+        Build the set-based query fetching interactions by id.
+
+        Args:
+            interaction_ids (List[int]): The ids, not empty and at most
+                ``IN_LIST_MAX_SIZE`` long.
+
+        Returns:
+            Tuple[str, Tuple]: The SQL query template and its parameters.
+        """
+        return (
+            SQLQueryBuilder(self.placeholder)
+            .select(columns=["*"], table=InteractionSchema.name)
             .conditions(
                 intersections=[
-                    (colnames_vs_objs["insurance_no"], SQLOperators.EQ, insurance_no)
+                    (INTERACTION.column("id"), SQLOperators.IN, list(interaction_ids))
                 ]
             )
+            .construct()
+        )
+
+    def _interaction_scan_query(
+        self, columns: List[str], after_id: Optional[int], limit: int
+    ) -> Tuple[str, Tuple]:
+        """
+        Build the query reading all interactions in id order, one batch at a time.
+
+        Args:
+            columns (List[str]): The columns to fetch, starting with ``id``.
+            after_id (Optional[int]): The last id of the previous batch.
+            limit (int): Interactions per batch.
+
+        Returns:
+            Tuple[str, Tuple]: The SQL query template and its parameters.
+        """
+        sql_builder = SQLQueryBuilder(self.placeholder).select(
+            columns=columns, table=InteractionSchema.name
+        )
+        if after_id is not None:
+            sql_builder.seek(columns=[INTERACTION.column("id")], values=[after_id])
+        return (
+            sql_builder.order_by(col="id", type=SQLOperators.ASC)
+            .limit(limit)
+            .construct()
+        )
+
+    @staticmethod
+    def _order_by_ids(
+        interactions: List[Interaction], interaction_ids: List[int]
+    ) -> List[Interaction]:
+        by_id = {interaction.id: interaction for interaction in interactions}
+        return [by_id[i] for i in interaction_ids if i in by_id]
+
+    def _interaction_query(
+        self,
+        insurance_no: int = None,
+        labels: str = None,
+        offset: int = 0,
+        limit: int = 10,
+        after: Optional[Tuple[Optional[date], int]] = None,
+        columns: Optional[List[str]] = None,
+    ) -> Tuple[str, Tuple]:
+        """
+        Build the query fetching a page of interactions of a patient.
+
+        Interactions are ordered by ``(interaction_date, id)``. When ``after`` is
+        given the page starts right after that sort key (keyset pagination) and
+        ``offset`` is ignored. One row more than ``limit`` is fetched to tell
+        whether a next page exists.
+
+        Args:
+            insurance_no (int, optional): Insurance number of the patient.
+            labels (str, optional): Comma-separated string of labels to filter
+                interactions; matched case-insensitively against ``INTERACTION_LABEL``.
+            offset (int, optional): Offset for pagination.
+            limit (int, optional): Limit for pagination.
+            after (Tuple[Optional[date], int], optional): Sort key of the last row seen.
+            columns (Optional[List[str]]): The columns to fetch, None for all.
+
+        Returns:
+            Tuple[str, Tuple]: The SQL query template and its parameters.
+        """
+        intersections = [
+            (INTERACTION.column("insurance_no"), SQLOperators.EQ, insurance_no)
+        ]
+        sort_key = [INTERACTION.column("interaction_date"), INTERACTION.column("id")]
+        sql_builder = (
+            SQLQueryBuilder(self.placeholder)
+            .select(columns=columns or ["*"], table=InteractionSchema.name)
+            .conditions(intersections=intersections)
+        )
+        label_filter = split_labels(labels)
+        if label_filter:
+            # answered from the INTERACTION_LABEL primary key
+            sql_builder.in_select(
+                "id",
+                InteractionLabelSchema.name,
+                "interaction_id",
+                "label",
+                label_filter,
+            )
+        if after is not None:
+            sql_builder.seek(columns=sort_key, values=list(after))
+        sql_builder.order_by(
+            col=[col.name for col in sort_key], type=SQLOperators.ASC
+        ).limit(limit + 1)
+        if after is None:
+            sql_builder.offset(offset)
+        return sql_builder.construct()
+
+    def _insert_statement(
+        self, data_objs: List[Record], table_name: str
+    ) -> Tuple[str, List[Sequence]]:
+        """
+        Build the INSERT template and the rows to bind to it.
+
+        Args:
+            data_objs (List[Record]): Models, dicts or tuples to insert; tables
+                without a ``RowEncoder`` only take models.
+            table_name (str): The name of the table to insert into.
+
+        Returns:
+            Tuple[str, List[Sequence]]: The INSERT template and the rows.
+        """
+        encoder = row_encoders.get(table_name)
+        if encoder is not None:
+            insert_query = registry[table_name].insert_query(self.placeholder)
+            return insert_query, encoder.encode(data_objs)
+        columns, rows = convert_obj_to_lists(objs=data_objs)
+        insert_query = (
+            SQLQueryBuilder(self.placeholder)
+            .insert_batch(table=table_name, columns=columns)
             .construct_query()
         )
-        print(query)
-        self.cursor.execute(query)
-        rows = self.cursor.fetchall()
-        patients = [Patient.from_list(row) for row in rows]
-        self.cursor.close()
+        return insert_query, rows
+
+    def _stored_keys_query(self, table_name: str, keys: List[Any]) -> Tuple[str, Tuple]:
+        """
+        Build the query reading which of some primary keys a table already stores.
+
+        Args:
+            table_name (str): A table with a single-column ``primary_key``.
+            keys (List[Any]): The keys, not empty and at most ``IN_LIST_MAX_SIZE`` long.
+
+        Returns:
+            Tuple[str, Tuple]: The SQL query template and its parameters.
+        """
+        table = registry[table_name]
+        (key,) = table.primary_key
+        return (
+            SQLQueryBuilder(self.placeholder)
+            .select(columns=[key], table=table_name)
+            .conditions(intersections=[(table.column(key), SQLOperators.IN, keys)])
+            .construct()
+        )
+
+    def _label_insert_query(self) -> str:
+        """
+        Build the INSERT template of ``INTERACTION_LABEL`` rows.
+
+        Returns:
+            str: The INSERT template taking ``(interaction_id, label)``.
+        """
+        return INTERACTION_LABEL.insert_query(self.placeholder)
+
+    @staticmethod
+    def _label_rows(interactions: List[Record]) -> List[Tuple[int, str]]:
+        """
+        Split the labels of interactions into ``INTERACTION_LABEL`` rows.
+
+        Args:
+            interactions (List[Record]): Models, dicts or tuples of interactions.
+
+        Returns:
+            List[Tuple[int, str]]: One ``(interaction_id, label)`` row per label.
+        """
+        value_of = interaction_encoder.value_of
+        return [
+            (value_of(interaction, "id"), label)
+            for interaction in interactions
+            for label in split_labels(value_of(interaction, "label"))
+        ]
+
+    @property
+    def dialect(self) -> str:
+        """
+        The SQL dialect of the database, ``mysql`` or ``sqlite``.
+        """
+        return dialect_of(self.placeholder)
+
+    def _summary_statements(
+        self,
+    ) -> Tuple[str, str]:
+        """
+        Build the INSERTs adding to the interaction counts and patient health totals.
+
+        Returns:
+            Tuple[str, str]: The templates for ``INTERACTION_COUNT`` and
+            ``PATIENT_HEALTH`` rows.
+        """
+        return (
+            INTERACTION_COUNT.upsert_query(self.placeholder),
+            PATIENT_HEALTH.upsert_query(self.placeholder),
+        )
+
+    @staticmethod
+    def _summary_rows(
+        interactions: List[Record],
+    ) -> Tuple[List[Tuple[str, str, int]], List[Tuple[str, int, int, int]]]:
+        """
+        Aggregate interactions into increments of the summary tables.
+
+        Args:
+            interactions (List[Record]): Models, dicts or tuples of interactions.
+
+        Returns:
+            Tuple[List[Tuple[str, str, int]], List[Tuple[str, int, int, int]]]:
+            ``(dimension, value, interactions)`` increments of ``INTERACTION_COUNT``
+            and ``(insurance_no, interactions, health_status_total,
+            health_status_count)`` increments of ``PATIENT_HEALTH``, one per group.
+        """
+        value_of = interaction_encoder.value_of
+        counts: Dict[Tuple[str, str], int] = {}
+        health: Dict[str, List[int]] = {}
+        for interaction in interactions:
+            groups = [
+                ("label", label)
+                for label in split_labels(value_of(interaction, "label"))
+            ]
+            ailment = value_of(interaction, "ailment")
+            if ailment:
+                groups.append(("ailment", ailment))
+            month = interaction_month(value_of(interaction, "interaction_date"))
+            if month:
+                groups.append(("month", month))
+            for group in groups:
+                counts[group] = counts.get(group, 0) + 1
+            totals = health.setdefault(value_of(interaction, "insurance_no"), [0, 0, 0])
+            totals[0] += 1
+            health_status = value_of(interaction, "health_status")
+            if health_status is not None:
+                totals[1] += health_status
+                totals[2] += 1
+        return (
+            [(dimension, value, n) for (dimension, value), n in counts.items()],
+            [(insurance_no, *totals) for insurance_no, totals in health.items()],
+        )
+
+    def _derived_statements(
+        self, table_name: str, data_objs: List[Record]
+    ) -> List[Tuple[str, List[Tuple]]]:
+        """
+        Build the writes that keep the label index and the summary tables in step
+        with inserted items, to run in the same transaction.
+
+        Args:
+            table_name (str): The table the items are inserted into.
+            data_objs (List[Record]): The inserted items.
+
+        Returns:
+            List[Tuple[str, List[Tuple]]]: INSERT templates and the rows to bind,
+            empty for tables without derived data.
+        """
+        if table_name != InteractionSchema.name:
+            return []
+        counts_query, health_query = self._summary_statements()
+        count_rows, health_rows = self._summary_rows(data_objs)
+        return [
+            (self._label_insert_query(), self._label_rows(data_objs)),
+            (counts_query, count_rows),
+            (health_query, health_rows),
+        ]
+
+    def _interaction_counts_query(self, dimension: str) -> Tuple[str, Tuple]:
+        """
+        Build the query reading the interaction counts of a dimension.
+
+        Args:
+            dimension (str): One of ``SUMMARY_DIMENSIONS``.
+
+        Returns:
+            Tuple[str, Tuple]: The SQL query template and its parameters.
+        """
+        return (
+            SQLQueryBuilder(self.placeholder)
+            .select(
+                columns=["value", "interactions"], table=InteractionCountSchema.name
+            )
+            .conditions(
+                intersections=[
+                    (INTERACTION_COUNT.column("dimension"), SQLOperators.EQ, dimension)
+                ]
+            )
+            .order_by(col="value", type=SQLOperators.ASC)
+            .construct()
+        )
+
+    def _patient_health_query(
+        self, insurance_no: Optional[str], offset: int, limit: int
+    ) -> Tuple[str, Tuple]:
+        """
+        Build the query reading the health status totals of patients.
+
+        Args:
+            insurance_no (Optional[str]): A single patient, None for all.
+            offset (int): Number of patients to skip.
+            limit (int): Number of patients to read.
+
+        Returns:
+            Tuple[str, Tuple]: The SQL query template and its parameters.
+        """
+        sql_builder = SQLQueryBuilder(self.placeholder).select(
+            columns=list(PATIENT_HEALTH.column_names),
+            table=PatientHealthSchema.name,
+        )
+        if insurance_no is not None:
+            sql_builder.conditions(
+                intersections=[
+                    (
+                        PATIENT_HEALTH.column("insurance_no"),
+                        SQLOperators.EQ,
+                        insurance_no,
+                    )
+                ]
+            )
+        return (
+            sql_builder.order_by(col="insurance_no", type=SQLOperators.ASC)
+            .limit(limit)
+            .offset(offset)
+            .construct()
+        )
+
+    @staticmethod
+    def _decode_patient_health(rows: List[Tuple]) -> List[PatientHealth]:
+        return [
+            PatientHealth(
+                insurance_no=insurance_no,
+                interactions=interactions,
+                average_health_status=total / count if count else None,
+            )
+            for insurance_no, interactions, total, count in rows
+        ]
+
+    def _label_counts_query(self) -> Tuple[str, Tuple]:
+        """
+        Build the query counting the interactions of every label.
+
+        Returns:
+            Tuple[str, Tuple]: The SQL query template and its parameters.
+        """
+        return (
+            SQLQueryBuilder(self.placeholder)
+            .select(columns=["label", "COUNT(*)"], table=InteractionLabelSchema.name)
+            .group_by(["label"])
+            .order_by(col="label", type=SQLOperators.ASC)
+            .construct()
+        )
+
+    def _invalidate_patients(self, patients: List[Record]):
+        """
+        Drop written patients from the patient cache and their cached responses.
+
+        Args:
+            patients (List[Record]): The patients that were written.
+        """
+        if self.patient_cache is not None:
+            for patient in patients:
+                self.patient_cache.invalidate(
+                    patient_encoder.value_of(patient, "insurance_no")
+                )
+        self._invalidate_responses(patients, patient_encoder)
+
+    def _invalidate_responses(self, records: List[Record], encoder: RowEncoder):
+        """
+        Drop the cached responses of the patients touched by written records.
+
+        Args:
+            records (List[Record]): The patients or interactions that were written.
+            encoder (RowEncoder): Encoder of the records' table.
+        """
+        if self.response_cache is not None:
+            for insurance_no in {
+                encoder.value_of(record, "insurance_no") for record in records
+            }:
+                self.response_cache.invalidate(insurance_no)
+
+    def _stick_to_primary(self, records: List[Record], encoder: RowEncoder):
+        """
+        Read the patients touched by written records from the primary until the
+        replicas have caught up.
+
+        Args:
+            records (List[Record]): The patients or interactions that were written.
+            encoder (RowEncoder): Encoder of the records' table.
+        """
+        if self.replicas is not None:
+            self.replicas.mark_written(
+                {encoder.value_of(record, "insurance_no") for record in records}
+            )
+
+    def _decode_patients(
+        self, rows: List[Tuple], columns: Optional[Tuple[str, ...]] = None
+    ) -> List[Patient]:
+        with self.instrumentation.timer("decode"):
+            return patient_decoder.decode(rows, columns)
+
+    def _decode_interactions(
+        self, rows: List[Tuple], columns: Optional[Tuple[str, ...]] = None
+    ) -> List[Interaction]:
+        with self.instrumentation.timer("decode"):
+            return interaction_decoder.decode(rows, columns)
+
+    def _interaction_page(
+        self, rows: List[Tuple], columns: Optional[Tuple[str, ...]], limit: int
+    ) -> Tuple[List[Interaction], Optional[str]]:
+        """
+        Decode a page fetched by ``_interaction_query`` and compute the next cursor.
+
+        Args:
+            rows (List[Tuple]): Up to ``limit + 1`` fetched rows.
+            columns (Optional[Tuple[str, ...]]): Names of the fetched columns.
+            limit (int): Requested page size.
+
+        Returns:
+            Tuple[List[Interaction], Optional[str]]: The interactions of the page and
+            the cursor of the next page, or None on the last page.
+        """
+        interactions = self._decode_interactions(rows[:limit], columns)
+        next_cursor = None
+        if len(rows) > limit and interactions:
+            next_cursor = encode_interaction_cursor(interactions[-1])
+        return interactions, next_cursor
+
+    def _interaction_page_json(
+        self, rows: List[Tuple], columns: Optional[Tuple[str, ...]], limit: int
+    ) -> Tuple[bytes, Optional[str]]:
+        """
+        Serialize a page fetched by ``_interaction_query`` straight into JSON.
+
+        Rows go to bytes in one step, timed as the ``serialize`` stage.
+
+        Args:
+            rows (List[Tuple]): Up to ``limit + 1`` fetched rows.
+            columns (Optional[Tuple[str, ...]]): Names of the fetched columns.
+            limit (int): Requested page size.
+
+        Returns:
+            Tuple[bytes, Optional[str]]: The JSON array of the interactions of the
+            page and the cursor of the next page, or None on the last page.
+        """
+        page = rows[:limit]
+        next_cursor = None
+        with self.instrumentation.timer("serialize"):
+            if len(rows) > limit and page:
+                last = interaction_decoder.decode(page[-1:], columns)[0]
+                next_cursor = encode_interaction_cursor(last)
+            return interaction_decoder.decode_json(page, columns), next_cursor
+
+    def _check_replica_lag(self) -> Operation:
+        """
+        Measure the lag of every replica and report it to the router; a replica
+        that cannot be reached is reported with an unknown lag.
+        """
+        query = REPLICA_LAG_QUERIES.get(self.dialect)
+        for i, replica in enumerate(self.replicas.replicas):
+            lag = 0.0
+            if query is not None:
+                try:
+                    lag = replica_lag(
+                        *(yield Read(query, source=replica, prepared=False))
+                    )
+                except Exception as e:
+                    logger.warning("Error checking the lag of replica %d: %s", i, e)
+                    lag = None
+            self.replicas.report_lag(i, lag)
+
+    def _get_patient_by_insurance_no(
+        self, insurance_no: str, fields: Optional[List[str]]
+    ) -> Operation:
+        columns = patient_decoder.projection(fields)
+        if self.patient_cache is None:
+            return self._decode_patients(
+                *(
+                    yield Read(
+                        *self._patient_query(insurance_no, columns),
+                        route=[insurance_no],
+                    )
+                )
+            )
+        patients = self.patient_cache.get(insurance_no)
+        if patients is None:
+            generation = self.patient_cache.generation()
+            patients = self._decode_patients(
+                *(
+                    yield Read(
+                        *self._patient_query(insurance_no, columns),
+                        route=[insurance_no],
+                    )
+                )
+            )
+            if columns is None:
+                self.patient_cache.put(insurance_no, patients, generation)
         return patients
 
+    def _get_patients_by_insurance_nos(
+        self, insurance_nos: List[str], fields: Optional[List[str]]
+    ) -> Operation:
+        columns = patient_decoder.projection(fields)
+        found, unknown = self._cached_patients(insurance_nos)
+        generation = (
+            self.patient_cache.generation() if self.patient_cache is not None else None
+        )
+        for chunk in split_in_list(unknown):
+            patients = self._decode_patients(
+                *(yield Read(*self._patients_in_query(chunk, columns), route=chunk))
+            )
+            self._store_patients(
+                found, chunk, patients, generation, cache=columns is None
+            )
+        return [patient for no in dict.fromkeys(insurance_nos) for patient in found[no]]
+
+    def _existing_insurance_nos(self, insurance_nos: List[str]) -> Operation:
+        found, unknown = self._cached_patients(insurance_nos)
+        existing = {no for no, patients in found.items() if patients}
+        for chunk in split_in_list(unknown):
+            rows, _ = yield Read(*self._patients_in_query(chunk, ["insurance_no"]))
+            existing.update(row[0] for row in rows)
+        return existing
+
+    def _interaction_page_read(
+        self,
+        insurance_no: Optional[str],
+        labels: Optional[str],
+        offset: int,
+        limit: int,
+        cursor: Optional[str],
+        fields: Optional[List[str]],
+    ) -> Read:
+        """
+        The read of a page of interactions, see ``DataUtils.get_interaction_page``.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+            InvalidFieldsError: If a field is not an interaction column.
+        """
+        selected = interaction_decoder.projection(fields)
+        after = decode_interaction_cursor(cursor) if cursor else None
+        return Read(
+            *self._interaction_query(
+                insurance_no=insurance_no,
+                labels=labels,
+                offset=offset,
+                limit=limit,
+                after=after,
+                columns=selected,
+            ),
+            route=[insurance_no],
+        )
+
+    def _get_interaction_page(
+        self,
+        insurance_no: Optional[str],
+        labels: Optional[str],
+        offset: int,
+        limit: int,
+        cursor: Optional[str],
+        fields: Optional[List[str]],
+    ) -> Operation:
+        read = self._interaction_page_read(
+            insurance_no, labels, offset, limit, cursor, fields
+        )
+        rows, columns = yield read
+        return self._interaction_page(rows, columns, limit)
+
+    def _get_interaction_page_json(
+        self,
+        insurance_no: Optional[str],
+        labels: Optional[str],
+        offset: int,
+        limit: int,
+        cursor: Optional[str],
+        fields: Optional[List[str]],
+    ) -> Operation:
+        read = self._interaction_page_read(
+            insurance_no, labels, offset, limit, cursor, fields
+        )
+        rows, columns = yield read
+        return self._interaction_page_json(rows, columns, limit)
+
+    def _rebuild_summaries(self) -> Operation:
+        for schema in (InteractionCountSchema, PatientHealthSchema):
+            yield Write(
+                *SQLQueryBuilder(self.placeholder).delete(schema.name).construct(),
+                many=False,
+            )
+        counts: Dict[Tuple[str, str], int] = {}
+        ailment_rows, _ = yield Read(
+            *SQLQueryBuilder(self.placeholder)
+            .select(columns=["ailment", "COUNT(*)"], table=InteractionSchema.name)
+            .group_by(["ailment"])
+            .construct()
+        )
+        date_rows, _ = yield Read(
+            *SQLQueryBuilder(self.placeholder)
+            .select(
+                columns=["interaction_date", "COUNT(*)"], table=InteractionSchema.name
+            )
+            .group_by(["interaction_date"])
+            .construct()
+        )
+        label_rows, _ = yield Read(*self._label_counts_query())
+        for dimension, rows in (
+            ("ailment", ailment_rows),
+            ("month", [(interaction_month(day), n) for day, n in date_rows]),
+            ("label", label_rows),
+        ):
+            for value, n in rows:
+                if value:
+                    counts[(dimension, value)] = counts.get((dimension, value), 0) + n
+        health_rows, _ = yield Read(
+            *SQLQueryBuilder(self.placeholder)
+            .select(
+                columns=[
+                    "insurance_no",
+                    "COUNT(*)",
+                    "SUM(health_status)",
+                    "COUNT(health_status)",
+                ],
+                table=InteractionSchema.name,
+            )
+            .group_by(["insurance_no"])
+            .construct()
+        )
+        count_rows = [(dimension, value, n) for (dimension, value), n in counts.items()]
+        health_rows = [
+            (insurance_no, n, int(total or 0), count)
+            for insurance_no, n, total, count in health_rows
+        ]
+        counts_query, health_query = self._summary_statements()
+        if count_rows:
+            yield Write(counts_query, count_rows)
+        if health_rows:
+            yield Write(health_query, health_rows)
+        yield COMMIT
+        return len(count_rows), len(health_rows)
+
+    def _get_interactions_by_ids(self, interaction_ids: List[int]) -> Operation:
+        interactions = []
+        for chunk in split_in_list(interaction_ids):
+            interactions += self._decode_interactions(
+                *(yield Read(*self._interactions_in_query(chunk), route=[]))
+            )
+        return self._order_by_ids(interactions, interaction_ids)
+
+    def _rebuild_search_index(
+        self, search_index: SearchIndex, batch_size: int
+    ) -> Operation:
+        search_index.clear()
+        columns = ["id", "insurance_no", *SEARCH_COLUMNS]
+        last_id = None
+        while True:
+            rows, names = yield Read(
+                *self._interaction_scan_query(columns, last_id, batch_size)
+            )
+            if not rows:
+                break
+            search_index.add(interaction_decoder.decode_dicts(rows, names))
+            last_id = rows[-1][0]
+        search_index.ready = True
+
+    def _get_label_counts(self) -> Operation:
+        rows, _ = yield Read(*self._label_counts_query(), route=[])
+        return [LabelCount(label=label, count=count) for label, count in rows]
+
+    def _rebuild_labels(self, batch_size: int) -> Operation:
+        yield Write(
+            *SQLQueryBuilder(self.placeholder)
+            .delete(InteractionLabelSchema.name)
+            .construct(),
+            many=False,
+        )
+        label_query = self._label_insert_query()
+        written, last_id = 0, None
+        while True:
+            rows, _ = yield Read(
+                *self._interaction_scan_query(["id", "label"], last_id, batch_size)
+            )
+            if not rows:
+                break
+            label_rows = [
+                (interaction_id, label)
+                for interaction_id, raw_label in rows
+                for label in split_labels(raw_label)
+            ]
+            if label_rows:
+                yield Write(label_query, label_rows)
+            written += len(label_rows)
+            last_id = rows[-1][0]
+        yield COMMIT
+        return written
+
+    def _get_interaction_counts(self, dimension: str) -> Operation:
+        rows, _ = yield Read(*self._interaction_counts_query(dimension), route=[])
+        return [GroupCount(value=value, count=count) for value, count in rows]
+
+    def _get_patient_health(
+        self, insurance_no: Optional[str], offset: int, limit: int
+    ) -> Operation:
+        rows, _ = yield Read(
+            *self._patient_health_query(insurance_no, offset, limit),
+            route=[insurance_no] if insurance_no else [],
+        )
+        return self._decode_patient_health(rows)
+
+    def _insert_items(
+        self,
+        data_objs: List[Record],
+        table_name: str,
+        batch_size: int = 100,
+        atomic: bool = False,
+    ) -> Operation:
+        """
+        Insert a batch of items into a specified table.
+
+        The labels of interactions are written to ``INTERACTION_LABEL`` and their
+        counts added to ``INTERACTION_COUNT`` and ``PATIENT_HEALTH`` in the same
+        transaction as their batch.
+
+        Args:
+            data_objs (List[Record]): Models, dicts or tuples to insert.
+            table_name (str): The name of the table to insert into.
+            batch_size (int, optional): The size of each batch to insert.
+            atomic (bool, optional): Commit once after all batches instead of after
+                each batch, so that either all items or none are inserted.
+        """
+        insert_query, rows = self._insert_statement(data_objs, table_name)
+        for i in range(0, len(rows), batch_size):
+            yield Write(insert_query, rows[i : i + batch_size])
+            for query, derived_rows in self._derived_statements(
+                table_name, data_objs[i : i + batch_size]
+            ):
+                if derived_rows:
+                    yield Write(query, derived_rows)
+            if not atomic:
+                yield COMMIT
+        if atomic:
+            yield COMMIT
+
+    def _insert_interactions(
+        self,
+        interactions: List[Union[Interaction, Record]],
+        batch_size: int,
+        atomic: bool,
+    ) -> Operation:
+        try:
+            yield from self._insert_items(
+                data_objs=interactions,
+                table_name=InteractionSchema.name,
+                batch_size=batch_size,
+                atomic=atomic,
+            )
+        finally:
+            self._invalidate_responses(interactions, interaction_encoder)
+            self._stick_to_primary(interactions, interaction_encoder)
+        if self.search_index is not None:
+            self.search_index.add(interactions)
+
+    def _insert_patients(
+        self, patients: List[Union[Patient, Record]], batch_size: int, atomic: bool
+    ) -> Operation:
+        try:
+            yield from self._insert_items(
+                data_objs=patients,
+                table_name=PatientSchema.name,
+                batch_size=batch_size,
+                atomic=atomic,
+            )
+        finally:
+            self._invalidate_patients(patients)
+            self._stick_to_primary(patients, patient_encoder)
+
+
+class DataUtils(BaseDataUtils):
+    """
+    A utility class for database operations related to patients and interactions.
+
+    The class accepts either a single connection or a ``ConnectionPool``. With a
+    pool, every operation borrows its own connection and returns it afterwards,
+    so one instance can safely be used from several threads.
+
+    Patient lookups are served from ``patient_cache`` when one is given.
+    ``placeholder`` is the parameter marker of the driver, e.g. ``?`` for sqlite3.
+    The replicas of a ``ReplicaRouter`` are connections or pools as well.
+    """
+
+    def __init__(
+        self,
+        connection_obj: Any,
+        patient_cache: PatientCache = None,
+        placeholder: str = "%s",
+        search_index: SearchIndex = None,
+        response_cache: ResponseCache = None,
+        replicas: ReplicaRouter = None,
+    ):
+        self.conn = connection_obj
+        self.patient_cache = patient_cache
+        self.placeholder = placeholder
+        self.search_index = search_index
+        self.response_cache = response_cache
+        self.replicas = replicas
+
+    @contextmanager
+    def _borrow(self, source: Any = None):
+        """
+        Borrow a connection for a single operation.
+
+        Args:
+            source (Any, optional): A connection or pool of a replica, None for
+                the primary.
+
+        Yields:
+            Any: A pooled connection, or the connection itself.
+        """
+        source = self.conn if source is None else source
+        if isinstance(source, ConnectionPool):
+            with source.connection() as conn:
+                yield conn
+        else:
+            yield source
+
+    def _read_source(self, insurance_nos: Sequence[str] = ()) -> Any:
+        """
+        Choose where a read goes.
+
+        Args:
+            insurance_nos (Sequence[str], optional): The insurance numbers the read
+                is about, empty for reads across patients.
+
+        Returns:
+            Any: A replica, or None for the primary.
+        """
+        if self.replicas is None:
+            return None
+        if self.replicas.lag_check_due():
+            self._run(self._check_replica_lag())
+        return self.replicas.replica_for(insurance_nos)
+
+    def _read_cursor(self, conn: Any, query: str) -> Tuple[Any, bool]:
+        """
+        Get a cursor to run a read query on, preferring a cached prepared statement.
+
+        Args:
+            conn (Any): The borrowed connection.
+            query (str): The query template.
+
+        Returns:
+            Tuple[Any, bool]: The cursor and whether it is a cached prepared cursor,
+            which must stay open.
+        """
+        if not self.statement_cache.supports(conn):
+            return conn.cursor(), False
+        cursor = self.statement_cache.get(conn, query)
+        if cursor is None:
+            try:
+                cursor = conn.cursor(prepared=True)
+            except TypeError:
+                self.statement_cache.mark_unsupported(conn)
+                return conn.cursor(), False
+            evicted = self.statement_cache.put(conn, query, cursor)
+            if evicted is not None:
+                evicted.close()
+        return cursor, True
+
+    def _fetch(
+        self,
+        query: str,
+        params: Tuple = (),
+        prepared: bool = True,
+        source: Any = None,
+    ) -> Tuple[List[Tuple], Optional[Tuple[str, ...]]]:
+        """
+        Run a read query on a borrowed connection and return all rows.
+
+        Args:
+            query (str): The SQL query template.
+            params (Tuple, optional): The values bound to the placeholders.
+            prepared (bool, optional): Run it as a reusable prepared statement.
+            source (Any, optional): The replica to read from, None for the primary.
+
+        Returns:
+            Tuple[List[Tuple], Optional[Tuple[str, ...]]]: The fetched rows and
+            the names of their columns.
+        """
+        started = time.perf_counter()
+        with self._borrow(source) as conn:
+            acquired = time.perf_counter()
+            if prepared:
+                cursor, cached = self._read_cursor(conn, query)
+            else:
+                cursor, cached = conn.cursor(), False
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            columns = RowDecoder.columns_of(cursor.description)
+            if not cached:
+                cursor.close()
+        self.instrumentation.observe_query(
+            query, time.perf_counter() - acquired, len(rows), acquired - started
+        )
+        return rows, columns
+
+    def _run(self, operation: Operation) -> Any:
+        """
+        Run an operation, every read on a connection borrowed for it alone.
+
+        Errors of a read are raised inside the operation.
+
+        Args:
+            operation (Operation): The operation, yielding ``Read`` steps.
+
+        Returns:
+            Any: The value the operation returns.
+        """
+        send, value = operation.send, None
+        while True:
+            try:
+                read = send(value)
+            except StopIteration as done:
+                return done.value
+            try:
+                source = read.source
+                if source is None and read.route is not None:
+                    source = self._read_source(read.route)
+                value = self._fetch(read.query, read.params, read.prepared, source)
+                send = operation.send
+            except Exception as e:
+                send, value = operation.throw, e
+
+    def _transact(self, operation: Operation) -> Any:
+        """
+        Run an operation in a transaction on one connection of the primary.
+
+        Work left uncommitted when the operation fails is rolled back.
+
+        Args:
+            operation (Operation): The operation, yielding ``Read``, ``Write``
+                and ``COMMIT`` steps.
+
+        Returns:
+            Any: The value the operation returns.
+        """
+        started = time.perf_counter()
+        with self._borrow() as conn:
+            pool_wait = time.perf_counter() - started
+            cursor = conn.cursor()
+            try:
+                send, value = operation.send, None
+                while True:
+                    try:
+                        step = send(value)
+                    except StopIteration as done:
+                        return done.value
+                    send, value = operation.send, None
+                    if step is COMMIT:
+                        conn.commit()
+                        continue
+                    step_started = time.perf_counter()
+                    try:
+                        if isinstance(step, Read):
+                            cursor.execute(step.query, step.params)
+                            value = (
+                                cursor.fetchall(),
+                                RowDecoder.columns_of(cursor.description),
+                            )
+                            rows = len(value[0])
+                        elif step.many:
+                            cursor.executemany(step.query, step.params)
+                            rows = len(step.params)
+                        else:
+                            cursor.execute(step.query, step.params)
+                            rows = max(cursor.rowcount, 0)
+                    except Exception as e:
+                        send, value = operation.throw, e
+                        continue
+                    self.instrumentation.observe_query(
+                        step.query, time.perf_counter() - step_started, rows, pool_wait
+                    )
+                    pool_wait = 0.0
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def get_patient_by_insurance_no(
+        self, insurance_no: str, fields: Optional[List[str]] = None
+    ) -> List[Patient]:
+        """
+        Retrieve patient details by insurance number.
+
+        With ``fields`` only those columns (and the insurance number) are fetched
+        and decoded, into partial patients. A patient found in ``patient_cache``
+        is returned whole.
+
+        Args:
+            insurance_no (str): The insurance number of the patient.
+            fields (Optional[List[str]]): The fields to fetch, None for all.
+
+        Returns:
+            List[Patient]: A list of Patient objects.
+
+        Raises:
+            InvalidFieldsError: If a field is not a patient column.
+        """
+        return self._run(self._get_patient_by_insurance_no(insurance_no, fields))
+
+    def get_patients_by_insurance_nos(
+        self, insurance_nos: List[str], fields: Optional[List[str]] = None
+    ) -> List[Patient]:
+        """
+        Retrieve the patients of several insurance numbers at once.
+
+        Patients found in ``patient_cache`` are not queried; the others are
+        fetched with one ``IN`` query per ``IN_LIST_MAX_SIZE`` numbers.
+
+        Args:
+            insurance_nos (List[str]): The insurance numbers of the patients.
+            fields (Optional[List[str]]): The fields to fetch, None for all.
+
+        Returns:
+            List[Patient]: The patients found, in the order of ``insurance_nos``.
+
+        Raises:
+            InvalidFieldsError: If a field is not a patient column.
+        """
+        return self._run(self._get_patients_by_insurance_nos(insurance_nos, fields))
+
+    def existing_insurance_nos(self, insurance_nos: List[str]) -> Set[str]:
+        """
+        Tell which insurance numbers belong to an existing patient, with one set
+        based query for the numbers the patient cache does not know.
+
+        Args:
+            insurance_nos (List[str]): The insurance numbers to check.
+
+        Returns:
+            Set[str]: The insurance numbers that have a patient record.
+        """
+        return self._run(self._existing_insurance_nos(insurance_nos))
+
     def get_interaction_info(
         self,
         insurance_no: int = None,
         labels: str = None,
         offset: int = 0,
         limit: int = 10,
+        cursor: str = None,
+        fields: Optional[List[str]] = None,
     ) -> List[Interaction]:
         """
         Retrieve interaction information based on insurance number and optional labels.
@@ -76,95 +1383,329 @@ class DataUtils:
             labels (str, optional): Comma-separated string of labels to filter interactions.
             offset (int, optional): Offset for pagination.
             limit (int, optional): Limit for pagination.
+            cursor (str, optional): Cursor of the page to fetch, replaces ``offset``.
+            fields (Optional[List[str]]): The fields to fetch, None for all.
 
         Returns:
             List[Interaction]: A list of Interaction objects.
         """
-        colnames_vs_objs = {col.name: col for col in InteractionSchema.columns}
-        intersections = [
-            (colnames_vs_objs["insurance_no"], SQLOperators.EQ, insurance_no)
-        ]
-        unions = []
-        if labels:
-            for label in labels.split(","):
-                unions += [(colnames_vs_objs["label"], SQLOperators.LIKE, label)]
-        self.cursor = self.conn.cursor()
-        query = (
-            self.sql_builder.select(columns=["*"], table=InteractionSchema.name)
-            .conditions(intersections=intersections, unions=unions)
-            .limit(limit)
-            .offset(offset)
-            .construct_query()
+        interactions, _ = self.get_interaction_page(
+            insurance_no=insurance_no,
+            labels=labels,
+            offset=offset,
+            limit=limit,
+            cursor=cursor,
+            fields=fields,
         )
-        print(query)
-        self.cursor.execute(query)
-        rows = self.cursor.fetchall()
-        interactions = [Interaction.from_list(row) for row in rows]
-        self.cursor.close()
         return interactions
 
+    def get_interaction_page(
+        self,
+        insurance_no: int = None,
+        labels: str = None,
+        offset: int = 0,
+        limit: int = 10,
+        cursor: str = None,
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[List[Interaction], Optional[str]]:
+        """
+        Retrieve a page of interactions together with the cursor of the next page.
+
+        Args:
+            insurance_no (int, optional): Insurance number of the patient.
+            labels (str, optional): Comma-separated string of labels to filter interactions.
+            offset (int, optional): Offset for pagination, ignored when ``cursor`` is set.
+            limit (int, optional): Limit for pagination.
+            cursor (str, optional): Cursor returned with the previous page.
+            fields (Optional[List[str]]): The fields to fetch, None for all. The
+                id, insurance number and date are always fetched.
+
+        Returns:
+            Tuple[List[Interaction], Optional[str]]: The interactions and the next cursor.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+            InvalidFieldsError: If a field is not an interaction column.
+        """
+        return self._run(
+            self._get_interaction_page(
+                insurance_no, labels, offset, limit, cursor, fields
+            )
+        )
+
+    def get_interaction_page_json(
+        self,
+        insurance_no: int = None,
+        labels: str = None,
+        offset: int = 0,
+        limit: int = 10,
+        cursor: str = None,
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[bytes, Optional[str]]:
+        """
+        Retrieve a page of interactions as a ready-to-send JSON array.
+
+        Takes the same arguments as ``get_interaction_page``. The rows are
+        validated once and serialized without building a response model.
+
+        Returns:
+            Tuple[bytes, Optional[str]]: The JSON array and the next cursor.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+            InvalidFieldsError: If a field is not an interaction column.
+        """
+        return self._run(
+            self._get_interaction_page_json(
+                insurance_no, labels, offset, limit, cursor, fields
+            )
+        )
+
+    def get_label_counts(self) -> List[LabelCount]:
+        """
+        Count the interactions of every label, from the label index alone.
+
+        Returns:
+            List[LabelCount]: The labels in alphabetical order with their counts.
+        """
+        return self._run(self._get_label_counts())
+
+    def rebuild_labels(self, batch_size: int = 1000) -> int:
+        """
+        Rebuild ``INTERACTION_LABEL`` from the label column of ``INTERACTION``.
+
+        Backfills the label index of interactions inserted before it existed.
+        The index is emptied and refilled in one transaction, reading the
+        interactions in id order ``batch_size`` at a time, so label filters
+        keep using the previous index until the new one is committed.
+
+        Args:
+            batch_size (int, optional): Interactions read per query.
+
+        Returns:
+            int: The number of label rows written.
+        """
+        return self._transact(self._rebuild_labels(batch_size))
+
+    def get_interaction_counts(self, dimension: str) -> List[GroupCount]:
+        """
+        Read the number of interactions per label, ailment or month from
+        ``INTERACTION_COUNT``.
+
+        Args:
+            dimension (str): One of ``SUMMARY_DIMENSIONS``.
+
+        Returns:
+            List[GroupCount]: The values of the dimension in order with their counts.
+        """
+        return self._run(self._get_interaction_counts(dimension))
+
+    def get_patient_health(
+        self, insurance_no: Optional[str] = None, offset: int = 0, limit: int = 100
+    ) -> List[PatientHealth]:
+        """
+        Read the interaction count and average health status of patients from
+        ``PATIENT_HEALTH``.
+
+        Args:
+            insurance_no (Optional[str], optional): A single patient, None for all.
+            offset (int, optional): Number of patients to skip.
+            limit (int, optional): Number of patients to return.
+
+        Returns:
+            List[PatientHealth]: The patients in order of insurance number.
+        """
+        return self._run(self._get_patient_health(insurance_no, offset, limit))
+
+    def rebuild_summaries(self) -> Tuple[int, int]:
+        """
+        Recompute ``INTERACTION_COUNT`` and ``PATIENT_HEALTH`` from the interactions.
+
+        Backfills the summaries of interactions inserted before they existed and
+        repairs drift. The counts are computed with GROUP BY queries, months are
+        rolled up from the per-date counts, and the tables are emptied, read
+        and refilled in one transaction. Emptying them first locks the summary
+        rows, so the increments of concurrent inserts wait for the rebuild and
+        are added on top of it instead of being overwritten.
+
+        Returns:
+            Tuple[int, int]: The number of count rows and patient rows written.
+        """
+        return self._transact(self._rebuild_summaries())
+
+    def get_interactions_by_ids(self, interaction_ids: List[int]) -> List[Interaction]:
+        """
+        Retrieve interactions by id with set-based queries.
+
+        Args:
+            interaction_ids (List[int]): The ids of the interactions.
+
+        Returns:
+            List[Interaction]: The interactions found, in the order of the ids.
+        """
+        return self._run(self._get_interactions_by_ids(interaction_ids))
+
+    def rebuild_search_index(self, search_index: SearchIndex, batch_size: int = 10000):
+        """
+        Fill a search index with all interactions, read in id order.
+
+        Args:
+            search_index (SearchIndex): The index, emptied first and marked ready
+                when done.
+            batch_size (int, optional): Interactions read per query.
+        """
+        self._run(self._rebuild_search_index(search_index, batch_size))
+
     def create_table(self, schema: TableSchema):
         """
         Create a database table based on the provided schema.
 
+        SQLite declares no indexes in the table definition; they are created
+        right after the table. Generated columns, and the indexes on them, are
+        left out when the table stores its JSON columns in a binary format.
+
         Args:
             schema (TableSchema): The schema of the table to create.
         """
-        query = self.sql_builder.create(schema).construct_query()
-        cursor = self.conn.cursor()
-        print(query)
-        cursor.execute(query)
-        self.conn.commit()
-        print("Created Table..")
-        cursor.close()
+        table = registry.get(schema.name)
+        # the database cannot compute generated columns from binary documents
+        generated = table is None or not table.json_codec.binary
+        query = (
+            SQLQueryBuilder()
+            .create(schema, self.dialect, generated=generated)
+            .construct_query()
+        )
+        self._execute_ddl(query)
+        if self.dialect == "sqlite":
+            self.create_missing_indexes(schema)
+        logger.info("Created table %s", schema.name)
 
-    def _insert_items(
-        self, data_objs: List[BaseModel], table_name: str, batch_size: int = 100
-    ):
+    def create_missing_indexes(self, schema: TableSchema) -> List[str]:
         """
-        Insert a batch of items into a specified table.
+        Create the secondary indexes of a schema that an existing table lacks.
+
+        ``create_table`` declares the indexes of new tables; this brings tables
+        created before an index was added to the schema up to date.
 
         Args:
-            data_objs (List[BaseModel]): List of Pydantic BaseModel objects to insert.
-            table_name (str): The name of the table to insert into.
-            batch_size (int, optional): The size of each batch to insert.
+            schema (TableSchema): The schema of the table.
+
+        Returns:
+            List[str]: The names of the indexes that were created.
         """
-        cursor = self.conn.cursor()
-        columns, rows = convert_obj_to_lists(objs=data_objs)
-        insert_query = self.sql_builder.insert_batch(
-            table=table_name, columns=columns
-        ).construct_query()
-        print(f"Insert query template: {insert_query}")
-        for i in range(0, len(rows), batch_size):
-            print(f"Inserting for batch {i+batch_size}")
-            cursor.executemany(insert_query, rows[i : i + batch_size])
-            self.conn.commit()
-        print("Done")
+        rows, _ = self._fetch(
+            SQLQueryBuilder().show_indexes(schema.name, self.dialect).construct_query(),
+            prepared=False,
+        )
+        existing = {row[2] for row in rows}
+        columns = set(self.table_columns(schema.name))
+        created = []
+        for index in schema.indexes or []:
+            # e.g. on a generated column the table was created without
+            if index.name in existing or not columns.issuperset(index.columns):
+                continue
+            self._execute_ddl(
+                SQLQueryBuilder().create_index(schema.name, index).construct_query()
+            )
+            created.append(index.name)
+        return created
+
+    def _execute_ddl(self, query: str):
+        logger.info(query)
+        with self._borrow() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query)
+            conn.commit()
+            cursor.close()
+
+    def table_columns(self, table: str) -> Tuple[str, ...]:
+        """
+        The columns of an existing table.
+
+        Args:
+            table (str): Name of the table.
+
+        Returns:
+            Tuple[str, ...]: The column names, in table order.
+        """
+        query, params = (
+            SQLQueryBuilder(self.placeholder).select(["*"], table).limit(0).construct()
+        )
+        _, columns = self._fetch(query, params, prepared=False)
+        return columns or ()
+
+    def upgrade_json_columns(self, schema: TableSchema) -> List[str]:
+        """
+        Bring a table created with JSON text columns up to its schema: native
+        JSON columns and the generated columns on their keys.
+
+        Empty strings, which are not JSON documents, are replaced with NULL;
+        MySQL then converts the columns to its JSON type, validating every
+        document. Generated columns are added as VIRTUAL columns, which does not
+        rewrite the table; ``create_missing_indexes`` indexes them afterwards.
+
+        Args:
+            schema (TableSchema): The schema of the table.
+
+        Returns:
+            List[str]: The names of the generated columns that were added.
+        """
+        table = registry[schema.name]
+        for col in schema.columns:
+            if not col.json_encoded:
+                continue
+            self._execute_ddl(
+                SQLQueryBuilder().nullify_empty(schema.name, col.name).construct_query()
+            )
+            if self.dialect == "mysql" and col.dtype == SQLTypes.JSON:
+                self._execute_ddl(
+                    SQLQueryBuilder().modify_column(schema.name, col).construct_query()
+                )
+        if table.json_codec.binary:
+            return []
+        existing = set(self.table_columns(schema.name))
+        added = []
+        for col in schema.columns:
+            if col.generated_from and col.name not in existing:
+                self._execute_ddl(
+                    SQLQueryBuilder()
+                    .add_column(schema.name, col, self.dialect)
+                    .construct_query()
+                )
+                added.append(col.name)
+        return added
 
     def insert_interactions(
-        self, interactions: List[Interaction], batch_size: int = 100
+        self,
+        interactions: List[Union[Interaction, Record]],
+        batch_size: int = 100,
+        atomic: bool = False,
     ):
         """
         Insert a list of interaction records into the database.
 
         Args:
-            interactions (List[Interaction]): List of Interaction objects to insert.
+            interactions (List[Union[Interaction, Record]]): Interaction objects, or
+                dicts or tuples with the same fields.
             batch_size (int, optional): The size of each batch to insert.
+            atomic (bool, optional): Insert all records in a single transaction.
+                The records are added to ``search_index`` once they are all inserted.
         """
-        self._insert_items(
-            data_objs=interactions,
-            table_name=InteractionSchema.name,
-            batch_size=batch_size,
-        )
+        self._transact(self._insert_interactions(interactions, batch_size, atomic))
 
-    def insert_patients(self, patients: List[Patient], batch_size: int = 100):
+    def insert_patients(
+        self,
+        patients: List[Union[Patient, Record]],
+        batch_size: int = 100,
+        atomic: bool = False,
+    ):
         """
         Insert a list of patient records into the database.
 
         Args:
-            patients (List[Patient]): List of Patient objects to insert.
+            patients (List[Union[Patient, Record]]): Patient objects, or dicts or
+                tuples with the same fields.
             batch_size (int, optional): The size of each batch to insert.
+            atomic (bool, optional): Insert all records in a single transaction.
         """
-        self._insert_items(
-            data_objs=patients, table_name=PatientSchema.name, batch_size=batch_size
-        )
+        self._transact(self._insert_patients(patients, batch_size, atomic))
@@ -0,0 +1,258 @@
+import csv
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, Field, ValidationError
+
+from datamodel.models import Interaction, Patient
+from utils.data_utils import interaction_encoder, patient_encoder
+from utils.row_codec import RowEncoder
+from utils.table_schemas import InteractionSchema, PatientSchema
+
+logger = logging.getLogger(__name__)
+
+# rejected rows whose position and error are kept in the report
+MAX_REJECTION_SAMPLES = 20
+
+# model validating and encoder serializing the rows of each table
+TARGETS: Dict[str, Tuple[type, RowEncoder]] = {
+    PatientSchema.name: (Patient, patient_encoder),
+    InteractionSchema.name: (Interaction, interaction_encoder),
+}
+
+
+class IngestReport(BaseModel):
+    """
+    Outcome of ingesting one CSV file.
+
+    Attributes:
+        table (str): The table the rows were inserted into.
+        resumed_at (int): Rows skipped because a previous run committed them.
+        rows_read (int): Rows read in this run.
+        rows_inserted (int): Rows inserted in this run.
+        rows_rejected (int): Rows that failed validation.
+        rejections (List[Tuple[int, str]]): Position and error of the first
+            ``MAX_REJECTION_SAMPLES`` rejected rows.
+        seconds (float): Wall time of the run.
+    """
+
+    table: str
+    resumed_at: int = 0
+    rows_read: int = 0
+    rows_inserted: int = 0
+    rows_rejected: int = 0
+    rejections: List[Tuple[int, str]] = Field(default_factory=list)
+    seconds: float = 0.0
+
+
+class Checkpoint:
+    """
+    Progress of the ingest, persisted as a small JSON file.
+
+    For every table it records how many CSV rows have been processed and
+    committed, so an interrupted load resumes after the last committed chunk.
+    The file is replaced atomically on every update.
+
+    Attributes:
+        path (Optional[str]): The checkpoint file, None to keep progress in memory only.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._positions: Dict[str, int] = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self._positions = json.load(f)
+
+    def position(self, table: str) -> int:
+        """
+        Rows of a table processed so far.
+
+        Args:
+            table (str): The table name.
+
+        Returns:
+            int: The number of CSV rows to skip.
+        """
+        return self._positions.get(table, 0)
+
+    def advance(self, table: str, position: int):
+        """
+        Record that the rows of a table up to ``position`` are committed.
+
+        Args:
+            table (str): The table name.
+            position (int): The number of CSV rows processed.
+        """
+        self._positions[table] = position
+        if self.path:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._positions, f)
+            os.replace(tmp_path, self.path)
+
+    def reset(self):
+        """
+        Forget all progress.
+        """
+        self._positions = {}
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def read_chunks(
+    path: str, chunk_size: int, start: int = 0
+) -> Iterator[Tuple[int, List[Dict[str, str]]]]:
+    """
+    Stream a CSV file in chunks of rows.
+
+    Args:
+        path (str): The CSV file, with a header row.
+        chunk_size (int): Rows per chunk.
+        start (int, optional): Rows to skip, e.g. when resuming.
+
+    Yields:
+        Tuple[int, List[Dict[str, str]]]: The position of the first row of the
+        chunk and its rows keyed by column.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for _ in islice(reader, start):
+            pass
+        position = start
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                return
+            yield position, chunk
+            position += len(chunk)
+
+
+def parse_chunk(
+    table: str, position: int, rows: List[Dict[str, str]]
+) -> Tuple[List[Tuple], List[Tuple[int, str]]]:
+    """
+    Parse, validate and encode a chunk of CSV rows. Runs in the worker processes.
+
+    Empty fields are read as NULL and the JSON columns of the table are parsed
+    before validation.
+
+    Args:
+        table (str): The table the rows belong to.
+        position (int): The position of the first row in the file.
+        rows (List[Dict[str, str]]): The raw CSV rows.
+
+    Returns:
+        Tuple[List[Tuple], List[Tuple[int, str]]]: The encoded rows ready to be
+        inserted, and the position and error of every rejected row.
+    """
+    model, encoder = TARGETS[table]
+    json_columns = [col.name for col in encoder.schema.columns if col.json_encoded]
+    encoded, rejected = [], []
+    for offset, row in enumerate(rows):
+        fields = {k: (v if v != "" else None) for k, v in row.items()}
+        try:
+            for name in json_columns:
+                if fields.get(name) is not None:
+                    fields[name] = json.loads(fields[name])
+            encoded.append(encoder.encode_one(model.model_validate(fields)))
+        except (ValueError, ValidationError) as e:
+            rejected.append((position + offset, str(e).splitlines()[0]))
+    return encoded, rejected
+
+
+def _done(result: Any) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def ingest_csv(
+    path: str,
+    table: str,
+    insert: Callable[[List[Tuple]], Any],
+    chunk_size: int = 10000,
+    workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    checkpoint: Optional[Checkpoint] = None,
+) -> IngestReport:
+    """
+    Load a CSV file into a table through a streaming pipeline.
+
+    The file is read in chunks; parsing and validation run in a pool of worker
+    processes while the calling process inserts the chunks that are ready, in
+    file order. At most ``max_in_flight`` chunks are read ahead of the insert
+    stage, which bounds memory when the database is the bottleneck. After a
+    chunk is inserted the checkpoint is advanced, so a rerun after a crash
+    starts from the first chunk not recorded. A crash between the commit of a
+    chunk and its checkpoint leaves that chunk recorded as not loaded, so
+    ``insert`` must skip the rows already stored, as ``BulkLoader`` does with
+    ``skip_existing``.
+
+    Args:
+        path (str): The CSV file.
+        table (str): The table to load, one of ``TARGETS``.
+        insert (Callable[[List[Tuple]], Any]): Inserts the encoded rows of a chunk
+            in a single transaction, skipping the rows whose key is stored.
+        chunk_size (int, optional): Rows per chunk.
+        workers (Optional[int], optional): Worker processes, defaults to the CPU
+            count; 0 parses in the calling process.
+        max_in_flight (Optional[int], optional): Chunks read ahead of the insert
+            stage, defaults to twice the number of workers.
+        checkpoint (Optional[Checkpoint], optional): Progress to resume from and update.
+
+    Returns:
+        IngestReport: Counts of the rows read, inserted and rejected.
+    """
+    checkpoint = checkpoint or Checkpoint()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    max_in_flight = max_in_flight or max(2 * workers, 1)
+    start = checkpoint.position(table)
+    report = IngestReport(table=table, resumed_at=start)
+    started = time.perf_counter()
+    executor = ProcessPoolExecutor(workers) if workers else None
+    in_flight = deque()
+
+    def drain_one():
+        position, size, future = in_flight.popleft()
+        encoded, rejected = future.result()
+        if encoded:
+            insert(encoded)
+        free = MAX_REJECTION_SAMPLES - len(report.rejections)
+        if rejected and free > 0:
+            report.rejections.extend(rejected[:free])
+        report.rows_inserted += len(encoded)
+        report.rows_rejected += len(rejected)
+        checkpoint.advance(table, position + size)
+
+    try:
+        for position, rows in read_chunks(path, chunk_size, start):
+            if executor is not None:
+                future = executor.submit(parse_chunk, table, position, rows)
+            else:
+                future = _done(parse_chunk(table, position, rows))
+            in_flight.append((position, len(rows), future))
+            report.rows_read += len(rows)
+            if len(in_flight) >= max_in_flight:
+                drain_one()
+        while in_flight:
+            drain_one()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    report.seconds = time.perf_counter() - started
+    if report.rows_rejected:
+        logger.warning(
+            "%s: rejected %d rows, first ones: %s",
+            table,
+            report.rows_rejected,
+            report.rejections,
+        )
+    return report
@@ -1,28 +1,179 @@
-import mysql.connector
-from mysql.connector import MySQLConnection
+from typing import Any, List, Optional
 
+from utils.async_pool import AsyncConnectionPool
+from utils.backends import BACKENDS, Backend, MemoryBackend, MySQLBackend, SQLiteBackend
+from utils.connection_pool import ConnectionPool
+from utils.replica_router import ReplicaRouter
+from utils.settings import settings
 
-def sql_instance() -> MySQLConnection:
+
+def _connect_kwargs() -> dict:
+    return dict(
+        host=settings.db_host,
+        port=settings.db_port,
+        user=settings.db_user,
+        password=settings.db_password,
+        database=settings.db_name,
+        allow_local_infile=settings.db_allow_local_infile,
+    )
+
+
+def make_backend() -> Backend:
     """
-    Establish a connection to the MySQL database and return the connection object.
+    Create the storage backend selected by ``DB_BACKEND`` in the settings.
 
     Returns:
-        MySQLConnection: A connection object to the MySQL database if successful, None otherwise.
+        Backend: A MySQL server, an SQLite file at ``DB_PATH`` or an in-memory
+        database.
 
     Raises:
-        mysql.connector.Error: If there is an error in connecting to the database.
+        ValueError: If the backend is unknown, or binary JSON storage is
+            requested for MySQL, whose JSON columns only take JSON text.
     """
-    # @TODO accept config from properties file
-    try:
-        connection = mysql.connector.connect(
-            host="db",
-            user="mysql",
-            password="mysqlpwd",
-            database="doctor_patient_db",
+    if settings.db_backend == "mysql" and settings.json_storage != "text":
+        raise ValueError(
+            f"JSON_STORAGE={settings.json_storage} needs an embedded DB_BACKEND"
         )
-        if connection.is_connected():
-            print("Connected to database")
-            return connection
-    except mysql.connector.Error as e:
+    if settings.db_backend == "mysql":
+        return MySQLBackend(**_connect_kwargs())
+    if settings.db_backend == "sqlite":
+        return SQLiteBackend(settings.db_path)
+    if settings.db_backend == "memory":
+        return MemoryBackend()
+    raise ValueError(
+        f"Unknown DB_BACKEND {settings.db_backend}, expected one of {sorted(BACKENDS)}"
+    )
+
+
+backend = make_backend()
+
+
+def make_replica_backends() -> List[Backend]:
+    """
+    Create the read replicas listed in ``DB_REPLICAS`` in the settings.
+
+    Returns:
+        List[Backend]: One backend of the primary's kind per replica, empty when
+        none is configured.
+
+    Raises:
+        ValueError: If the backend does not support replicas.
+    """
+    replicas = [name.strip() for name in settings.db_replicas.split(",")]
+    replicas = [name for name in replicas if name]
+    if not replicas:
+        return []
+    if settings.db_backend == "mysql":
+        backends = []
+        for replica in replicas:
+            host, _, port = replica.partition(":")
+            connect_kwargs = dict(
+                _connect_kwargs(), host=host, port=int(port or settings.db_port)
+            )
+            backends.append(MySQLBackend(**connect_kwargs))
+        return backends
+    if settings.db_backend == "sqlite":
+        return [SQLiteBackend(path) for path in replicas]
+    raise ValueError(f"DB_BACKEND {settings.db_backend} has no read replicas")
+
+
+def _pool_size(size: int, db_backend: Backend) -> int:
+    if db_backend.max_connections is None:
+        return size
+    return min(size, db_backend.max_connections)
+
+
+def sql_instance() -> Any:
+    """
+    Establish a connection to the database and return the connection object.
+
+    Returns:
+        Any: A connection of the configured backend if successful, None otherwise.
+    """
+    try:
+        connection = backend.connect()
+        print("Connected to database")
+        return connection
+    except backend.errors as e:
+        print("Error connection to database", str(e))
+        return None
+
+
+def sql_pool(db_backend: Optional[Backend] = None) -> ConnectionPool:
+    """
+    Create a connection pool for the database configured in the settings.
+
+    The pool is warmed up to its minimum size; if the database is not reachable
+    yet, connections are opened lazily on first use instead.
+
+    Args:
+        db_backend (Optional[Backend], optional): The database, e.g. a replica;
+            None for the primary.
+
+    Returns:
+        ConnectionPool: The connection pool.
+    """
+    db_backend = db_backend or backend
+    pool = ConnectionPool(
+        connect=db_backend.connect,
+        min_size=_pool_size(settings.pool_min_size, db_backend),
+        max_size=_pool_size(settings.pool_max_size, db_backend),
+        timeout=settings.pool_timeout,
+        max_idle_time=settings.pool_max_idle_time,
+        health_check=settings.pool_health_check,
+    )
+    try:
+        pool.warm_up()
+        print("Connected to database")
+    except db_backend.errors as e:
         print("Error connection to database", str(e))
+    return pool
+
+
+async def async_sql_pool(db_backend: Optional[Backend] = None) -> AsyncConnectionPool:
+    """
+    Create an asyncio connection pool for the database configured in the settings.
+
+    Like ``sql_pool``, the pool is warmed up on a best-effort basis.
+
+    Args:
+        db_backend (Optional[Backend], optional): The database, e.g. a replica;
+            None for the primary.
+
+    Returns:
+        AsyncConnectionPool: The asyncio connection pool.
+    """
+    db_backend = db_backend or backend
+    pool = AsyncConnectionPool(
+        driver=db_backend.async_driver(),
+        min_size=_pool_size(settings.async_pool_min_size, db_backend),
+        max_size=_pool_size(settings.async_pool_max_size, db_backend),
+        timeout=settings.pool_timeout,
+        max_idle_time=settings.pool_max_idle_time,
+        health_check=settings.pool_health_check,
+    )
+    try:
+        await pool.warm_up()
+        print("Connected to database")
+    except db_backend.errors as e:
+        print("Error connection to database", str(e))
+    return pool
+
+
+async def async_replica_router() -> Optional[ReplicaRouter]:
+    """
+    Create asyncio pools for the read replicas configured in the settings and a
+    router spreading reads over them.
+
+    Returns:
+        Optional[ReplicaRouter]: The router, None without replicas.
+    """
+    replicas = [await async_sql_pool(replica) for replica in make_replica_backends()]
+    if not replicas:
         return None
+    return ReplicaRouter(
+        replicas,
+        max_lag=settings.replica_max_lag_seconds,
+        sticky_seconds=settings.replica_sticky_seconds,
+        lag_check_interval=settings.replica_lag_check_interval,
+    )
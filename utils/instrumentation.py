@@ -0,0 +1,525 @@
+import bisect
+import contextvars
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# the ASGI scope of the request being served, to label observations by endpoint
+_request_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "request_scope", default=None
+)
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+# a parenthesized list of placeholders: IN lists and VALUES rows
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_REPEATED_LIST = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|ON)\s+(\w+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def query_shape(query: str) -> Tuple[str, str]:
+    """
+    Identify the shape of a query, i.e. its text up to the length of its lists.
+
+    Queries differing only in the number of ``IN`` values or of ``VALUES`` rows
+    have the same shape.
+
+    Args:
+        query (str): The SQL query template.
+
+    Returns:
+        Tuple[str, str]: A short id of the shape, e.g. ``select_patient_1a2b3c4d``,
+        and the normalized SQL.
+    """
+    sql = _PLACEHOLDER_LIST.sub("(...)", " ".join(query.split()))
+    sql = _REPEATED_LIST.sub("(...)", sql)
+    verb = sql.split(" ", 1)[0].lower()
+    table = _TABLE.search(sql)
+    digest = hashlib.blake2b(sql.encode(), digest_size=4).hexdigest()
+    name = f"{verb}_{table.group(1).lower()}" if table else verb
+    return f"{name}_{digest}", sql
+
+
+def current_endpoint() -> str:
+    """
+    Name of the endpoint serving the current request.
+
+    Returns:
+        str: The name of the endpoint function, ``unmatched`` for a request no
+        route matched and ``none`` outside of a request.
+    """
+    scope = _request_scope.get()
+    if scope is None:
+        return "none"
+    return getattr(scope.get("endpoint"), "__name__", "unmatched")
+
+
+class _NoTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_TIMER = _NoTimer()
+
+
+class Instrumentation:
+    """
+    Receives the timings of the data utilities and of the API.
+
+    This base class discards them; subclasses record them. The data utilities
+    report every query with its shape, duration, row count and the wait for a
+    pooled connection, and time the decoding of rows into models; the API
+    times whole requests and the serialization of responses.
+    """
+
+    def observe_query(
+        self, query: str, seconds: float, rows: int, pool_wait: float = 0.0
+    ):
+        """
+        Record a query.
+
+        Args:
+            query (str): The SQL query template.
+            seconds (float): Time spent executing it and fetching the rows.
+            rows (int): Rows returned, or written by an insert.
+            pool_wait (float, optional): Time spent waiting for a connection.
+        """
+
+    def observe_stage(self, stage: str, seconds: float):
+        """
+        Record a stage of the current request, e.g. ``decode`` or ``serialize``.
+
+        Args:
+            stage (str): The stage.
+            seconds (float): Time spent in it.
+        """
+
+    def observe_request(self, method: str, endpoint: str, status: int, seconds: float):
+        """
+        Record a served request.
+
+        Args:
+            method (str): The HTTP method.
+            endpoint (str): The name of the endpoint.
+            status (int): The response status.
+            seconds (float): Time until the response was sent.
+        """
+
+    def observe_write_batch(self, table: str, size: int, delays: Sequence[float]):
+        """
+        Record a batch of records written together by a ``WriteCoalescer``.
+
+        Args:
+            table (str): The table written to.
+            size (int): Records in the batch.
+            delays (Sequence[float]): Time every record waited for the batch to
+                be written, i.e. the latency added by coalescing.
+        """
+
+    def timer(self, stage: str):
+        """
+        Time a block as a stage of the current request.
+
+        Args:
+            stage (str): The stage.
+
+        Returns:
+            A context manager timing its block.
+        """
+        return _NO_TIMER
+
+    def render(self) -> str:
+        """
+        The recorded metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, empty when nothing is recorded.
+        """
+        return ""
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the instrumentation state for ``/system/stats``.
+
+        Returns:
+            Dict[str, Any]: Instrumentation-specific statistics.
+        """
+        return {}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    A Prometheus histogram with labels; not thread-safe by itself.
+
+    Attributes:
+        name (str): The metric name.
+        help (str): Its description.
+        labels (Tuple[str, ...]): Names of its labels.
+        buckets (Tuple[float, ...]): Upper bounds of its buckets, ascending.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Tuple[str, ...],
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [bucket counts..., +Inf bucket count, sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 3)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), series):
+                cumulative += n
+                le = _labels(self.labels, label_values, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Counter:
+    """
+    A Prometheus counter with labels; not thread-safe by itself.
+    """
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, value: float = 1):
+        self._series[label_values] = self._series.get(label_values, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._series.items()):
+            lines.append(
+                f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+            )
+        return lines
+
+
+class _StageTimer:
+    __slots__ = ("_instrumentation", "_stage", "_started")
+
+    def __init__(self, instrumentation: Instrumentation, stage: str):
+        self._instrumentation = instrumentation
+        self._stage = stage
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._instrumentation.observe_stage(
+            self._stage, time.perf_counter() - self._started
+        )
+        return False
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """
+    Records timings into histograms exposed in the Prometheus text format.
+
+    Metrics:
+        - ``db_query_duration_seconds{shape}`` and ``db_query_rows{shape}``: latency
+          and row count of queries by shape (see ``query_shape``); the SQL of
+          every shape is given by ``db_query_shape_info{shape,sql}``.
+        - ``db_pool_wait_seconds{endpoint}``: wait for a pooled connection.
+        - ``endpoint_stage_duration_seconds{endpoint,stage}``: time every endpoint
+          spends waiting for connections (``pool_wait``), in queries
+          (``query``), decoding rows (``decode``) and serializing (``serialize``).
+        - ``http_request_duration_seconds{method,endpoint,status}``: request latency.
+        - ``db_slow_queries_total{shape}``: queries slower than ``slow_query_seconds``.
+        - ``db_write_batch_size{table}`` and ``db_write_coalesce_delay_seconds{table}``:
+          records per coalesced write and the wait they added to every record.
+
+    A share ``slow_query_sample_rate`` of the slow queries is logged and kept,
+    with its SQL template but never its parameters, which hold patient data.
+
+    Attributes:
+        slow_query_seconds (float): Duration from which a query counts as slow.
+        slow_query_sample_rate (float): Share of slow queries sampled, 0 for none.
+    """
+
+    def __init__(
+        self,
+        slow_query_seconds: float = 0.25,
+        slow_query_sample_rate: float = 0.0,
+        max_samples: int = 100,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.slow_query_seconds = slow_query_seconds
+        self.slow_query_sample_rate = slow_query_sample_rate
+        self._clock = clock
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._shapes: Dict[str, str] = {}
+        self._slow_samples: Deque[Dict[str, Any]] = deque(maxlen=max_samples)
+        self.query_seconds = Histogram(
+            "db_query_duration_seconds",
+            "Latency of database queries by query shape.",
+            ("shape",),
+        )
+        self.query_rows = Histogram(
+            "db_query_rows",
+            "Rows returned (or inserted) by database queries by query shape.",
+            ("shape",),
+            ROW_BUCKETS,
+        )
+        self.pool_wait = Histogram(
+            "db_pool_wait_seconds",
+            "Wait for a pooled database connection by endpoint.",
+            ("endpoint",),
+        )
+        self.stage_seconds = Histogram(
+            "endpoint_stage_duration_seconds",
+            "Time spent by endpoints per stage: pool_wait, query, decode, serialize.",
+            ("endpoint", "stage"),
+        )
+        self.request_seconds = Histogram(
+            "http_request_duration_seconds",
+            "Latency of HTTP requests by endpoint.",
+            ("method", "endpoint", "status"),
+        )
+        self.slow_queries = Counter(
+            "db_slow_queries_total",
+            "Queries slower than the slow query threshold by query shape.",
+            ("shape",),
+        )
+        self.write_batch_size = Histogram(
+            "db_write_batch_size",
+            "Records per coalesced write by table.",
+            ("table",),
+            ROW_BUCKETS,
+        )
+        self.write_coalesce_delay = Histogram(
+            "db_write_coalesce_delay_seconds",
+            "Wait of every record for its coalesced write to start, by table.",
+            ("table",),
+        )
+
+    def observe_query(
+        self, query: str, seconds: float, rows: int, pool_wait: float = 0.0
+    ):
+        shape, sql = query_shape(query)
+        endpoint = current_endpoint()
+        slow = seconds >= self.slow_query_seconds
+        with self._lock:
+            self._shapes[shape] = sql
+            self.query_seconds.observe(seconds, shape)
+            self.query_rows.observe(rows, shape)
+            self.pool_wait.observe(pool_wait, endpoint)
+            self.stage_seconds.observe(pool_wait, endpoint, "pool_wait")
+            self.stage_seconds.observe(seconds, endpoint, "query")
+            if slow:
+                self.slow_queries.inc(shape)
+        if slow and self._random.random() < self.slow_query_sample_rate:
+            sample = {
+                "at": self._clock(),
+                "shape": shape,
+                "sql": sql,
+                "seconds": seconds,
+                "rows": rows,
+                "endpoint": endpoint,
+            }
+            with self._lock:
+                self._slow_samples.append(sample)
+            logger.warning(
+                "Slow query %s (%.3fs, %d rows): %s", shape, seconds, rows, sql
+            )
+
+    def observe_stage(self, stage: str, seconds: float):
+        endpoint = current_endpoint()
+        with self._lock:
+            self.stage_seconds.observe(seconds, endpoint, stage)
+
+    def observe_request(self, method: str, endpoint: str, status: int, seconds: float):
+        with self._lock:
+            self.request_seconds.observe(seconds, method, endpoint, str(status))
+
+    def observe_write_batch(self, table: str, size: int, delays: Sequence[float]):
+        with self._lock:
+            self.write_batch_size.observe(size, table)
+            for delay in delays:
+                self.write_coalesce_delay.observe(delay, table)
+
+    def timer(self, stage: str) -> _StageTimer:
+        return _StageTimer(self, stage)
+
+    def slow_query_samples(self) -> List[Dict[str, Any]]:
+        """
+        The sampled slow queries, oldest first.
+
+        Returns:
+            List[Dict[str, Any]]: Time, shape, SQL, duration, rows and endpoint
+            of every sample.
+        """
+        with self._lock:
+            return list(self._slow_samples)
+
+    def render(self) -> str:
+        with self._lock:
+            lines = []
+            for metric in (
+                self.query_seconds,
+                self.query_rows,
+                self.pool_wait,
+                self.stage_seconds,
+                self.request_seconds,
+                self.slow_queries,
+                self.write_batch_size,
+                self.write_coalesce_delay,
+            ):
+                lines += metric.render()
+            lines.append(
+                "# HELP db_query_shape_info SQL of the query shapes, by shape id."
+            )
+            lines.append("# TYPE db_query_shape_info gauge")
+            for shape, sql in sorted(self._shapes.items()):
+                lines.append(
+                    f"db_query_shape_info{_labels(('shape', 'sql'), (shape, sql))} 1"
+                )
+        return "\n".join(lines) + "\n"
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "query_shapes": len(self._shapes),
+                "slow_query_seconds": self.slow_query_seconds,
+                "slow_queries": list(self._slow_samples),
+            }
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request.
+
+    It also makes the request visible to the observations made while serving
+    it, which are labeled with the name of the endpoint function.
+
+    Attributes:
+        app: The wrapped ASGI application.
+        instrumentation (Instrumentation): Where the timings are recorded.
+    """
+
+    def __init__(self, app, instrumentation: Instrumentation):
+        self.app = app
+        self.instrumentation = instrumentation
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _request_scope.set(scope)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.instrumentation.observe_request(
+                scope["method"],
+                current_endpoint(),
+                status,
+                time.perf_counter() - started,
+            )
+            _request_scope.reset(token)
+
+
+def make_instrumentation(
+    enabled: bool = True,
+    slow_query_seconds: float = 0.25,
+    slow_query_sample_rate: float = 0.0,
+) -> Instrumentation:
+    """
+    Create the instrumentation of the process.
+
+    Args:
+        enabled (bool, optional): Record metrics; otherwise they are discarded.
+        slow_query_seconds (float, optional): Duration from which a query is slow.
+        slow_query_sample_rate (float, optional): Share of slow queries sampled.
+
+    Returns:
+        Instrumentation: A ``PrometheusInstrumentation``, or the no-op base class.
+    """
+    if not enabled:
+        return Instrumentation()
+    return PrometheusInstrumentation(slow_query_seconds, slow_query_sample_rate)
+
+
+instrumentation = make_instrumentation(
+    settings.metrics_enabled,
+    settings.slow_query_seconds,
+    settings.slow_query_sample_rate,
+)
@@ -0,0 +1,155 @@
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+from datamodel.models import Interaction
+from utils.async_data_utils import AsyncDataUtils
+
+
+class RecordResult(BaseModel):
+    """
+    Outcome of one record of a batch.
+
+    Attributes:
+        index (int): Position of the record in the request body.
+        id (Optional[int]): The interaction id, when the record has one.
+        status (str): ``created``, ``rejected`` (invalid record or unknown
+            patient) or ``failed`` (the database refused the insert).
+        detail (Optional[str]): Why the record was not created.
+    """
+
+    index: int
+    id: Optional[int] = None
+    status: str
+    detail: Optional[str] = None
+
+
+class BatchResult(BaseModel):
+    """
+    Outcome of a batch of interactions.
+
+    Attributes:
+        created (int): Records inserted.
+        rejected (int): Records that were invalid or reference an unknown patient.
+        failed (int): Records the database refused.
+        results (List[RecordResult]): One result per record, in body order.
+    """
+
+    created: int = 0
+    rejected: int = 0
+    failed: int = 0
+    results: List[RecordResult] = []
+
+    def add(self, result: RecordResult):
+        """
+        Record the result of a record and count it under its status.
+
+        Args:
+            result (RecordResult): The result of the record.
+        """
+        setattr(self, result.status, getattr(self, result.status) + 1)
+        self.results.append(result)
+
+
+async def _insert_chunk(
+    data_utils: AsyncDataUtils,
+    chunk: List[Tuple[int, Interaction]],
+    batch: BatchResult,
+):
+    """
+    Insert the valid records of a chunk whose patients exist, in one transaction.
+
+    If the transaction fails (e.g. a duplicate id), the records are retried one
+    by one so that every record gets its own result.
+    """
+    existing = await data_utils.existing_insurance_nos(
+        [interaction.insurance_no for _, interaction in chunk]
+    )
+    insertable = []
+    for index, interaction in chunk:
+        if interaction.insurance_no in existing:
+            insertable.append((index, interaction))
+        else:
+            batch.add(
+                RecordResult(
+                    index=index,
+                    id=interaction.id,
+                    status="rejected",
+                    detail="Patient record does not exist",
+                )
+            )
+    if not insertable:
+        return
+    try:
+        await data_utils.insert_interactions(
+            [interaction for _, interaction in insertable],
+            batch_size=len(insertable),
+            atomic=True,
+        )
+    except Exception:
+        for index, interaction in insertable:
+            try:
+                await data_utils.insert_interactions([interaction])
+            except Exception as e:
+                batch.add(
+                    RecordResult(
+                        index=index, id=interaction.id, status="failed", detail=str(e)
+                    )
+                )
+            else:
+                batch.add(
+                    RecordResult(index=index, id=interaction.id, status="created")
+                )
+        return
+    for index, interaction in insertable:
+        batch.add(RecordResult(index=index, id=interaction.id, status="created"))
+
+
+async def insert_interaction_stream(
+    data_utils: AsyncDataUtils,
+    records: AsyncIterator[Tuple[Optional[Any], Optional[str]]],
+    chunk_size: int = 500,
+) -> BatchResult:
+    """
+    Validate and insert a stream of interaction records chunk by chunk.
+
+    For every chunk, the referenced patients are checked with one set-based
+    query and the records are inserted in a single transaction, so the cost of
+    a round trip and a commit is shared by the whole chunk.
+
+    Args:
+        data_utils (AsyncDataUtils): Data utilities bound to the pool.
+        records (AsyncIterator[Tuple[Optional[Any], Optional[str]]]): Parsed
+            records or parse errors, as yielded by ``iter_json_records``.
+        chunk_size (int, optional): Records per transaction.
+
+    Returns:
+        BatchResult: Counts and per-record results, in body order.
+    """
+    batch = BatchResult()
+    chunk: List[Tuple[int, Interaction]] = []
+    index = 0
+    async for record, error in records:
+        if error is None:
+            try:
+                chunk.append((index, Interaction.model_validate(record)))
+            except ValidationError as e:
+                error = str(e)
+        if error is not None:
+            record_id = record.get("id") if isinstance(record, dict) else None
+            batch.add(
+                RecordResult(
+                    index=index,
+                    id=record_id if isinstance(record_id, int) else None,
+                    status="rejected",
+                    detail=error,
+                )
+            )
+        index += 1
+        if len(chunk) >= chunk_size:
+            await _insert_chunk(data_utils, chunk, batch)
+            chunk = []
+    if chunk:
+        await _insert_chunk(data_utils, chunk, batch)
+    batch.results.sort(key=lambda result: result.index)
+    return batch
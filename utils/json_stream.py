@@ -0,0 +1,146 @@
+import codecs
+import json
+from typing import Any, AsyncIterator, Optional, Tuple
+
+_WHITESPACE = " \t\r\n"
+
+# characters ending a token: a parse error followed by one of them is final
+_TOKEN_ENDS = ",:]}" + _WHITESPACE
+
+
+def _incomplete(error: json.JSONDecodeError, buffer: str) -> bool:
+    # the error lies in the last, possibly cut, token of the data received so
+    # far (e.g. "tr" of "true", "1." of "1.5"), so more data may fix it
+    if error.msg.startswith("Unterminated string"):
+        return True
+    return not any(char in _TOKEN_ENDS for char in buffer[error.pos :])
+
+
+class _ElementSkipper:
+    """
+    Skips a malformed element of a JSON array up to the ``,`` or ``]`` ending
+    it, keeping track of nesting and strings across chunks.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def skip(self, buffer: str, pos: int) -> Tuple[int, bool]:
+        """
+        Advance over the element.
+
+        Args:
+            buffer (str): The data received so far.
+            pos (int): Where to resume.
+
+        Returns:
+            Tuple[int, bool]: The position reached, and whether it is the end of
+            the element (then the ``,`` or ``]`` is left in place).
+        """
+        while pos < len(buffer):
+            char = buffer[pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "[{":
+                self.depth += 1
+            elif char in "]}" and self.depth:
+                self.depth -= 1
+            elif char in ",]" and not self.depth:
+                return pos, True
+            pos += 1
+        return pos, False
+
+
+async def iter_json_records(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[Optional[Any], Optional[str]]]:
+    """
+    Incrementally parse a streamed request body of JSON records.
+
+    The body is either NDJSON (one JSON document per line) or a single JSON
+    array; it is recognized by its first non-blank character. Records are
+    yielded as soon as they are complete, so the body is never held in memory
+    as a whole.
+
+    A malformed NDJSON line is reported and parsing continues with the next
+    line. Likewise, a malformed array element is reported as soon as the
+    error cannot be due to data still to come, and parsing continues after
+    the ``,`` ending it. An array left unclosed is reported at the end.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The body, e.g. ``request.stream()``.
+
+    Yields:
+        Tuple[Optional[Any], Optional[str]]: The parsed record and None, or None
+        and the parse error.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    is_array = None
+    array_closed = False
+    skipper = None
+
+    async for chunk in chunks:
+        buffer += utf8.decode(chunk)
+        if is_array is None:
+            stripped = buffer.lstrip(_WHITESPACE)
+            if not stripped:
+                continue
+            is_array = stripped[0] == "["
+            buffer = stripped[1:] if is_array else stripped
+        if is_array:
+            pos = 0
+            while not array_closed:
+                if skipper is not None:
+                    pos, skipped = skipper.skip(buffer, pos)
+                    if not skipped:
+                        break
+                    skipper = None
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE + ",":
+                    pos += 1
+                if pos == len(buffer):
+                    break
+                if buffer[pos] == "]":
+                    array_closed = True
+                    pos += 1
+                    break
+                try:
+                    record, pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as e:
+                    if _incomplete(e, buffer):
+                        # wait for more data
+                        break
+                    yield None, f"Malformed JSON: {e}"
+                    skipper = _ElementSkipper()
+                    continue
+                yield record, None
+            buffer = buffer[pos:]
+        else:
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                if line.strip():
+                    yield _parse_line(line)
+
+    buffer += utf8.decode(b"", final=True)
+    if is_array:
+        if not array_closed or buffer.strip(_WHITESPACE):
+            yield None, "Malformed JSON array"
+    elif buffer.strip():
+        yield _parse_line(buffer)
+
+
+def _parse_line(line: str) -> Tuple[Optional[Any], Optional[str]]:
+    try:
+        return json.loads(line), None
+    except json.JSONDecodeError as e:
+        return None, f"Malformed JSON: {e}"
@@ -1,69 +1,104 @@
-import pandas as pd
-import numpy as np
-import json
+import argparse
+import logging
+import os
 import sys
 
 sys.path.append("..")
-from utils.injectors import sql_instance
-from utils.table_schemas import PatientSchema, InteractionSchema
-from datamodel.models import Interaction, Patient
+from utils.injectors import backend, sql_instance
+from utils.table_schemas import (
+    PatientSchema,
+    InteractionSchema,
+    InteractionLabelSchema,
+    InteractionCountSchema,
+    PatientHealthSchema,
+)
 from utils.data_utils import DataUtils
+from utils.ingest import Checkpoint, ingest_csv
+from utils.bulk_loader import METHODS, BulkLoader
 
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
 
-def read_data():
-    """
-    Reads and processes the Interaction and Patient data from CSV files.
-
-    The function performs the following steps:
-    1. Reads the Interaction data from 'Interaction.csv' and processes it:
-       - Replaces NaN values with None.
-       - Parses JSON fields 'next_steps' and 'metrics'.
-       - Converts the data into a list of Interaction objects.
-    2. Reads the Patient data from 'Patient.csv' and processes it:
-       - Replaces NaN values with None.
-       - Converts the data into a list of Patient objects.
 
-    Returns:
-        tuple: A tuple containing two lists:
-            - interaction_objs (list of Interaction): List of Interaction objects.
-            - patient_objs (list of Patient): List of Patient objects.
-    """
-    # Interaction
-    print("Parsing Interaction data..")
-    interaction_df = pd.read_csv("../data/Interaction.csv")
-    interaction_df = interaction_df.replace(np.nan, None)
-    interaction_df["next_steps"] = interaction_df["next_steps"].apply(
-        lambda a: json.loads(a) if a else None
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Load the Patient and Interaction CSV exports into the database"
     )
-    interaction_df["metrics"] = interaction_df["metrics"].apply(
-        lambda a: json.loads(a) if a else None
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument(
+        "--chunk-size", type=int, default=10000, help="rows per transaction"
     )
-    interaction_df["qa"] = interaction_df["qa"].apply(
-        lambda a: json.loads(a) if a else None
+    parser.add_argument(
+        "--workers", type=int, default=None, help="parser processes, 0 for none"
     )
-    interaction_objs = interaction_df.to_dict(orient="records")
-    interaction_objs = [Interaction(**obj) for obj in interaction_objs]
-    # Patients
-    print("Parsing Patients data..")
-    patients_df = pd.read_csv("../data/Patient.csv")
-    patients_df = patients_df.replace(np.nan, None)
-    patient_objs = patients_df.to_dict(orient="records")
-    patient_objs = [Patient(**obj) for obj in patient_objs]
-
-    return interaction_objs, patient_objs
+    parser.add_argument(
+        "--method",
+        choices=METHODS,
+        default="values",
+        help="multi-row INSERT statements or LOAD DATA LOCAL INFILE",
+    )
+    parser.add_argument("--rows-per-statement", type=int, default=500)
+    parser.add_argument(
+        "--rebuild-indexes",
+        action="store_true",
+        help="drop the secondary indexes during the load and rebuild them after",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default="load_initial_data.checkpoint.json",
+        help="progress file used to resume an interrupted load",
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="ignore the checkpoint and load again"
+    )
+    return parser.parse_args()
 
 
 def main():
-    interaction_objs, patient_objs = read_data()
+    """
+    Create the tables and stream the CSV exports into them.
+
+    Rows are read and inserted chunk by chunk (see ``utils.ingest``), each chunk
+    in its own bulk-load transaction (see ``utils.bulk_loader``), so memory
+    stays bounded and an interrupted load resumes from the checkpoint.
+    """
+    args = parse_args()
     connection = sql_instance()
     if not connection:
         return
-    data_utils = DataUtils(connection)
+    data_utils = DataUtils(connection, placeholder=backend.placeholder)
+    checkpoint = Checkpoint(args.checkpoint)
+    if args.restart:
+        checkpoint.reset()
     data_utils.create_table(schema=PatientSchema)
-    data_utils.insert_patients(patients=patient_objs)
     data_utils.create_table(schema=InteractionSchema)
-    data_utils.insert_interactions(interactions=interaction_objs)
+    data_utils.create_missing_indexes(schema=InteractionSchema)
+    data_utils.create_table(schema=InteractionLabelSchema)
+    data_utils.create_table(schema=InteractionCountSchema)
+    data_utils.create_table(schema=PatientHealthSchema)
+    loads = [("Patient.csv", PatientSchema), ("Interaction.csv", InteractionSchema)]
+    for file_name, schema in loads:
+        print(f"Loading {file_name}..")
+        loader = BulkLoader(
+            data_utils,
+            schema=schema,
+            method=args.method,
+            rows_per_statement=args.rows_per_statement,
+            rebuild_indexes=args.rebuild_indexes,
+            skip_existing=True,
+        )
+        with loader:
+            report = ingest_csv(
+                path=os.path.join(args.data_dir, file_name),
+                table=schema.name,
+                insert=loader.insert,
+                chunk_size=args.chunk_size,
+                workers=args.workers,
+                checkpoint=checkpoint,
+            )
+        print(report)
+        print(loader.report())
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     main()
@@ -0,0 +1,98 @@
+import argparse
+import logging
+import sys
+
+sys.path.append("..")
+from utils.injectors import backend, sql_instance
+from utils.table_schemas import (
+    PatientSchema,
+    InteractionSchema,
+    InteractionLabelSchema,
+    InteractionCountSchema,
+    PatientHealthSchema,
+)
+from utils.data_utils import DataUtils
+
+
+def create_indexes(data_utils: DataUtils):
+    """
+    Create the secondary indexes declared in the table schemas that are missing
+    from the existing tables.
+
+    Args:
+        data_utils (DataUtils): Data utilities bound to the database.
+    """
+    for schema in [PatientSchema, InteractionSchema, InteractionLabelSchema]:
+        created = data_utils.create_missing_indexes(schema=schema)
+        print(f"{schema.name}: created indexes {created or 'none'}")
+
+
+def rebuild_labels(data_utils: DataUtils):
+    """
+    Create the label index table if it is missing and rebuild it from the
+    labels of the existing interactions, in one transaction so that it can run
+    against a live API.
+
+    Args:
+        data_utils (DataUtils): Data utilities bound to the database.
+    """
+    data_utils.create_table(schema=InteractionLabelSchema)
+    written = data_utils.rebuild_labels()
+    print(f"{InteractionLabelSchema.name}: wrote {written} labels")
+
+
+def rebuild_summaries(data_utils: DataUtils):
+    """
+    Create the summary tables if they are missing and recompute them from the
+    existing interactions.
+
+    Args:
+        data_utils (DataUtils): Data utilities bound to the database.
+    """
+    data_utils.create_table(schema=InteractionCountSchema)
+    data_utils.create_table(schema=PatientHealthSchema)
+    counts, patients = data_utils.rebuild_summaries()
+    print(
+        f"{InteractionCountSchema.name}: wrote {counts} counts, "
+        f"{PatientHealthSchema.name}: wrote {patients} patients"
+    )
+
+
+def upgrade_json(data_utils: DataUtils):
+    """
+    Convert the JSON columns of the interactions to native JSON and add the
+    generated columns on their frequently queried keys, with their indexes.
+
+    Args:
+        data_utils (DataUtils): Data utilities bound to the database.
+    """
+    added = data_utils.upgrade_json_columns(schema=InteractionSchema)
+    created = data_utils.create_missing_indexes(schema=InteractionSchema)
+    print(
+        f"{InteractionSchema.name}: added columns {added or 'none'}, "
+        f"created indexes {created or 'none'}"
+    )
+
+
+COMMANDS = {
+    "indexes": create_indexes,
+    "json": upgrade_json,
+    "labels": rebuild_labels,
+    "summaries": rebuild_summaries,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database maintenance tasks")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    connection = sql_instance()
+    if not connection:
+        return
+    COMMANDS[args.command](DataUtils(connection, placeholder=backend.placeholder))
+    connection.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
@@ -0,0 +1,59 @@
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Optional, Tuple
+
+from datamodel.models import Interaction
+
+
+class InvalidCursorError(ValueError):
+    """
+    Raised when a pagination cursor cannot be decoded.
+    """
+
+
+def encode_interaction_cursor(interaction: Interaction) -> str:
+    """
+    Encode the sort key ``(interaction_date, id)`` of an interaction as an opaque cursor.
+
+    Args:
+        interaction (Interaction): The last interaction of a page.
+
+    Returns:
+        str: A URL-safe cursor pointing right after the interaction.
+    """
+    interaction_date = (
+        interaction.interaction_date.isoformat()
+        if interaction.interaction_date
+        else None
+    )
+    payload = json.dumps([interaction_date, interaction.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_interaction_cursor(cursor: str) -> Tuple[Optional[date], int]:
+    """
+    Decode a cursor produced by ``encode_interaction_cursor``.
+
+    Args:
+        cursor (str): The opaque cursor.
+
+    Returns:
+        Tuple[Optional[date], int]: The interaction date and id to seek after.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        interaction_date, interaction_id = json.loads(
+            base64.urlsafe_b64decode(padded.encode())
+        )
+        if interaction_date is not None:
+            interaction_date = date.fromisoformat(interaction_date)
+        if not isinstance(interaction_id, int):
+            raise ValueError("id must be an integer")
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+    return interaction_date, interaction_id
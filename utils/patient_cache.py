@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from datamodel.models import Patient
+
+
+class PatientCache:
+    """
+    In-process LRU cache of patient lookups keyed by insurance number.
+
+    Entries expire after ``ttl`` seconds. Lookups that found no patient are
+    cached as well (negative caching) for ``negative_ttl`` seconds, so repeated
+    requests for an unknown insurance number don't reach the database either.
+
+    Every invalidation bumps a generation counter: a reader captures it with
+    ``generation()`` before querying and passes it to ``put``, which drops the
+    result if a write happened in between, so stale rows are never cached.
+
+    Attributes:
+        max_size (int): Maximum number of cached insurance numbers.
+        ttl (float): Seconds a found patient stays cached.
+        negative_ttl (float): Seconds a miss stays cached.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generation = 0
+
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get(self, insurance_no: str) -> Optional[List[Patient]]:
+        """
+        Look up a cached patient.
+
+        Args:
+            insurance_no (str): The insurance number of the patient.
+
+        Returns:
+            Optional[List[Patient]]: The cached result, an empty list for a cached
+            miss, or None if the insurance number is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(insurance_no)
+            if entry is None:
+                self._misses += 1
+                return None
+            patients, expires_at = entry
+            if self._clock() >= expires_at:
+                del self._entries[insurance_no]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(insurance_no)
+            if patients:
+                self._hits += 1
+            else:
+                self._negative_hits += 1
+            return patients
+
+    def generation(self) -> int:
+        """
+        Current invalidation generation, to be passed to ``put``.
+
+        Returns:
+            int: The generation counter.
+        """
+        return self._generation
+
+    def put(
+        self,
+        insurance_no: str,
+        patients: List[Patient],
+        generation: Optional[int] = None,
+    ):
+        """
+        Cache the result of a patient lookup.
+
+        Args:
+            insurance_no (str): The insurance number of the patient.
+            patients (List[Patient]): The lookup result, empty if no patient was found.
+            generation (int, optional): Value of ``generation()`` taken before the
+                lookup; the result is dropped if an invalidation happened since.
+        """
+        if self.max_size <= 0:
+            return
+        ttl = self.ttl if patients else self.negative_ttl
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[insurance_no] = (patients, self._clock() + ttl)
+            self._entries.move_to_end(insurance_no)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, insurance_no: str):
+        """
+        Drop a cached patient after it has been written.
+
+        Args:
+            insurance_no (str): The insurance number of the patient.
+        """
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            self._entries.pop(insurance_no, None)
+
+    def clear(self):
+        """
+        Drop all cached patients.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the cache usage.
+
+        Returns:
+            Dict[str, Any]: Hit/miss counters and the current size of the cache.
+        """
+        with self._lock:
+            lookups = self._hits + self._negative_hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "negative_hits": self._negative_hits,
+                "misses": self._misses,
+                "hit_ratio": (self._hits + self._negative_hits) / lookups
+                if lookups
+                else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
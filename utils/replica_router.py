@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# query reporting the replication delay of a replica, per SQL dialect; dialects
+# without one (SQLite files copied by an external tool) report no lag
+REPLICA_LAG_QUERIES = {"mysql": "SHOW REPLICA STATUS"}
+
+# names of the delay column of ``SHOW REPLICA STATUS``, before and after MySQL 8.0.22
+LAG_COLUMNS = ("Seconds_Behind_Source", "Seconds_Behind_Master")
+
+
+def replica_lag(
+    rows: List[Tuple], columns: Optional[Tuple[str, ...]]
+) -> Optional[float]:
+    """
+    The replication delay reported by a replica.
+
+    Args:
+        rows (List[Tuple]): The rows of ``SHOW REPLICA STATUS``.
+        columns (Optional[Tuple[str, ...]]): The names of their columns.
+
+    Returns:
+        Optional[float]: Seconds the replica is behind its source, or None when
+        it does not replicate or replication is stopped.
+    """
+    if not rows or not columns:
+        return None
+    for name in LAG_COLUMNS:
+        if name in columns:
+            lag = rows[0][columns.index(name)]
+            return None if lag is None else float(lag)
+    return None
+
+
+class ReplicaRouter:
+    """
+    Chooses the connection source of every read: a read replica or the primary.
+
+    Reads are spread round-robin over the replicas whose last measured lag is
+    at most ``max_lag`` seconds, and go to the primary when none is. After a
+    write, the reads of the insurance numbers it touched go to the primary for
+    ``sticky_seconds`` (read-your-writes); it should exceed ``max_lag``.
+    Stickiness is kept per process, for at most ``max_sticky_keys`` numbers.
+
+    The router does not query the replicas itself: the data utilities ask
+    ``lag_check_due`` before routing a read and report the measured lags,
+    at most once every ``lag_check_interval`` seconds.
+
+    Attributes:
+        replicas (List[Any]): Connections or pools of the replicas.
+        max_lag (float): Replication delay from which a replica is skipped.
+        sticky_seconds (float): Seconds the reads of a written insurance number
+            go to the primary.
+        lag_check_interval (float): Seconds between two lag measurements.
+        max_sticky_keys (int): Most insurance numbers remembered as written.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[Any],
+        max_lag: float = 5.0,
+        sticky_seconds: float = 10.0,
+        lag_check_interval: float = 1.0,
+        max_sticky_keys: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.sticky_seconds = sticky_seconds
+        self.lag_check_interval = lag_check_interval
+        self.max_sticky_keys = max_sticky_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        # unknown until measured, i.e. the first read checks the lags
+        self._lags: List[Optional[float]] = [None] * len(self.replicas)
+        self._next_check = float("-inf")
+        self._sticky: "OrderedDict[str, float]" = OrderedDict()
+        self._turn = 0
+
+        self._replica_reads = 0
+        self._sticky_reads = 0
+        self._lagging_reads = 0
+
+    def mark_written(self, insurance_nos: Iterable[str]):
+        """
+        Route the reads of written insurance numbers to the primary for a while.
+
+        Args:
+            insurance_nos (Iterable[str]): The insurance numbers touched by a write.
+        """
+        with self._lock:
+            expires_at = self._clock() + self.sticky_seconds
+            for insurance_no in insurance_nos:
+                self._sticky.pop(insurance_no, None)
+                self._sticky[insurance_no] = expires_at
+            # entries are in expiry order: drop the expired and the oldest ones
+            now = self._clock()
+            while self._sticky and (
+                len(self._sticky) > self.max_sticky_keys
+                or next(iter(self._sticky.values())) <= now
+            ):
+                self._sticky.popitem(last=False)
+
+    def is_sticky(self, insurance_nos: Iterable[str]) -> bool:
+        """
+        Tell whether one of the insurance numbers was written recently.
+
+        Args:
+            insurance_nos (Iterable[str]): The insurance numbers of a read.
+
+        Returns:
+            bool: Whether the read must go to the primary.
+        """
+        with self._lock:
+            return self._is_sticky(insurance_nos)
+
+    def _is_sticky(self, insurance_nos: Iterable[str]) -> bool:
+        now = self._clock()
+        return any(self._sticky.get(no, now) > now for no in insurance_nos)
+
+    def replica_for(self, insurance_nos: Iterable[str] = ()) -> Optional[Any]:
+        """
+        Choose the source of a read.
+
+        Args:
+            insurance_nos (Iterable[str], optional): The insurance numbers the
+                read is about, empty for reads across patients.
+
+        Returns:
+            Optional[Any]: A replica, or None to read from the primary.
+        """
+        with self._lock:
+            if self._is_sticky(insurance_nos):
+                self._sticky_reads += 1
+                return None
+            fresh = [
+                i
+                for i, lag in enumerate(self._lags)
+                if lag is not None and lag <= self.max_lag
+            ]
+            if not fresh:
+                self._lagging_reads += 1
+                return None
+            self._turn += 1
+            self._replica_reads += 1
+            return self.replicas[fresh[self._turn % len(fresh)]]
+
+    def lag_check_due(self) -> bool:
+        """
+        Tell whether the lags should be measured, claiming the measurement.
+
+        Returns:
+            bool: True at most once every ``lag_check_interval`` seconds.
+        """
+        with self._lock:
+            now = self._clock()
+            if now < self._next_check:
+                return False
+            self._next_check = now + self.lag_check_interval
+            return True
+
+    def report_lag(self, replica: int, lag: Optional[float]):
+        """
+        Record the measured lag of a replica.
+
+        Args:
+            replica (int): The index of the replica in ``replicas``.
+            lag (Optional[float]): Seconds it is behind the primary, None when
+                unknown, which keeps reads off the replica.
+        """
+        with self._lock:
+            self._lags[replica] = lag
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the routing.
+
+        Returns:
+            Dict[str, Any]: The lag of every replica, the number of sticky
+            insurance numbers and the reads sent to a replica, or to the
+            primary because of a recent write or of lagging replicas.
+        """
+        with self._lock:
+            return {
+                "replicas": len(self.replicas),
+                "lags": list(self._lags),
+                "sticky_keys": len(self._sticky),
+                "replica_reads": self._replica_reads,
+                "sticky_reads": self._sticky_reads,
+                "lagging_reads": self._lagging_reads,
+            }
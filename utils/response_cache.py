@@ -0,0 +1,258 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set
+
+from pydantic import BaseModel
+
+# rough per-entry bookkeeping cost on top of the key, body and headers
+_ENTRY_OVERHEAD = 200
+
+
+def make_etag(body: bytes) -> str:
+    """
+    Strong entity tag of a response body.
+
+    Args:
+        body (bytes): The serialized response.
+
+    Returns:
+        str: The quoted tag, a hash of the body.
+    """
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an ``If-None-Match`` request header against the current tag.
+
+    Args:
+        if_none_match (Optional[str]): The header, a list of tags or ``*``.
+        etag (str): The tag of the current representation.
+
+    Returns:
+        bool: Whether the client's copy is current, i.e. a 304 can be sent.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+class CachedResponse(BaseModel):
+    """
+    A serialized response with its entity tag.
+
+    Attributes:
+        body (bytes): The JSON body.
+        etag (str): Strong entity tag of the body.
+        headers (Dict[str, str]): Extra response headers, e.g. ``X-Next-Cursor``.
+    """
+
+    body: bytes
+    etag: str
+    headers: Dict[str, str] = {}
+
+
+class ResponseCache:
+    """
+    In-process LRU cache of serialized GET responses about a patient.
+
+    Responses are keyed by path and query string and belong to the patient they
+    describe. Writes touching a patient drop all of its responses. Memory use is
+    bounded by the total size of the cached bodies, keys and headers: the least
+    recently used responses are evicted to stay below ``max_bytes``. Entries
+    also expire after ``ttl`` seconds, which bounds the staleness caused by
+    writes made through other processes.
+
+    As in ``PatientCache``, every invalidation bumps a generation counter and
+    ``put`` drops a response rendered from a read that raced with a write.
+
+    Attributes:
+        max_bytes (int): Upper bound of the cached size, 0 disables caching.
+        ttl (float): Seconds a response stays cached.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (insurance number, response, size, expiry)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._keys_by_patient: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        self._generation = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def _drop(self, key: str):
+        insurance_no, _, size, _ = self._entries.pop(key)
+        keys = self._keys_by_patient[insurance_no]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_patient[insurance_no]
+        self._bytes -= size
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        Look up a cached response.
+
+        Args:
+            key (str): Path and query string of the request.
+
+        Returns:
+            Optional[CachedResponse]: The response, or None if it is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if self._clock() >= entry[3]:
+                self._drop(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def generation(self) -> int:
+        """
+        Current invalidation generation, to be passed to ``put``.
+
+        Returns:
+            int: The generation counter.
+        """
+        return self._generation
+
+    def put(
+        self,
+        key: str,
+        insurance_no: str,
+        body: bytes,
+        headers: Optional[Dict[str, str]] = None,
+        generation: Optional[int] = None,
+    ) -> CachedResponse:
+        """
+        Tag a rendered response and cache it.
+
+        Args:
+            key (str): Path and query string of the request.
+            insurance_no (str): The patient the response describes.
+            body (bytes): The serialized response.
+            headers (Optional[Dict[str, str]], optional): Extra response headers.
+            generation (int, optional): Value of ``generation()`` taken before the
+                response was read; it is not cached if an invalidation happened since.
+
+        Returns:
+            CachedResponse: The response with its entity tag, whether cached or not.
+        """
+        response = CachedResponse(
+            body=body, etag=make_etag(body), headers=dict(headers or {})
+        )
+        size = (
+            _ENTRY_OVERHEAD
+            + len(key)
+            + len(body)
+            + sum(len(name) + len(value) for name, value in response.headers.items())
+        )
+        if size > self.max_bytes:
+            return response
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return response
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (
+                insurance_no,
+                response,
+                size,
+                self._clock() + self.ttl,
+            )
+            self._keys_by_patient.setdefault(insurance_no, set()).add(key)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._evictions += 1
+        return response
+
+    def not_modified(
+        self, response: CachedResponse, if_none_match: Optional[str]
+    ) -> bool:
+        """
+        Check whether a client already holds a response, counting the 304s.
+
+        Args:
+            response (CachedResponse): The current response.
+            if_none_match (Optional[str]): The ``If-None-Match`` request header.
+
+        Returns:
+            bool: Whether the client's copy is current.
+        """
+        if not etag_matches(if_none_match, response.etag):
+            return False
+        with self._lock:
+            self._not_modified += 1
+        return True
+
+    def invalidate(self, insurance_no: str):
+        """
+        Drop the cached responses of a patient after a write touched it.
+
+        Args:
+            insurance_no (str): The insurance number of the patient.
+        """
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            for key in list(self._keys_by_patient.get(insurance_no, ())):
+                self._drop(key)
+
+    def clear(self):
+        """
+        Drop all cached responses.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_patient.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the cache usage.
+
+        Returns:
+            Dict[str, Any]: Size in entries and bytes, hit/miss, 304 and eviction
+            counters.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "not_modified": self._not_modified,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
@@ -0,0 +1,461 @@
+import json
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+from pydantic import BaseModel, TypeAdapter, create_model
+
+from utils.sql_query_builder import SQLTypes
+from utils.table_schemas import TableSchema
+
+
+def _decode_json(value: Any) -> Any:
+    if value is None or value == "" or value == b"":
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode()
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def _encode_json(value: Any) -> Any:
+    # strings are taken to be encoded already, e.g. read straight from a CSV;
+    # an empty one is no JSON document and is stored as NULL
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, BaseModel):
+        return value.model_dump_json()
+    # compact, like model_dump_json
+    return json.dumps(value, separators=(",", ":"))
+
+
+class JSONCodec:
+    """
+    Storage format of the JSON columns: JSON text.
+
+    Attributes:
+        name (str): The name of the format, as set in ``JSON_STORAGE``.
+        binary (bool): Whether the stored values are bytes, which the database
+            cannot query with its JSON functions.
+    """
+
+    name = "text"
+    binary = False
+
+    def encode(self, value: Any) -> Any:
+        """
+        Encode a document for storage.
+
+        Args:
+            value (Any): A model, a dict or list, or a string already encoded as
+                JSON text.
+
+        Returns:
+            Any: The stored value, None for a missing document.
+        """
+        return _encode_json(value)
+
+    def decode(self, value: Any) -> Any:
+        """
+        Decode a stored document.
+
+        Args:
+            value (Any): The value read from the database.
+
+        Returns:
+            Any: The document, None for NULL.
+        """
+        return _decode_json(value)
+
+
+class MsgpackCodec(JSONCodec):
+    """
+    Storage format of the JSON columns: MessagePack, for the embedded backends.
+
+    MessagePack documents are smaller than JSON text and faster to decode, but
+    opaque to the database: no generated columns can be computed from them.
+    Values stored as JSON text before the switch are still decoded.
+
+    Raises:
+        RuntimeError: If the ``msgpack`` package is not installed.
+    """
+
+    name = "msgpack"
+    binary = True
+
+    def __init__(self):
+        try:
+            import msgpack
+        except ImportError as e:
+            raise RuntimeError(
+                "JSON_STORAGE=msgpack requires the msgpack package"
+            ) from e
+        self._packb = msgpack.packb
+        self._unpackb = msgpack.unpackb
+
+    def encode(self, value: Any) -> Any:
+        if value is None or value == "":
+            return None
+        # bytes are encoded already, e.g. rows encoded by the ingest workers
+        # and handed to the bulk loader; encoding must be idempotent
+        if isinstance(value, (bytes, bytearray)):
+            return value
+        if isinstance(value, str):
+            value = json.loads(value)
+        elif isinstance(value, BaseModel):
+            value = value.model_dump(mode="json")
+        return self._packb(value)
+
+    def decode(self, value: Any) -> Any:
+        if isinstance(value, (bytes, bytearray)) and value:
+            return self._unpackb(value)
+        return _decode_json(value)
+
+
+JSON_CODECS = {codec.name: codec for codec in (JSONCodec, MsgpackCodec)}
+
+
+def make_json_codec(name: str = "text") -> JSONCodec:
+    """
+    Create the codec of a JSON storage format.
+
+    Args:
+        name (str, optional): ``text`` or ``msgpack``.
+
+    Returns:
+        JSONCodec: The codec.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if name not in JSON_CODECS:
+        raise ValueError(
+            f"Unknown JSON_STORAGE {name}, expected one of {sorted(JSON_CODECS)}"
+        )
+    return JSON_CODECS[name]()
+
+
+TEXT_JSON = JSONCodec()
+
+
+def _decode_date(value: Any) -> Any:
+    # MySQL returns date objects; SQLite returns ISO strings
+    if isinstance(value, str):
+        return date.fromisoformat(value) if value else None
+    return value
+
+
+class InvalidFieldsError(ValueError):
+    """
+    Raised when a projection names fields the model does not have.
+    """
+
+
+class RowDecoder:
+    """
+    Decoder of database rows into models, compiled once from a table schema.
+
+    Columns are mapped by name, as reported by ``cursor.description``, so the
+    decoder works for ``SELECT *`` as well as for projections. Only the columns
+    the schema marks as ``json_encoded`` are parsed as JSON, and DATE columns
+    returned as text are parsed as dates. The per-column converters are
+    compiled once per distinct column list.
+
+    JSON columns are decoded by ``json_codec``, JSON text unless the table
+    stores them in a binary format.
+
+    Every row is validated once, by handing the prepared dicts to
+    ``model_validate``. Skipping validation does not pay off here:
+    ``model_construct`` runs in Python, field by field, and nested models
+    (``NextSteps``) would have to be built by hand, which makes decoding a page
+    of interactions about a quarter slower than with ``model_validate`` in
+    pydantic-core (see ``benchmarks/bench_row_decoder.py``).
+    Projections lacking required fields are decoded into partial models, whose
+    unselected fields are unset (see ``projection``).
+
+    ``decode_json`` and ``dump_json`` serialize with the pydantic-core
+    serializer of ``List[model]``, so responses can be built without FastAPI
+    validating the models a second time against the response model.
+
+    Attributes:
+        schema (TableSchema): Schema of the table the rows come from.
+        model (Type[BaseModel]): Model the rows are decoded into.
+        keys (Tuple[str, ...]): Columns every projection includes.
+    """
+
+    def __init__(
+        self,
+        schema: TableSchema,
+        model: Type[BaseModel],
+        keys: Sequence[str] = (),
+        json_codec: JSONCodec = TEXT_JSON,
+    ):
+        self.schema = schema
+        self.model = model
+        self.keys = tuple(keys)
+        self._columns = tuple(col.name for col in schema.columns)
+        self._required = frozenset(
+            name for name, field in model.model_fields.items() if field.is_required()
+        )
+        # validates any subset of the fields
+        self._partial_model = create_model(
+            f"Partial{model.__name__}",
+            **{
+                name: (Optional[field.annotation], None)
+                for name, field in model.model_fields.items()
+            },
+        )
+        self._converters: Dict[str, Optional[Callable[[Any], Any]]] = {}
+        for col in schema.columns:
+            if col.name not in model.model_fields:
+                continue
+            if col.json_encoded:
+                self._converters[col.name] = json_codec.decode
+            elif col.dtype == SQLTypes.DATE:
+                self._converters[col.name] = _decode_date
+            else:
+                self._converters[col.name] = None
+        self._plans: Dict[Tuple[str, ...], Tuple[List, List]] = {}
+        self._list_adapter = TypeAdapter(List[model])
+
+    def _plan(self, columns: Tuple[str, ...]) -> Tuple[List, List]:
+        # (position, field) pairs copied as is, and (position, field, converter)
+        plan = self._plans.get(columns)
+        if plan is None:
+            known = [
+                (position, name, self._converters[name])
+                for position, name in enumerate(columns)
+                if name in self._converters
+            ]
+            plan = (
+                [
+                    (position, name)
+                    for position, name, convert in known
+                    if convert is None
+                ],
+                [entry for entry in known if entry[2] is not None],
+            )
+            self._plans[columns] = plan
+        return plan
+
+    def projection(self, fields: Optional[Sequence[str]]) -> Optional[List[str]]:
+        """
+        Columns to select for the requested fields.
+
+        Args:
+            fields (Optional[Sequence[str]]): The requested fields, None for all.
+
+        Returns:
+            Optional[List[str]]: The requested fields and the key columns, in
+            schema order, or None to select all columns.
+
+        Raises:
+            InvalidFieldsError: If a field is not a column of the table.
+        """
+        if fields is None:
+            return None
+        requested = set(fields)
+        unknown = requested.difference(self._converters)
+        if unknown:
+            raise InvalidFieldsError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return [
+            name for name in self._columns if name in requested or name in self.keys
+        ]
+
+    @staticmethod
+    def columns_of(
+        description: Optional[Sequence[Sequence]],
+    ) -> Optional[Tuple[str, ...]]:
+        """
+        Column names of a ``cursor.description``.
+
+        Args:
+            description (Optional[Sequence[Sequence]]): The cursor description.
+
+        Returns:
+            Optional[Tuple[str, ...]]: The column names, or None without description.
+        """
+        if not description:
+            return None
+        return tuple(d[0] for d in description)
+
+    def decode_dicts(
+        self, rows: Sequence[Sequence], columns: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Decode rows into plain dicts of field values.
+
+        Args:
+            rows (Sequence[Sequence]): Rows as returned by the cursor.
+            columns (Optional[Sequence[str]]): Names of the row columns, defaults to
+                the schema column order (``SELECT *``).
+
+        Returns:
+            List[Dict[str, Any]]: One dict per row.
+        """
+        plain, converted = self._plan(tuple(columns) if columns else self._columns)
+        decoded = []
+        for row in rows:
+            fields = {name: row[position] for position, name in plain}
+            for position, name, convert in converted:
+                fields[name] = convert(row[position])
+            decoded.append(fields)
+        return decoded
+
+    def decode(
+        self, rows: Sequence[Sequence], columns: Optional[Sequence[str]] = None
+    ) -> List[BaseModel]:
+        """
+        Decode rows into models; with a projection missing required fields, into
+        partial models.
+
+        Args:
+            rows (Sequence[Sequence]): Rows as returned by the cursor.
+            columns (Optional[Sequence[str]]): Names of the row columns, defaults to
+                the schema column order (``SELECT *``).
+
+        Returns:
+            List[BaseModel]: One model per row.
+        """
+        if columns is None or self._required.issubset(columns):
+            validate = self.model.model_validate
+            return [validate(fields) for fields in self.decode_dicts(rows, columns)]
+        decoded = []
+        for fields in self.decode_dicts(rows, columns):
+            partial = self._partial_model.model_validate(fields)
+            values = {name: getattr(partial, name) for name in fields}
+            decoded.append(
+                self.model.model_construct(_fields_set=set(fields), **values)
+            )
+        return decoded
+
+    def dump_json(
+        self, models: Sequence[BaseModel], columns: Optional[Sequence[str]] = None
+    ) -> bytes:
+        """
+        Serialize models into a JSON array.
+
+        Args:
+            models (Sequence[BaseModel]): Models, possibly partial.
+            columns (Optional[Sequence[str]]): The selected columns, as returned by
+                ``projection``; only these fields are written. Defaults to all fields.
+
+        Returns:
+            bytes: The UTF-8 encoded JSON array.
+        """
+        include = None if columns is None else {"__all__": set(columns)}
+        return self._list_adapter.dump_json(models, include=include)
+
+    def decode_json(
+        self, rows: Sequence[Sequence], columns: Optional[Sequence[str]] = None
+    ) -> bytes:
+        """
+        Decode rows straight into a JSON array of models.
+
+        Every row is validated once and serialized by pydantic-core.
+
+        Args:
+            rows (Sequence[Sequence]): Rows as returned by the cursor.
+            columns (Optional[Sequence[str]]): Names of the row columns, defaults to
+                the schema column order (``SELECT *``).
+
+        Returns:
+            bytes: The UTF-8 encoded JSON array.
+        """
+        if columns is None or self._required.issubset(columns):
+            models = self._list_adapter.validate_python(
+                self.decode_dicts(rows, columns)
+            )
+        else:
+            models = self.decode(rows, columns)
+        return self.dump_json(models, columns)
+
+
+class RowEncoder:
+    """
+    Encoder of models, dicts or tuples into rows for a bulk INSERT, compiled once
+    from a table schema.
+
+    Every item is turned into one tuple in the schema column order, in a single
+    pass: the fields of a model are read directly, a dict is read by column name
+    (missing keys become NULL) and a tuple or list is taken to be in column
+    order already.
+    Only the columns the schema marks as ``json_encoded`` are encoded, by
+    ``json_codec``, so loaders can hand over plain dicts or tuples and skip
+    building models. Generated columns are computed by the database and are
+    not part of the rows.
+
+    Attributes:
+        schema (TableSchema): Schema of the table the rows are written to.
+        columns (List[str]): Names of the encoded columns, in row order.
+        json_codec (JSONCodec): Storage format of the JSON columns.
+    """
+
+    def __init__(self, schema: TableSchema, json_codec: JSONCodec = TEXT_JSON):
+        self.schema = schema
+        self.json_codec = json_codec
+        written = [col for col in schema.columns if not col.generated_from]
+        self.columns = [col.name for col in written]
+        self._positions = {name: position for position, name in enumerate(self.columns)}
+        self._json_positions = [
+            position for position, col in enumerate(written) if col.json_encoded
+        ]
+
+    def encode_one(self, item: Union[BaseModel, Dict[str, Any], Sequence]) -> Tuple:
+        """
+        Encode a single item into a row.
+
+        Args:
+            item (Union[BaseModel, Dict[str, Any], Sequence]): The item to encode.
+
+        Returns:
+            Tuple: The row, in the schema column order.
+        """
+        if isinstance(item, BaseModel):
+            # field values as is; nested models are serialized by the codec
+            item = item.__dict__
+        if isinstance(item, dict):
+            get = item.get
+            row = [get(name) for name in self.columns]
+        else:
+            row = list(item)
+        encode_json = self.json_codec.encode
+        for position in self._json_positions:
+            row[position] = encode_json(row[position])
+        return tuple(row)
+
+    def encode(
+        self, items: Sequence[Union[BaseModel, Dict[str, Any], Sequence]]
+    ) -> List[Tuple]:
+        """
+        Encode items into rows.
+
+        Args:
+            items (Sequence[Union[BaseModel, Dict[str, Any], Sequence]]): The items to encode.
+
+        Returns:
+            List[Tuple]: One row per item, in the schema column order.
+        """
+        encode_one = self.encode_one
+        return [encode_one(item) for item in items]
+
+    def value_of(
+        self, item: Union[BaseModel, Dict[str, Any], Sequence], column: str
+    ) -> Any:
+        """
+        Read one column of an item without encoding it.
+
+        Args:
+            item (Union[BaseModel, Dict[str, Any], Sequence]): The item.
+            column (str): The column name.
+
+        Returns:
+            Any: The value of the column.
+        """
+        if isinstance(item, BaseModel):
+            return getattr(item, column)
+        if isinstance(item, dict):
+            return item.get(column)
+        return item[self._positions[column]]
@@ -0,0 +1,262 @@
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from datamodel.models import Interaction, Patient
+from utils.backends import PLACEHOLDERS, dialect_of
+from utils.row_codec import (
+    TEXT_JSON,
+    JSONCodec,
+    RowDecoder,
+    RowEncoder,
+    make_json_codec,
+)
+from utils.settings import settings
+from utils.sql_query_builder import SQLOperators, SQLQueryBuilder, SQLTypes
+from utils.table_schemas import (
+    InteractionCountSchema,
+    InteractionLabelSchema,
+    InteractionSchema,
+    PatientHealthSchema,
+    PatientSchema,
+    TableSchema,
+)
+
+
+class TableInfo:
+    """
+    Everything the data utilities derive from a table schema, computed once.
+
+    Query templates are built on first use for every parameter marker and then
+    looked up; ``precompile`` builds them ahead of the first request.
+
+    Attributes:
+        schema (TableSchema): The schema of the table.
+        model (Optional[Type[BaseModel]]): The model rows are decoded into, None
+            for tables read as plain tuples.
+        columns (Dict[str, TableSchema.Column]): The columns by name, in table order.
+        column_names (Tuple[str, ...]): The column names, in table order.
+        dtypes (Dict[str, Optional[SQLTypes]]): The SQL type of every column.
+        json_columns (FrozenSet[str]): The columns storing JSON documents.
+        generated_columns (FrozenSet[str]): The columns computed by the database
+            from a JSON key, never written.
+        json_codec (JSONCodec): Storage format of the JSON columns.
+        encoder (RowEncoder): Encoder of models, dicts and tuples into rows.
+        decoder (Optional[RowDecoder]): Decoder of rows into ``model``.
+        lookups (Tuple[str, ...]): Columns of the point lookups to precompile.
+        primary_key (Tuple[str, ...]): Primary key columns, the key of the
+            upserts, if any.
+        counters (Tuple[str, ...]): Columns incremented by the upserts, if any.
+    """
+
+    def __init__(
+        self,
+        schema: TableSchema,
+        model: Optional[Type[BaseModel]] = None,
+        keys: Optional[List[str]] = None,
+        lookups: Tuple[str, ...] = (),
+        primary_key: Tuple[str, ...] = (),
+        counters: Tuple[str, ...] = (),
+        json_codec: JSONCodec = TEXT_JSON,
+    ):
+        self.schema = schema
+        self.model = model
+        self.columns = {col.name: col for col in schema.columns}
+        self.column_names = tuple(self.columns)
+        self.dtypes = {col.name: col.dtype for col in schema.columns}
+        self.json_columns = frozenset(
+            col.name for col in schema.columns if col.json_encoded
+        )
+        self.generated_columns = frozenset(
+            col.name for col in schema.columns if col.generated_from
+        )
+        self.json_codec = json_codec
+        self.encoder = RowEncoder(schema, json_codec=json_codec)
+        self.decoder = (
+            RowDecoder(schema, model, keys=keys, json_codec=json_codec)
+            if model
+            else None
+        )
+        self.lookups = tuple(lookups)
+        self.primary_key = tuple(primary_key)
+        self.counters = tuple(counters)
+        self._templates: Dict[Tuple, str] = {}
+
+    @property
+    def name(self) -> str:
+        return self.schema.name
+
+    def column(self, name: str) -> TableSchema.Column:
+        """
+        Look up a column.
+
+        Args:
+            name (str): The name of the column.
+
+        Returns:
+            TableSchema.Column: The column.
+
+        Raises:
+            KeyError: If the table has no such column.
+        """
+        return self.columns[name]
+
+    def _template(self, key: Tuple, build: Callable[[], str]) -> str:
+        template = self._templates.get(key)
+        if template is None:
+            # racing builders produce the same string; either may be kept
+            template = self._templates[key] = build()
+        return template
+
+    def insert_query(self, placeholder: str) -> str:
+        """
+        The INSERT template of a row with all written columns.
+
+        Args:
+            placeholder (str): The parameter marker of the driver.
+
+        Returns:
+            str: The template, taking the values in column order.
+        """
+        return self._template(
+            ("insert", placeholder),
+            lambda: SQLQueryBuilder(placeholder)
+            .insert_batch(table=self.name, columns=self.encoder.columns)
+            .construct_query(),
+        )
+
+    def select_query(
+        self,
+        placeholder: str,
+        key: str,
+        columns: Optional[Tuple[str, ...]] = None,
+    ) -> str:
+        """
+        The template of ``SELECT columns FROM table WHERE key = ?``.
+
+        Args:
+            placeholder (str): The parameter marker of the driver.
+            key (str): The column compared to the single parameter.
+            columns (Optional[Tuple[str, ...]], optional): The columns to fetch,
+                None for all.
+
+        Returns:
+            str: The template, taking the value of ``key``.
+        """
+        return self._template(
+            ("select", placeholder, key, columns),
+            lambda: SQLQueryBuilder(placeholder)
+            .select(columns=list(columns or ["*"]), table=self.name)
+            .conditions(intersections=[(self.column(key), SQLOperators.EQ, None)])
+            .construct_query(),
+        )
+
+    def upsert_query(self, placeholder: str) -> str:
+        """
+        The INSERT adding to the ``counters`` of the row with the same primary key.
+
+        Args:
+            placeholder (str): The parameter marker of the driver.
+
+        Returns:
+            str: The template, taking the key values and then the increments.
+        """
+        return self._template(
+            ("upsert", placeholder),
+            lambda: SQLQueryBuilder(placeholder)
+            .upsert_increment(
+                self.name,
+                keys=list(self.primary_key),
+                counters=list(self.counters),
+                dialect=dialect_of(placeholder),
+            )
+            .construct_query(),
+        )
+
+    def precompile(self, placeholder: str):
+        """
+        Build the templates of the table for a parameter marker.
+
+        Args:
+            placeholder (str): The parameter marker of the driver.
+        """
+        self.insert_query(placeholder)
+        for key in self.lookups:
+            self.select_query(placeholder, key)
+        if self.counters:
+            self.upsert_query(placeholder)
+
+
+class SchemaRegistry:
+    """
+    The tables of the service by name, with their precomputed lookups, codecs
+    and query templates.
+    """
+
+    def __init__(self):
+        self._tables: Dict[str, TableInfo] = {}
+
+    def register(self, schema: TableSchema, **kwargs) -> TableInfo:
+        """
+        Add a table to the registry.
+
+        Args:
+            schema (TableSchema): The schema of the table.
+            **kwargs: Further arguments of ``TableInfo``, e.g. ``model``.
+
+        Returns:
+            TableInfo: The registered table.
+        """
+        table = self._tables[schema.name] = TableInfo(schema, **kwargs)
+        return table
+
+    def __getitem__(self, name: str) -> TableInfo:
+        return self._tables[name]
+
+    def get(self, name: str) -> Optional[TableInfo]:
+        return self._tables.get(name)
+
+    def __iter__(self) -> Iterator[TableInfo]:
+        return iter(self._tables.values())
+
+    def precompile(self, placeholder: Optional[str] = None):
+        """
+        Build the query templates of all tables ahead of the first request.
+
+        Args:
+            placeholder (Optional[str], optional): The parameter marker of the
+                driver, None for those of all dialects.
+        """
+        for marker in [placeholder] if placeholder else PLACEHOLDERS.values():
+            for table in self:
+                table.precompile(marker)
+
+
+registry = SchemaRegistry()
+PATIENT = registry.register(
+    PatientSchema,
+    model=Patient,
+    keys=["insurance_no"],
+    lookups=("insurance_no",),
+    primary_key=("insurance_no",),
+)
+# the sort key is needed for the next page cursor
+INTERACTION = registry.register(
+    InteractionSchema,
+    model=Interaction,
+    keys=["id", "insurance_no", "interaction_date"],
+    primary_key=("id",),
+    json_codec=make_json_codec(settings.json_storage),
+)
+INTERACTION_LABEL = registry.register(InteractionLabelSchema)
+INTERACTION_COUNT = registry.register(
+    InteractionCountSchema,
+    lookups=("dimension",),
+    primary_key=("dimension", "value"),
+    counters=("interactions",),
+)
+PATIENT_HEALTH = registry.register(
+    PatientHealthSchema,
+    primary_key=("insurance_no",),
+    counters=("interactions", "health_status_total", "health_status_count"),
+)
@@ -0,0 +1,272 @@
+import heapq
+import json
+import math
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from utils.schema_registry import INTERACTION
+
+# columns whose text is indexed; the values of ``qa`` are indexed, not its questions
+SEARCH_COLUMNS = ("ailment", "symptoms", "remarks", "qa")
+
+_TOKEN = re.compile(r"\w+")
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+# position gap between columns, so that phrases never span two of them
+_COLUMN_GAP = 100
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lower-cased word tokens.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        List[str]: The tokens, in order.
+    """
+    return _TOKEN.findall(text.lower())
+
+
+class SearchHit(BaseModel):
+    """
+    An interaction matching a search.
+
+    Attributes:
+        id (int): The interaction id.
+        score (float): The BM25 relevance of the interaction.
+    """
+
+    id: int
+    score: float
+
+
+class SearchIndex:
+    """
+    In-process inverted index over the free text of interactions.
+
+    The ``ailment``, ``symptoms`` and ``remarks`` columns and the answers in
+    ``qa`` are tokenized into positional postings (term -> interaction id ->
+    positions). A query matches the interactions containing all of its terms;
+    quoted phrases must appear with consecutive positions. Matches are ranked
+    by BM25.
+
+    Evaluation starts from the rarest term, or from the patient's interactions
+    for a search restricted to a patient, and intersects the postings of the
+    other terms, so the cost follows the number of candidates rather than the
+    number of indexed interactions.
+
+    The index is filled incrementally by ``add`` as interactions are inserted
+    and can be rebuilt from the database in bulk (see ``DataUtils.rebuild_search_index``).
+    It lives in the memory of one process.
+
+    Attributes:
+        k1 (float): BM25 term frequency saturation.
+        b (float): BM25 length normalization.
+        ready (bool): Whether the index is complete, i.e. a bulk build finished.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ready = False
+        self._encoder = INTERACTION.encoder
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, Tuple[int, ...]]] = {}
+        # interaction id -> (insurance number, token count, distinct terms)
+        self._docs: Dict[int, Tuple[str, int, Tuple[str, ...]]] = {}
+        self._patient_docs: Dict[str, Set[int]] = {}
+        self._total_length = 0
+
+    def _tokens(self, interaction: Any) -> List[Tuple[str, int]]:
+        tokens, position = [], 0
+        for column in SEARCH_COLUMNS:
+            value = self._encoder.value_of(interaction, column)
+            if column == "qa" and value:
+                if isinstance(value, str):
+                    value = json.loads(value)
+                if isinstance(value, dict):
+                    value = " ".join(str(answer) for answer in value.values())
+            if not value:
+                continue
+            for token in tokenize(str(value)):
+                tokens.append((token, position))
+                position += 1
+            position += _COLUMN_GAP
+        return tokens
+
+    def _remove(self, interaction_id: int):
+        insurance_no, length, terms = self._docs.pop(interaction_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[interaction_id]
+            if not postings:
+                del self._postings[term]
+        self._patient_docs[insurance_no].discard(interaction_id)
+        self._total_length -= length
+
+    def add(self, interactions: Iterable[Any]):
+        """
+        Index interactions, replacing those already indexed under the same id.
+
+        Args:
+            interactions (Iterable[Any]): Interaction models, or dicts or tuples
+                with the same fields.
+        """
+        value_of = self._encoder.value_of
+        prepared = []
+        for interaction in interactions:
+            positions: Dict[str, List[int]] = {}
+            tokens = self._tokens(interaction)
+            for token, position in tokens:
+                positions.setdefault(token, []).append(position)
+            prepared.append(
+                (
+                    value_of(interaction, "id"),
+                    value_of(interaction, "insurance_no"),
+                    len(tokens),
+                    positions,
+                )
+            )
+        with self._lock:
+            for interaction_id, insurance_no, length, positions in prepared:
+                if interaction_id in self._docs:
+                    self._remove(interaction_id)
+                for term, term_positions in positions.items():
+                    self._postings.setdefault(term, {})[interaction_id] = tuple(
+                        term_positions
+                    )
+                self._docs[interaction_id] = (insurance_no, length, tuple(positions))
+                self._patient_docs.setdefault(insurance_no, set()).add(interaction_id)
+                self._total_length += length
+
+    def remove(self, interaction_ids: Iterable[int]):
+        """
+        Drop interactions from the index.
+
+        Args:
+            interaction_ids (Iterable[int]): The ids of the interactions.
+        """
+        with self._lock:
+            for interaction_id in interaction_ids:
+                if interaction_id in self._docs:
+                    self._remove(interaction_id)
+
+    def clear(self):
+        """
+        Empty the index, e.g. before a bulk rebuild.
+        """
+        with self._lock:
+            self._postings = {}
+            self._docs = {}
+            self._patient_docs = {}
+            self._total_length = 0
+            self.ready = False
+
+    @staticmethod
+    def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+        """
+        Split a query into its distinct terms and its quoted phrases.
+
+        Args:
+            query (str): The query, e.g. ``"chest pain" smoker``.
+
+        Returns:
+            Tuple[List[str], List[List[str]]]: The terms and the phrases of two
+            or more terms.
+        """
+        terms, phrases = [], []
+        for phrase, word in _QUERY.findall(query):
+            tokens = tokenize(phrase or word)
+            terms += tokens
+            if phrase and len(tokens) > 1:
+                phrases.append(tokens)
+        return list(dict.fromkeys(terms)), phrases
+
+    def _has_phrase(self, interaction_id: int, phrase: List[str]) -> bool:
+        # a handful of positions per term: tuple lookups beat building sets
+        positions = [self._postings[term][interaction_id] for term in phrase]
+        return any(
+            all(start + i in positions[i] for i in range(1, len(phrase)))
+            for start in positions[0]
+        )
+
+    def search(
+        self,
+        query: str,
+        insurance_no: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 10,
+    ) -> Tuple[List[SearchHit], int]:
+        """
+        Find the interactions matching a query, best first.
+
+        Args:
+            query (str): Words, all of which must occur, and quoted phrases.
+            insurance_no (Optional[str], optional): Restrict the search to a patient.
+            offset (int, optional): Number of hits to skip.
+            limit (int, optional): Number of hits to return.
+
+        Returns:
+            Tuple[List[SearchHit], int]: The hits of the page, ordered by
+            descending score and then id, and the total number of matches.
+        """
+        terms, phrases = self.parse_query(query)
+        if not terms:
+            return [], 0
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+            if not all(postings):
+                return [], 0
+            postings.sort(key=len)
+            if insurance_no is None:
+                candidates = set(postings[0])
+            else:
+                patient_docs = self._patient_docs.get(insurance_no, set())
+                candidates = {i for i in patient_docs if i in postings[0]}
+            for p in postings[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(p.keys())
+            docs = self._docs
+            matches = [
+                interaction_id
+                for interaction_id in candidates
+                if all(self._has_phrase(interaction_id, p) for p in phrases)
+            ]
+            count = len(docs)
+            average_length = self._total_length / count if count else 0.0
+            idfs = [
+                math.log(1 + (count - len(p) + 0.5) / (len(p) + 0.5)) for p in postings
+            ]
+            k1, b = self.k1, self.b
+            scored = []
+            for interaction_id in matches:
+                norm = k1 * (
+                    1 - b + b * docs[interaction_id][1] / (average_length or 1.0)
+                )
+                score = 0.0
+                for idf, p in zip(idfs, postings):
+                    tf = len(p[interaction_id])
+                    score += idf * tf * (k1 + 1) / (tf + norm)
+                scored.append((score, -interaction_id))
+        top = heapq.nlargest(offset + limit, scored)[offset:]
+        hits = [SearchHit(id=-negated_id, score=score) for score, negated_id in top]
+        return hits, len(scored)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the index size.
+
+        Returns:
+            Dict[str, Any]: Indexed interactions, distinct terms and readiness.
+        """
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "interactions": len(self._docs),
+                "terms": len(self._postings),
+            }
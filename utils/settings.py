@@ -0,0 +1,121 @@
+import os
+from pydantic import BaseModel
+
+
+class Settings(BaseModel):
+    """
+    Runtime configuration of the service.
+
+    Every attribute can be overridden through an environment variable of the
+    same name in upper case, e.g. ``DB_HOST`` or ``POOL_MAX_SIZE``.
+
+    Attributes:
+        db_backend (str): Storage backend: ``mysql``, ``sqlite`` (an embedded
+            database file) or ``memory`` (a throwaway in-memory database).
+        db_path (str): Database file of the ``sqlite`` backend.
+        db_host (str): Hostname of the MySQL server.
+        db_port (int): Port of the MySQL server.
+        db_user (str): Database user.
+        db_password (str): Password of the database user.
+        db_name (str): Name of the database.
+        db_allow_local_infile (bool): Allow ``LOAD DATA LOCAL INFILE`` for bulk loads.
+        db_replicas (str): Comma-separated read replicas of the API: database files
+            for ``sqlite``, ``host`` or ``host:port`` for ``mysql`` (with the same
+            user, password and database). Empty to read from the primary only.
+        replica_max_lag_seconds (float): Replication delay from which reads skip
+            a replica; the primary serves them when all replicas lag.
+        replica_sticky_seconds (float): Seconds the reads of a patient go to the
+            primary after a write touching it, to read one's own writes.
+        replica_lag_check_interval (float): Seconds between two measurements of
+            the replication delay.
+        json_storage (str): Storage format of the JSON columns of interactions:
+            ``text`` (JSON, with generated columns on frequently queried keys) or
+            ``msgpack`` (compact binary, embedded backends only, needs the
+            ``msgpack`` package).
+        pool_min_size (int): Connections opened when the pool starts and kept while idle.
+        pool_max_size (int): Upper bound of simultaneously open connections.
+        pool_timeout (float): Seconds to wait for a free connection before failing.
+        pool_max_idle_time (float): Seconds a connection may sit idle before it is recycled.
+        pool_health_check (bool): Ping connections when they are checked out of the pool.
+        async_pool_min_size (int): Minimum size of the asyncio pool used by the API.
+        async_pool_max_size (int): Maximum size of the asyncio pool used by the API.
+        patient_cache_size (int): Number of patients kept in the lookup cache, 0 disables it.
+        patient_cache_ttl (float): Seconds a found patient stays cached.
+        patient_cache_negative_ttl (float): Seconds an unknown insurance number stays cached.
+        batch_chunk_size (int): Records per transaction of ``POST /interactions/batch``.
+        write_coalescer_enabled (bool): Group the inserts of concurrent
+            ``POST /interactions/`` requests into shared transactions.
+        write_coalesce_window (float): Seconds a group stays open for more records.
+        write_coalesce_max_batch (int): Records from which a group is written
+            without waiting for the window to end.
+        patient_lookup_max_ids (int): Most insurance numbers accepted by one patient lookup.
+        fast_json (bool): Serialize the models returned by the GET endpoints straight
+            to JSON, skipping the second validation against the response model.
+        search_index_enabled (bool): Build the in-process full-text search index
+            at startup and keep it updated on inserts.
+        response_cache_max_bytes (int): Memory bound of the cached patient and
+            interaction responses, 0 disables the response cache.
+        response_cache_ttl (float): Seconds a response stays cached.
+        metrics_enabled (bool): Record query and request timings and serve them
+            at ``/metrics``.
+        slow_query_seconds (float): Duration from which a query counts as slow.
+        slow_query_sample_rate (float): Share of the slow queries whose SQL is
+            logged and listed in ``/system/stats``, 0 for none.
+    """
+
+    db_backend: str = "mysql"
+    db_path: str = "doctor_patient.db"
+    db_host: str = "db"
+    db_port: int = 3306
+    db_user: str = "mysql"
+    db_password: str = "mysqlpwd"
+    db_name: str = "doctor_patient_db"
+    db_allow_local_infile: bool = False
+    db_replicas: str = ""
+    replica_max_lag_seconds: float = 5.0
+    replica_sticky_seconds: float = 10.0
+    replica_lag_check_interval: float = 1.0
+    json_storage: str = "text"
+
+    pool_min_size: int = 1
+    pool_max_size: int = 10
+    pool_timeout: float = 30.0
+    pool_max_idle_time: float = 300.0
+    pool_health_check: bool = True
+    async_pool_min_size: int = 1
+    async_pool_max_size: int = 20
+
+    patient_cache_size: int = 10000
+    patient_cache_ttl: float = 300.0
+    patient_cache_negative_ttl: float = 30.0
+
+    batch_chunk_size: int = 500
+    write_coalescer_enabled: bool = False
+    write_coalesce_window: float = 0.002
+    write_coalesce_max_batch: int = 100
+    patient_lookup_max_ids: int = 1000
+    fast_json: bool = False
+    search_index_enabled: bool = True
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    response_cache_ttl: float = 300.0
+    metrics_enabled: bool = True
+    slow_query_seconds: float = 0.25
+    slow_query_sample_rate: float = 0.0
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """
+        Build the settings from the environment, falling back to the defaults.
+
+        Returns:
+            Settings: The resolved settings.
+        """
+        overrides = {
+            name: os.environ[name.upper()]
+            for name in cls.model_fields
+            if name.upper() in os.environ
+        }
+        return cls(**overrides)
+
+
+settings = Settings.from_env()
@@ -1,5 +1,6 @@
-from typing import List, Any, Optional, Tuple
+from typing import List, Any, Optional, Tuple, Union
 from enum import Enum
+from functools import lru_cache
 
 
 class SQLOperators(Enum):
@@ -29,18 +30,289 @@ class SQLTypes(Enum):
     INT = "INT"
     DATE = "DATE"
     TEXT = "TEXT"
+    JSON = "JSON"
     AUTO_INCREMENT = "INT AUTO_INCREMENT"
     PRIMARY_KEY = "PRIMARY KEY"
     FOREIGN_KEY = "FOREIGN KEY"
 
 
+def column_type(dtype: SQLTypes, dialect: str = "mysql") -> str:
+    """
+    The type of a column in the DDL of a dialect.
+
+    Args:
+        dtype (SQLTypes): The SQL datatype of the column.
+        dialect (str, optional): ``mysql`` or ``sqlite``.
+
+    Returns:
+        str: The declared type. SQLite has no JSON type (a column declared
+        ``JSON`` would get numeric affinity), so JSON is stored as TEXT there.
+    """
+    if dtype == SQLTypes.JSON and dialect == "sqlite":
+        return SQLTypes.TEXT.value
+    return dtype.value
+
+
+def json_extract_sql(source: str, dialect: str = "mysql") -> str:
+    """
+    The SQL expression reading a key of a JSON column.
+
+    Args:
+        source (str): The column and the key path, e.g. ``next_steps.next_visit``.
+        dialect (str, optional): ``mysql`` or ``sqlite``.
+
+    Returns:
+        str: The expression, yielding the value as text (numbers as numbers on
+        SQLite) and NULL when the key is missing or null.
+    """
+    column, _, path = source.partition(".")
+    if dialect == "sqlite":
+        return f"json_extract({column}, '$.{path}')"
+    # JSON_UNQUOTE renders a JSON null as the string 'null'
+    return f"NULLIF(JSON_UNQUOTE(JSON_EXTRACT({column}, '$.{path}')), 'null')"
+
+
+def column_definition(column: Any, dialect: str = "mysql") -> str:
+    """
+    The definition of a column in a CREATE TABLE or ALTER TABLE query.
+
+    Args:
+        column (Any): Column object with name, dtype and optionally
+            ``generated_from``, the JSON key the column is computed from.
+        dialect (str, optional): ``mysql`` or ``sqlite``.
+
+    Returns:
+        str: The definition; generated columns are VIRTUAL, i.e. computed on read
+        and stored only in the indexes that include them.
+    """
+    definition = f"{column.name} {column_type(column.dtype, dialect)}"
+    generated_from = getattr(column, "generated_from", None)
+    if generated_from:
+        expression = json_extract_sql(generated_from, dialect)
+        definition += f" GENERATED ALWAYS AS ({expression}) VIRTUAL"
+    return definition
+
+
+# Longest IN list rendered in one query, see ``split_in_list``.
+IN_LIST_MAX_SIZE = 1024
+
+
+def _pad_in_list(values: List[Any]) -> List[Any]:
+    # repeat the last value up to the next power of two, so that lists of similar
+    # length share one template (and one prepared statement)
+    size = 1
+    while size < len(values):
+        size *= 2
+    return list(values) + [values[-1]] * (size - len(values))
+
+
+def split_in_list(values: List[Any], max_size: int = IN_LIST_MAX_SIZE) -> List[List]:
+    """
+    Split the distinct values of a long IN list into lists short enough for one query.
+
+    Args:
+        values (List[Any]): The values, duplicates are dropped.
+        max_size (int, optional): Maximum number of values per list.
+
+    Returns:
+        List[List]: The lists of values, one query each.
+    """
+    distinct = list(dict.fromkeys(values))
+    return [distinct[i : i + max_size] for i in range(0, len(distinct), max_size)]
+
+
+# Clause renderers. A query is described by its shape, a tuple of
+# (renderer, *arguments) clauses holding everything but the bound values, so
+# the SQL text of every distinct shape is rendered once and then reused.
+
+
+def _render_select(placeholder: str, columns: Tuple[str], table: str) -> str:
+    return f"SELECT {','.join(columns)} FROM {table}"
+
+
+def _render_conditions(
+    placeholder: str, table: str, intersections: Tuple, unions: Tuple
+) -> str:
+    def _format_conditions(conditions: Tuple):
+        formatted = []
+        for name, op, size in conditions:
+            if op == SQLOperators.IN.value:
+                formatted.append(
+                    f"{table}.{name} IN ({','.join([placeholder] * size)})"
+                )
+            else:
+                formatted.append(f"{table}.{name} {op} {placeholder}")
+        return formatted
+
+    query = " WHERE "
+    intersections_query = f" {' AND '.join(_format_conditions(intersections))}"
+    unions_query = f" {' OR '.join(_format_conditions(unions))}"
+    if len(intersections) > 0 and len(unions) > 0:
+        # the OR group must not bind to the last intersection only
+        query += f"{intersections_query} AND ({unions_query.strip()})"
+    elif len(intersections) > 0:
+        query += intersections_query
+    else:
+        query += unions_query
+    return query
+
+
+def _render_seek(placeholder: str, table: str, has_where: bool, key: Tuple) -> str:
+    def _equal(name, is_null):
+        if is_null:
+            return f"{table}.{name} IS NULL"
+        return f"{table}.{name} = {placeholder}"
+
+    def _after(name, is_null):
+        if is_null:
+            return f"{table}.{name} IS NOT NULL"
+        return f"{table}.{name} > {placeholder}"
+
+    alternatives = []
+    for i, (name, is_null) in enumerate(key):
+        terms = [_equal(*column) for column in key[:i]]
+        terms.append(_after(name, is_null))
+        alternatives.append(terms[0] if len(terms) == 1 else f"({' AND '.join(terms)})")
+    keyword = " AND " if has_where else " WHERE "
+    return f"{keyword}({' OR '.join(alternatives)})"
+
+
+def _render_in_select(
+    placeholder: str,
+    table: str,
+    has_where: bool,
+    column: str,
+    sub_table: str,
+    sub_column: str,
+    filter_column: str,
+    size: int,
+) -> str:
+    keyword = " AND " if has_where else " WHERE "
+    return (
+        f"{keyword}{table}.{column} IN (SELECT {sub_table}.{sub_column} FROM {sub_table} "
+        f"WHERE {sub_table}.{filter_column} IN ({','.join([placeholder] * size)}))"
+    )
+
+
+def _render_order_by(placeholder: str, cols: Tuple[str], direction: str) -> str:
+    return f" ORDER BY {','.join(f'{c} {direction}' for c in cols)}"
+
+
+def _render_limit(placeholder: str) -> str:
+    return f" LIMIT {placeholder}"
+
+
+def _render_offset(placeholder: str) -> str:
+    return f" OFFSET {placeholder}"
+
+
+def _render_group_by(placeholder: str, cols: Tuple[str]) -> str:
+    return f" GROUP BY {','.join(cols)}"
+
+
+def _render_create(placeholder: str, table: str, definitions: Tuple[str]) -> str:
+    return f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(definitions)})"
+
+
+def _render_add_column(placeholder: str, table: str, definition: str) -> str:
+    return f"ALTER TABLE {table} ADD COLUMN {definition}"
+
+
+def _render_modify_column(placeholder: str, table: str, definition: str) -> str:
+    return f"ALTER TABLE {table} MODIFY COLUMN {definition}"
+
+
+def _render_nullify_empty(placeholder: str, table: str, column: str) -> str:
+    return f"UPDATE {table} SET {column} = NULL WHERE {column} = ''"
+
+
+def _render_create_index(
+    placeholder: str, table: str, name: str, columns: Tuple[str], unique: bool
+) -> str:
+    return f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({','.join(columns)})"
+
+
+def _render_show_indexes(placeholder: str, table: str, dialect: str) -> str:
+    if dialect == "sqlite":
+        # same column layout as SHOW INDEX: the index name comes third
+        return (
+            f"SELECT tbl_name, 0, name FROM sqlite_master "
+            f"WHERE type = 'index' AND tbl_name = '{table}'"
+        )
+    return f"SHOW INDEX FROM {table}"
+
+
+def _render_delete(placeholder: str, table: str) -> str:
+    return f"DELETE FROM {table}"
+
+
+def _render_drop_index(placeholder: str, table: str, name: str, dialect: str) -> str:
+    if dialect == "sqlite":
+        return f"DROP INDEX {name}"
+    return f"DROP INDEX {name} ON {table}"
+
+
+def _render_insert_batch(
+    placeholder: str, table: str, columns: Tuple[str], rows: int = 1
+) -> str:
+    values = f"({','.join([placeholder] * len(columns))})"
+    return (
+        f"INSERT INTO {table} ({','.join(columns)}) VALUES {','.join([values] * rows)}"
+    )
+
+
+def _render_upsert_increment(
+    placeholder: str,
+    table: str,
+    keys: Tuple[str],
+    counters: Tuple[str],
+    dialect: str,
+) -> str:
+    columns = keys + counters
+    insert = (
+        f"INSERT INTO {table} ({','.join(columns)}) "
+        f"VALUES ({','.join([placeholder] * len(columns))})"
+    )
+    if dialect == "sqlite":
+        updates = ",".join(f"{c} = {c} + excluded.{c}" for c in counters)
+        return f"{insert} ON CONFLICT ({','.join(keys)}) DO UPDATE SET {updates}"
+    updates = ",".join(f"{c} = {c} + VALUES({c})" for c in counters)
+    return f"{insert} ON DUPLICATE KEY UPDATE {updates}"
+
+
+def _render_load_data(placeholder: str, table: str, columns: Tuple[str]) -> str:
+    # tab separated, backslash escaped, \N for NULL: the LOAD DATA defaults
+    return (
+        f"LOAD DATA LOCAL INFILE {placeholder} INTO TABLE {table} "
+        f"CHARACTER SET utf8mb4 ({','.join(columns)})"
+    )
+
+
+@lru_cache(maxsize=1024)
+def _compile(shape: Tuple, placeholder: str) -> str:
+    return "".join(render(placeholder, *args) for render, *args in shape) + ";"
+
+
 class SQLQueryBuilder:
     """
     Class for building SQL Queries
+
+    Values are never pasted into the SQL text: the builder produces a template
+    with placeholders and collects the values to bind in ``params``. Templates
+    are cached by query shape (columns, operators and clause layout), so the
+    same template string is returned for every query of a given shape, which
+    lets the driver reuse its prepared statement.
+
+    Attributes:
+        placeholder (str): The parameter placeholder of the driver.
+        params (List[Any]): The values to bind, in placeholder order.
     """
 
-    def __init__(self):
-        self.query = ""
+    def __init__(self, placeholder: str = "%s"):
+        self.placeholder = placeholder
+        self.shape: List[Tuple] = []
+        self.params: List[Any] = []
+        self.has_where = False
 
     def select(
         self,
@@ -59,7 +331,9 @@ class SQLQueryBuilder:
             self: The SQLQueryBuilder instance.
         """
         self.table = table
-        self.query = f"SELECT {','.join(columns)} FROM {table}"
+        self.shape = [(_render_select, tuple(columns), table)]
+        self.params = []
+        self.has_where = False
         return self
 
     def conditions(
@@ -71,45 +345,122 @@ class SQLQueryBuilder:
         Args:
             intersections (List[Tuple]): List of conditions to be joined with AND operator, each tuple of (column, operator, value)
             unions (List[Tuple]): List of conditions to be joined with OR operator, each tuple of (column, operator, value)
+                For ``SQLOperators.IN`` the value is a non-empty list of values, at
+                most ``IN_LIST_MAX_SIZE`` long (see ``split_in_list``). Lists are
+                padded to a power of two by repeating their last value.
         Returns:
             self: The SQLQueryBuilder instance.
         """
         if len(intersections) == 0 and len(unions) == 0:
             raise Exception("Please enter atleast one condition!")
 
-        def _format_conditions(conditions: List[Tuple]):
-            # add quote to value if it is a string type
-            res = []
-            for col, op, val in conditions:
-                if col.dtype == SQLTypes.INT:
-                    res.append(f"{self.table}.{col.name} {op.value} {val}")
-                else:
-                    res.append(f"{self.table}.{col.name} {op.value} '{val}'")
-            return res
-
-        self.query += " WHERE "
-        intersections_query = f" {' AND '.join(_format_conditions(intersections))}"
-        unions_query = f" {' OR '.join(_format_conditions(unions))}"
-        if len(intersections) > 0 and len(unions) > 0:
-            self.query += f"{intersections_query} AND {unions_query}"
-        elif len(intersections) > 0:
-            self.query += intersections_query
-        else:
-            self.query += unions_query
-        return self
-
-    def order_by(self, col: str, type: SQLOperators) -> Any:
+        self.shape.append(
+            (
+                _render_conditions,
+                self.table,
+                self._condition_shape(intersections),
+                self._condition_shape(unions),
+            )
+        )
+        for _, op, val in list(intersections) + list(unions):
+            if op == SQLOperators.IN:
+                self.params += _pad_in_list(val)
+            else:
+                self.params.append(val)
+        self.has_where = True
+        return self
+
+    @staticmethod
+    def _condition_shape(conditions: List[Tuple]) -> Tuple:
+        # IN lists are part of the shape through their padded length
+        return tuple(
+            (col.name, op.value, len(_pad_in_list(val)) if op == SQLOperators.IN else 1)
+            for col, op, val in conditions
+        )
+
+    def seek(self, columns: List[Any], values: List[Any]) -> Any:
+        """
+        Add a keyset (seek) predicate selecting the rows that sort after ``values``.
+
+        The predicate is the lexicographic comparison ``(columns) > (values)`` in
+        ascending order, expanded into ``a > x OR (a = x AND b > y) ...`` so that an
+        index on the columns can be used for a range scan. NULL values sort first,
+        as they do in MySQL and SQLite.
+
+        Args:
+            columns (List[Any]): Column objects (with name and dtype) of the sort key.
+            values (List[Any]): Values of the sort key of the last row already seen.
+
+        Returns:
+            self: The SQLQueryBuilder instance.
+        """
+        if not columns or len(columns) != len(values):
+            raise Exception("Seek needs one value per column!")
+
+        key = tuple((col.name, val is None) for col, val in zip(columns, values))
+        self.shape.append((_render_seek, self.table, self.has_where, key))
+        for i in range(len(values)):
+            # same order as the placeholders of the i-th alternative
+            self.params += [val for val in values[: i + 1] if val is not None]
+        self.has_where = True
+        return self
+
+    def in_select(
+        self,
+        column: str,
+        sub_table: str,
+        sub_column: str,
+        filter_column: str,
+        values: List[Any],
+    ) -> Any:
+        """
+        Add a semi-join predicate ``column IN (SELECT sub_column FROM sub_table
+        WHERE filter_column IN (values))``.
+
+        Used to filter through a junction table, whose index on
+        ``(filter_column, sub_column)`` answers the subquery without touching
+        the main table. The values list is padded like an IN condition.
+
+        Args:
+            column (str): Column of the queried table.
+            sub_table (str): Name of the junction table.
+            sub_column (str): Column of the junction table matched against ``column``.
+            filter_column (str): Column of the junction table compared with ``values``.
+            values (List[Any]): Non-empty list of values, at most ``IN_LIST_MAX_SIZE`` long.
+
+        Returns:
+            self: The SQLQueryBuilder instance.
+        """
+        padded = _pad_in_list(values)
+        self.shape.append(
+            (
+                _render_in_select,
+                self.table,
+                self.has_where,
+                column,
+                sub_table,
+                sub_column,
+                filter_column,
+                len(padded),
+            )
+        )
+        self.params += padded
+        self.has_where = True
+        return self
+
+    def order_by(self, col: Union[str, List[str]], type: SQLOperators) -> Any:
         """
         Add an ORDER BY clause to the query.
 
         Args:
-            col (str): Column name to order by.
+            col (Union[str, List[str]]): Column name, or list of column names, to order by.
             type (SQLOperators): Order type (ASC or DESC).
 
         Returns:
             self: The SQLQueryBuilder instance.
         """
-        self.query += f" ORDER BY {col} {type.value}"
+        cols = (col,) if isinstance(col, str) else tuple(col)
+        self.shape.append((_render_order_by, cols, type.value))
         return self
 
     def limit(self, limit: int) -> Any:
@@ -122,7 +473,8 @@ class SQLQueryBuilder:
         Returns:
             self: The SQLQueryBuilder instance.
         """
-        self.query += f" LIMIT {limit}"
+        self.shape.append((_render_limit,))
+        self.params.append(int(limit))
         return self
 
     def offset(self, offset: int) -> Any:
@@ -135,7 +487,8 @@ class SQLQueryBuilder:
         Returns:
             self: The SQLQueryBuilder instance.
         """
-        self.query += f" OFFSET {offset}"
+        self.shape.append((_render_offset,))
+        self.params.append(int(offset))
         return self
 
     def group_by(self, cols: List[str]) -> Any:
@@ -148,47 +501,262 @@ class SQLQueryBuilder:
         Returns:
             self: The SQLQueryBuilder instance.
         """
-        self.query += f" GROUP BY {','.join(cols)}"
+        self.shape.append((_render_group_by, tuple(cols)))
         return self
 
-    def create(self, table: Any):
+    def create(self, table: Any, dialect: str = "mysql", generated: bool = True):
         """
         Build a CREATE TABLE query.
 
         Args:
-            table (Any): Table schema object with name, columns, and constraints.
+            table (Any): Table schema object with name, columns, constraints and
+                optionally indexes.
+            dialect (str, optional): ``mysql`` declares the indexes in the table
+                definition; ``sqlite`` has no inline indexes, they are created
+                with ``create_index`` instead.
+            generated (bool, optional): Declare the generated columns; without
+                them (e.g. when the JSON columns are not stored as JSON text) the
+                indexes on generated columns are left out as well.
 
         Returns:
             self: The SQLQueryBuilder instance.
         """
+        columns = [
+            column
+            for column in table.columns
+            if generated or not getattr(column, "generated_from", None)
+        ]
+        names = {column.name for column in columns}
+        definitions = [
+            ",".join(column_definition(column, dialect) for column in columns)
+        ]
         if table.constraints:
-            constraints = ", ".join(table.constraints)
-        self.query = f"""CREATE TABLE IF NOT EXISTS {table.name} ({','.join([f"{column.name} {column.dtype.value}" for column in table.columns])}, {constraints})"""
+            definitions.append(", ".join(table.constraints))
+        inline_indexes = getattr(table, "indexes", None) if dialect == "mysql" else None
+        for index in inline_indexes or []:
+            if not names.issuperset(index.columns):
+                continue
+            unique = "UNIQUE " if index.unique else ""
+            definitions.append(
+                f"{unique}INDEX {index.name} ({','.join(index.columns)})"
+            )
+        self.shape = [(_render_create, table.name, tuple(definitions))]
+        self.params = []
+        return self
+
+    def add_column(self, table: str, column: Any, dialect: str = "mysql"):
+        """
+        Build an ALTER TABLE query adding a column to an existing table.
+
+        Args:
+            table (str): Name of the table.
+            column (Any): Column object, see ``column_definition``.
+            dialect (str, optional): ``mysql`` or ``sqlite``.
+
+        Returns:
+            self: The SQLQueryBuilder instance.
+        """
+        self.shape = [(_render_add_column, table, column_definition(column, dialect))]
+        self.params = []
         return self
 
-    def insert_batch(self, table: str, columns: List[str]):
+    def modify_column(self, table: str, column: Any):
+        """
+        Build an ALTER TABLE query changing the type of a column (MySQL only;
+        SQLite cannot change column types and needs none for JSON).
+
+        Args:
+            table (str): Name of the table.
+            column (Any): Column object, see ``column_definition``.
+
+        Returns:
+            self: The SQLQueryBuilder instance.
+        """
+        self.shape = [
+            (_render_modify_column, table, column_definition(column, "mysql"))
+        ]
+        self.params = []
+        return self
+
+    def nullify_empty(self, table: str, column: str):
+        """
+        Build an UPDATE query replacing the empty strings of a column with NULL.
+
+        Args:
+            table (str): Name of the table.
+            column (str): Name of the column.
+
+        Returns:
+            self: The SQLQueryBuilder instance.
+        """
+        self.shape = [(_render_nullify_empty, table, column)]
+        self.params = []
+        return self
+
+    def create_index(self, table: str, index: Any):
+        """
+        Build a CREATE INDEX query for an index of an existing table.
+
+        Args:
+            table (str): Name of the table.
+            index (Any): Index object with name, columns and unique flag.
+
+        Returns:
+            self: The SQLQueryBuilder instance.
+        """
+        self.shape = [
+            (
+                _render_create_index,
+                table,
+                index.name,
+                tuple(index.columns),
+                index.unique,
+            )
+        ]
+        self.params = []
+        return self
+
+    def show_indexes(self, table: str, dialect: str = "mysql"):
+        """
+        Build a query listing the indexes of a table, with the index name in the
+        third column.
+
+        Args:
+            table (str): Name of the table.
+            dialect (str, optional): ``mysql`` (one row per indexed column) or
+                ``sqlite`` (one row per index).
+
+        Returns:
+            self: The SQLQueryBuilder instance.
+        """
+        self.shape = [(_render_show_indexes, table, dialect)]
+        self.params = []
+        return self
+
+    def delete(self, table: str):
+        """
+        Build a DELETE query; add ``conditions`` to restrict the deleted rows.
+
+        Args:
+            table (str): Name of the table.
+
+        Returns:
+            self: The SQLQueryBuilder instance.
+        """
+        self.table = table
+        self.shape = [(_render_delete, table)]
+        self.params = []
+        self.has_where = False
+        return self
+
+    def drop_index(self, table: str, name: str, dialect: str = "mysql"):
+        """
+        Build a DROP INDEX query.
+
+        Args:
+            table (str): Name of the table.
+            name (str): Name of the index.
+            dialect (str, optional): ``mysql`` or ``sqlite``.
+
+        Returns:
+            self: The SQLQueryBuilder instance.
+        """
+        self.shape = [(_render_drop_index, table, name, dialect)]
+        self.params = []
+        return self
+
+    def insert_batch(self, table: str, columns: List[str], rows: int = 1):
         """
         Build an INSERT INTO query for batch insertion.
 
+        With ``rows`` greater than one the query is a multi-row INSERT taking the
+        values of ``rows`` rows, flattened in row order.
+
         Args:
             table (str): Name of the table.
             columns (List[str]): List of column names.
+            rows (int, optional): Number of rows inserted by one statement.
+
+        Returns:
+            self: The SQLQueryBuilder instance.
+        """
+        self.shape = [(_render_insert_batch, table, tuple(columns), rows)]
+        self.params = []
+        return self
+
+    def upsert_increment(
+        self,
+        table: str,
+        keys: List[str],
+        counters: List[str],
+        dialect: str = "mysql",
+    ):
+        """
+        Build an INSERT that adds to the counters of an existing row instead of
+        failing on a duplicate key.
+
+        The values are the keys followed by the increments of the counters.
+
+        Args:
+            table (str): Name of the table.
+            keys (List[str]): The columns of the primary key.
+            counters (List[str]): The columns incremented on conflict.
+            dialect (str, optional): ``mysql`` (``ON DUPLICATE KEY UPDATE``) or
+                ``sqlite`` (``ON CONFLICT ... DO UPDATE``).
+
+        Returns:
+            self: The SQLQueryBuilder instance.
+        """
+        self.shape = [
+            (_render_upsert_increment, table, tuple(keys), tuple(counters), dialect)
+        ]
+        self.params = []
+        return self
+
+    def load_data(self, table: str, columns: List[str], path: str):
+        """
+        Build a LOAD DATA LOCAL INFILE query reading a tab-separated file.
+
+        Args:
+            table (str): Name of the table.
+            columns (List[str]): The columns of the file, in order.
+            path (str): Path of the file on the client.
 
         Returns:
             self: The SQLQueryBuilder instance.
         """
-        self.query = f"INSERT INTO {table} ({','.join(columns)}) VALUES ({','.join(['%s'] * len(columns))})"
+        self.shape = [(_render_load_data, table, tuple(columns))]
+        self.params = [path]
         return self
 
     def construct_query(self):
         """
-        Construct and return the final query string.
+        Construct and return the final query template.
+
+        Returns:
+            str: The final SQL query string, with placeholders for ``params``.
+        """
+
+        return _compile(tuple(self.shape), self.placeholder)
+
+    def construct(self) -> Tuple[str, Tuple]:
+        """
+        Construct the final query template together with the values to bind.
 
         Returns:
-            str: The final SQL query string.
+            Tuple[str, Tuple]: The SQL query template and its parameters.
+        """
+        return self.construct_query(), tuple(self.params)
+
+    @staticmethod
+    def template_cache_info():
         """
+        Statistics of the compiled template cache.
 
-        return self.query + ";"
+        Returns:
+            functools._CacheInfo: Hits, misses and size of the cache.
+        """
+        return _compile.cache_info()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,123 @@
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class StatementCache:
+    """
+    Per-connection cache of server-side prepared statements.
+
+    For every connection it keeps one prepared cursor per query template, up to
+    ``max_statements`` in LRU order. ``SQLQueryBuilder`` hands out the same
+    template object for every query of a given shape, and a prepared cursor
+    executed again with the same template only sends the new parameters, so
+    repeated queries skip the parse/prepare round trip.
+
+    Connections whose driver has no prepared cursors (e.g. ``sqlite3``, which
+    caches compiled statements by itself) are remembered and get plain cursors.
+    Entries disappear together with their connection.
+
+    Attributes:
+        max_statements (int): Prepared statements kept per connection.
+    """
+
+    def __init__(self, max_statements: int = 64):
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self._by_conn: "weakref.WeakKeyDictionary[Any, Optional[OrderedDict]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def supports(self, conn: Any) -> bool:
+        """
+        Whether prepared cursors can be used on the connection.
+
+        Args:
+            conn (Any): A database connection.
+
+        Returns:
+            bool: False once the driver rejected a prepared cursor.
+        """
+        if self.max_statements <= 0:
+            return False
+        with self._lock:
+            try:
+                return self._by_conn.get(conn, True) is not None
+            except TypeError:
+                # e.g. sqlite3 connections cannot be weakly referenced
+                return False
+
+    def mark_unsupported(self, conn: Any):
+        """
+        Remember that the driver of the connection has no prepared cursors.
+
+        Args:
+            conn (Any): A database connection.
+        """
+        with self._lock:
+            self._by_conn[conn] = None
+
+    def get(self, conn: Any, query: str) -> Optional[Any]:
+        """
+        Look up the prepared cursor of a query template on a connection.
+
+        Args:
+            conn (Any): A database connection.
+            query (str): The query template.
+
+        Returns:
+            Optional[Any]: The prepared cursor, or None if the template is not prepared yet.
+        """
+        with self._lock:
+            statements = self._by_conn.get(conn)
+            cursor = statements.get(query) if statements is not None else None
+            if cursor is None:
+                self._misses += 1
+                return None
+            statements.move_to_end(query)
+            self._hits += 1
+            return cursor
+
+    def put(self, conn: Any, query: str, cursor: Any) -> Optional[Any]:
+        """
+        Store the prepared cursor of a query template.
+
+        Args:
+            conn (Any): A database connection.
+            query (str): The query template.
+            cursor (Any): The prepared cursor.
+
+        Returns:
+            Optional[Any]: A cursor evicted to make room, which the caller must close.
+        """
+        with self._lock:
+            statements = self._by_conn.get(conn)
+            if statements is None:
+                statements = self._by_conn[conn] = OrderedDict()
+            statements[query] = cursor
+            if len(statements) > self.max_statements:
+                self._evictions += 1
+                return statements.popitem(last=False)[1]
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the cache usage.
+
+        Returns:
+            Dict[str, Any]: Statement reuse counters.
+        """
+        with self._lock:
+            return {
+                "connections": len(self._by_conn),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+
+statement_cache = StatementCache()
@@ -12,15 +12,45 @@ class TableSchema(BaseModel):
         name (str): The name of the table.
         columns (List[Column]): List of columns in the table.
         constraints (Optional[List[str]]): Optional list of constraints for the table.
+        indexes (Optional[List[Index]]): Optional list of secondary indexes of the table.
     """
 
     class Column(BaseModel):
+        """
+        A column of the table.
+
+        Attributes:
+            name (str): The name of the column.
+            dtype (Optional[SQLTypes]): The SQL datatype of the column.
+            json_encoded (bool): Whether the column stores a JSON document.
+            generated_from (Optional[str]): For a generated column, the JSON column
+                and key it is computed from, e.g. ``next_steps.next_visit``.
+                Generated columns are virtual and never written.
+        """
+
         name: str
         dtype: Optional[SQLTypes] = None
+        json_encoded: bool = False
+        generated_from: Optional[str] = None
+
+    class Index(BaseModel):
+        """
+        A secondary index, composite when it lists several columns.
+
+        Attributes:
+            name (str): The name of the index.
+            columns (List[str]): The indexed columns, in key order.
+            unique (bool): Whether the index enforces uniqueness.
+        """
+
+        name: str
+        columns: List[str]
+        unique: bool = False
 
     name: str
     columns: List[Column]
     constraints: Optional[List[str]] = None
+    indexes: Optional[List[Index]] = None
 
 
 PatientSchema = TableSchema(
@@ -34,7 +64,7 @@ PatientSchema = TableSchema(
         TableSchema.Column(name="sex", dtype=SQLTypes.VARCHAR),
         TableSchema.Column(name="ph_no", dtype=SQLTypes.VARCHAR),
         TableSchema.Column(name="email", dtype=SQLTypes.VARCHAR),
-        TableSchema.Column(name="related_docs", dtype=SQLTypes.TEXT),
+        TableSchema.Column(name="related_docs", dtype=SQLTypes.TEXT, json_encoded=True),
         TableSchema.Column(name="habits", dtype=SQLTypes.TEXT),
         TableSchema.Column(name="pre_existing_conditions", dtype=SQLTypes.TEXT),
         TableSchema.Column(name="pre_existing_medications", dtype=SQLTypes.TEXT),
@@ -52,15 +82,76 @@ InteractionSchema = TableSchema(
         TableSchema.Column(name="ailment", dtype=SQLTypes.VARCHAR),
         TableSchema.Column(name="symptoms", dtype=SQLTypes.VARCHAR),
         TableSchema.Column(name="interaction_date", dtype=SQLTypes.DATE),
-        TableSchema.Column(name="metrics", dtype=SQLTypes.VARCHAR),
+        TableSchema.Column(name="metrics", dtype=SQLTypes.JSON, json_encoded=True),
         TableSchema.Column(name="remarks", dtype=SQLTypes.VARCHAR),
         TableSchema.Column(name="health_status", dtype=SQLTypes.INT),
-        TableSchema.Column(name="qa", dtype=SQLTypes.VARCHAR),
-        TableSchema.Column(name="next_steps", dtype=SQLTypes.VARCHAR),
+        TableSchema.Column(name="qa", dtype=SQLTypes.JSON, json_encoded=True),
+        TableSchema.Column(name="next_steps", dtype=SQLTypes.JSON, json_encoded=True),
         TableSchema.Column(name="label", dtype=SQLTypes.VARCHAR),
+        # frequently filtered keys of the JSON columns; generated columns come
+        # last, so that tables created before them keep the same column order
+        TableSchema.Column(
+            name="next_visit",
+            dtype=SQLTypes.VARCHAR,
+            generated_from="next_steps.next_visit",
+        ),
+        TableSchema.Column(
+            name="bp", dtype=SQLTypes.VARCHAR, generated_from="metrics.BP"
+        ),
     ],
     constraints=[
         "PRIMARY KEY (id)",
         "FOREIGN KEY (insurance_no) REFERENCES PATIENT(insurance_no) ",
     ],
+    indexes=[
+        # serves the per-patient reads ordered by (interaction_date, id)
+        TableSchema.Index(
+            name="idx_interaction_patient_date",
+            columns=["insurance_no", "interaction_date", "id"],
+        ),
+        TableSchema.Index(name="idx_interaction_next_visit", columns=["next_visit"]),
+    ],
+)
+
+# The labels of every interaction, split and normalized (see ``split_labels``).
+# The primary key serves label filters and label counts.
+InteractionLabelSchema = TableSchema(
+    name="INTERACTION_LABEL",
+    columns=[
+        TableSchema.Column(name="interaction_id", dtype=SQLTypes.INT),
+        TableSchema.Column(name="label", dtype=SQLTypes.VARCHAR),
+    ],
+    constraints=[
+        "PRIMARY KEY (label, interaction_id)",
+        "FOREIGN KEY (interaction_id) REFERENCES INTERACTION(id) ",
+    ],
+    indexes=[
+        TableSchema.Index(
+            name="idx_interaction_label_interaction", columns=["interaction_id"]
+        ),
+    ],
+)
+
+# Interaction counts per label, ailment and month ("YYYY-MM"), maintained on
+# insert so that dashboards read one row per group.
+InteractionCountSchema = TableSchema(
+    name="INTERACTION_COUNT",
+    columns=[
+        TableSchema.Column(name="dimension", dtype=SQLTypes.VARCHAR),
+        TableSchema.Column(name="value", dtype=SQLTypes.VARCHAR),
+        TableSchema.Column(name="interactions", dtype=SQLTypes.INT),
+    ],
+    constraints=["PRIMARY KEY (dimension, value)"],
+)
+
+# Running totals of the health status of every patient, maintained on insert.
+PatientHealthSchema = TableSchema(
+    name="PATIENT_HEALTH",
+    columns=[
+        TableSchema.Column(name="insurance_no", dtype=SQLTypes.VARCHAR),
+        TableSchema.Column(name="interactions", dtype=SQLTypes.INT),
+        TableSchema.Column(name="health_status_total", dtype=SQLTypes.INT),
+        TableSchema.Column(name="health_status_count", dtype=SQLTypes.INT),
+    ],
+    constraints=["PRIMARY KEY (insurance_no)"],
 )
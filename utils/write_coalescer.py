@@ -0,0 +1,159 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+from utils.instrumentation import Instrumentation, instrumentation
+
+
+class WriteCoalescer:
+    """
+    Group commit of records submitted one at a time by concurrent requests.
+
+    The first record of a batch opens it for ``window`` seconds; every record
+    submitted meanwhile joins it, and a batch reaching ``max_batch`` records is
+    written right away. A batch is written by a single ``insert`` call, i.e.
+    one ``executemany`` and one commit, so concurrent requests share the cost of
+    the round trip and of the sync to disk.
+
+    Every submitter waits for its batch and gets its own outcome: when the
+    batch fails (e.g. one record has a duplicate id), its records are written
+    again one by one, so only the offending ones fail. When the write itself
+    is interrupted, e.g. cancelled on shutdown, the submitters still waiting
+    get a ``RuntimeError``.
+
+    Attributes:
+        window (float): Seconds a batch stays open after its first record.
+        max_batch (int): Records from which a batch is written without waiting.
+        table (str): The table written to, labelling the metrics.
+    """
+
+    def __init__(
+        self,
+        insert: Callable[[List[Any]], Awaitable[None]],
+        window: float = 0.002,
+        max_batch: int = 100,
+        table: str = "",
+        instrumentation: Instrumentation = instrumentation,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.window = window
+        self.max_batch = max_batch
+        self.table = table
+        self.instrumentation = instrumentation
+        self._insert = insert
+        self._clock = clock
+        # record, future of its submitter and submission time
+        self._pending: List[Tuple[Any, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._writes: Set[asyncio.Task] = set()
+
+        self._records = 0
+        self._batches = 0
+        self._retried_batches = 0
+
+    async def submit(self, record: Any):
+        """
+        Write a record together with those submitted around the same time.
+
+        Args:
+            record (Any): The record, as taken by ``insert``.
+
+        Raises:
+            Exception: The error of the write of this record.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((record, future, self._clock()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        await future
+
+    def _flush(self):
+        """
+        Close the open batch and start writing it.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._write(batch))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch: List[Tuple[Any, asyncio.Future, float]]):
+        """
+        Write a batch and complete the futures of its submitters.
+
+        Args:
+            batch (List[Tuple[Any, asyncio.Future, float]]): The records with the
+                futures of their submitters and their submission times.
+        """
+        started = self._clock()
+        self._records += len(batch)
+        self._batches += 1
+        self.instrumentation.observe_write_batch(
+            self.table, len(batch), [started - submitted for _, _, submitted in batch]
+        )
+        try:
+            try:
+                await self._insert([record for record, _, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    _complete(batch[0][1], e)
+                    return
+                self._retried_batches += 1
+                for record, future, _ in batch:
+                    try:
+                        await self._insert([record])
+                    except Exception as e:
+                        _complete(future, e)
+                    else:
+                        _complete(future)
+                return
+            for _, future, _ in batch:
+                _complete(future)
+        finally:
+            # e.g. cancelled on shutdown: the submitters must not wait forever
+            for _, future, _ in batch:
+                _complete(
+                    future, RuntimeError("The write of the batch was interrupted")
+                )
+
+    async def close(self):
+        """
+        Write the open batch and wait for the writes in flight.
+        """
+        self._flush()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the coalescing.
+
+        Returns:
+            dict: The window, the batch bound, the records waiting, and the
+            records, batches and batches retried record by record so far.
+        """
+        return {
+            "window": self.window,
+            "max_batch": self.max_batch,
+            "pending": len(self._pending),
+            "records": self._records,
+            "batches": self._batches,
+            "avg_batch_size": self._records / self._batches if self._batches else 0.0,
+            "retried_batches": self._retried_batches,
+        }
+
+
+def _complete(future: asyncio.Future, error: Optional[BaseException] = None):
+    # the submitter may have been cancelled, e.g. by a client disconnect
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)